@@ -1,7 +1,9 @@
 import neat
 import b2sim.engine as b2
 from copy import deepcopy as dc
+from copy import copy
 import os
+import multiprocessing
 from bisect import bisect_left
 from math import floor, ceil
 
@@ -16,6 +18,7 @@ class AI():
 
         self.net = None # The neural network that the AI will use to make important decisions
         self.game_state = None # The game state associated with the AI   
+        self.initial_snapshot = None # Snapshot of the game state built from initial_state_game. If you change initial_state_game, set this back to None!
         self.max_farms = 5
         self.buy_factor = 0
 
@@ -31,9 +34,10 @@ class AI():
         self.decision_history = [] # List of dict objects which keeps track of key decisions the AI makes throughout simulation
         self.actions_list_base = [] #A list of all outright farm purchases the AI could choose to make
         self.farm_incomes = {} # Lists out per round incomes of all farms
+        self.farm_code_incomes = [None]*b2.farm_code_count # The same incomes, indexed by farm code instead of upgrade tuple
 
         for key in b2.farm_payout_values.keys():
-            ppr = b2.farm_payout_values[key][0]*b2.farm_payout_values[key][1]
+            ppr = b2.farm_round_incomes[b2.farmCode(key)]
             if key[2] == 5:
                 #Accounting for the MWS bonus
                 ppr += 10000
@@ -50,6 +54,7 @@ class AI():
             }
             self.actions_list_base.append(entry)
             self.farm_incomes[key] = ppr
+            self.farm_code_incomes[b2.farmCode(key)] = ppr
 
         # The complete list of actions the AI considers throughout simulation
         # At simulation start, this will just be outright farm buys, but as the simulation proceeds and the AI builds farms
@@ -67,7 +72,7 @@ class AI():
         if self.game_state is not None and len(self.game_state.time_states) > 1:
             self.fitness_multiplier -= self.penalty_intensity*(self.game_state.time_states[-1] - self.game_state.time_states[-2])
         
-    def train(self, target_time, fitness_function, fitness_parameters, increment_value = 6.0, num_generations = 50, log = False):
+    def train(self, target_time, fitness_function, fitness_parameters, increment_value = 6.0, num_generations = 50, log = False, num_workers = 1):
         '''
         Train the AI on its assigned initial_game_state and a given target time.
         
@@ -77,6 +82,8 @@ class AI():
         fitness_parameters (Dict): Parameters for the fitness function
         increment_value (float): Determines how long each step in the simulation is.
         num_generations (int): Determines how many epochs to run
+        num_workers (int): How many processes to evaluate genomes with. If greater than 1, the genomes of each generation are evaluated in parallel.
+            NOTE: In this case the fitness function and its parameters must be picklable (for instance, a function defined at the top level of a module rather than a lambda).
         '''
 
         # Load configuration.
@@ -93,11 +100,23 @@ class AI():
         p.add_reporter(stats)
         p.add_reporter(neat.Checkpointer(5))
 
+        pool = None
+        if num_workers > 1:
+            # Build the initial game state now so that every worker receives it rather than building it themselves
+            if self.initial_snapshot is None:
+                self.initial_snapshot = b2.GameState(dc(self.initial_state_game)).snapshot()
+            pool = multiprocessing.Pool(num_workers, initializer = initGenomeWorker, initargs = (self,))
+
         def eval(genomes, config):
-            self.evalGenomes(genomes, config, target_time, increment_value, fitness_function, fitness_parameters, log = log)
+            self.evalGenomes(genomes, config, target_time, increment_value, fitness_function, fitness_parameters, log = log, pool = pool)
         
         # Run for up to 300 generations.
-        winner = p.run(eval, num_generations)
+        try:
+            winner = p.run(eval, num_generations)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
         # Display the winning genome.
         print('\nBest genome:\n{!s}'.format(winner))
@@ -111,11 +130,25 @@ class AI():
         print("The winning network achieved a fitness of %s"%(winner_fitness))
 
     
-    def evalGenomes(self, genomes, config, target_time, increment_value, fitness_function, fitness_parameters, log = False):
-        for genome_id, genome in genomes:
-            genome.fitness = self.processGenome(genome, config, target_time, increment_value, fitness_function, fitness_parameters)
-            if log:
-                print("Genome %s achieved fitness %s with a fitness x'er of %s and final eco %s"%(genome_id, genome.fitness, self.fitness_multiplier, self.game_state.eco))
+    def evalGenomes(self, genomes, config, target_time, increment_value, fitness_function, fitness_parameters, log = False, pool = None):
+        '''
+        Determine the fitness of every genome in a population.
+
+        If pool is None, the genomes are evaluated one at a time using this AI. 
+        Otherwise pool should be a multiprocessing.Pool whose workers were started with initGenomeWorker(ai), and the genomes are evaluated in parallel.
+        '''
+        if pool is None:
+            for genome_id, genome in genomes:
+                genome.fitness = self.processGenome(genome, config, target_time, increment_value, fitness_function, fitness_parameters)
+                if log:
+                    print("Genome %s achieved fitness %s with a fitness x'er of %s and final eco %s"%(genome_id, genome.fitness, self.fitness_multiplier, self.game_state.eco))
+        else:
+            jobs = [(genome, config, target_time, increment_value, fitness_function, fitness_parameters) for genome_id, genome in genomes]
+            results = pool.starmap(evaluateGenome, jobs)
+            for (genome_id, genome), (fitness, fitness_multiplier, eco) in zip(genomes, results):
+                genome.fitness = fitness
+                if log:
+                    print("Genome %s achieved fitness %s with a fitness x'er of %s and final eco %s"%(genome_id, genome.fitness, fitness_multiplier, eco))
 
     def processGenome(self, genome, config, target_time, increment_value, fitness_function, fitness_parameters):
         '''
@@ -147,7 +180,11 @@ class AI():
         It is recommended to disable the logger during training
         '''
 
-        self.game_state = b2.GameState(dc(self.initial_state_game))
+        # Rather than build (and deepcopy) the initial game state for every simulation, build it once and restore it from a snapshot thereafter
+        if self.initial_snapshot is None:
+            self.initial_snapshot = b2.GameState(dc(self.initial_state_game)).snapshot()
+        self.game_state = b2.GameState.__new__(b2.GameState)
+        self.game_state.restore(self.initial_snapshot)
         self.actions_list = []
         self.getActions()
 
@@ -202,8 +239,9 @@ class AI():
                 self.time_states.append(self.game_state.current_time)
 
             # What eco send should we use next?
-            available_sends = efficientFrontier(self.game_state.available_sends)
-            eco_send = self.determineEcoSend(eco_intensity, available_sends)
+            # The efficient frontier of the sends available in each round is precomputed in info.py
+            available_sends, intensities = b2.ecoFrontier(self.game_state.last_checked_round)
+            eco_send = self.determineEcoSend(eco_intensity, available_sends, intensities)
             if self.game_state.send_name != eco_send:
                 self.penalize()
                 self.game_state.eco_queue.append(b2.ecoSend(send_name = eco_send))
@@ -248,7 +286,7 @@ class AI():
             #     'Eco': self.game_state.eco,
             #     'Farms': farmIncome(self.game_state),
             # }
-            old_farms = dc(self.game_state.farms)
+            old_farms = [farm.copy() for farm in self.game_state.farms]
             self.game_state.fastForward(target_time = min(self.game_state.current_time + increment_value, target_time))
 
             farms_changed = False
@@ -336,9 +374,8 @@ class AI():
         '''
 
         # Count the number of active farms
-        active_farms = 0
-        while active_farms < len(self.game_state.farms) and self.game_state.farms[active_farms].sell_time is None:
-            active_farms += 1
+        # NOTE: The AI keeps the game state's farms sorted (see GameState.sortFarms), so the active farms are the ones at indices 0, 1, ..., active_farms - 1
+        active_farms = len(self.game_state.active_farms)
         
         if active_farms < self.max_farms:
             self.actions_list = dc(self.actions_list_base)
@@ -371,14 +408,14 @@ class AI():
                     
                     if (farm.upgrades[i] < 2 or (farm.upgrades[i] >= 2 and not T3_elsewhere)) and (not both_upgraded):
                         # Build the entry and append it to AI actions_base
-                        new_upgrades = dc(farm.upgrades)
-                        new_upgrades[i] += 1
-                        ppr = self.farm_incomes[tuple(new_upgrades)] - self.farm_incomes[tuple(farm.upgrades)] 
+                        new_code = farm.code + b2.farm_path_steps[i]
+                        new_upgrades = b2.farmUpgrades(new_code)
+                        ppr = self.farm_code_incomes[new_code] - self.farm_code_incomes[farm.code]
                         cost = b2.farm_upgrades_costs[i][farm.upgrades[i]]
                         entry = {
                             'Type': 'Upgrade',
                             'Index': h,
-                            'Upgrades': tuple(new_upgrades),
+                            'Upgrades': new_upgrades,
                             'Income': ppr,
                             'Cost': cost
                         }
@@ -395,14 +432,14 @@ class AI():
                                     #if farms[k].revenue + b2.farm_sellback_values[tuple(farms[k].upgrades)] < b2.farm_total_cost_values[tuple(farms[k].upgrades)]:
                                     #    break
 
-                                    ppr -= self.farm_incomes[tuple(self.game_state.farms[k].upgrades)]
-                                    cost -= b2.farm_sellback_values[tuple(self.game_state.farms[k].upgrades)]
+                                    ppr -= self.farm_code_incomes[self.game_state.farms[k].code]
+                                    cost -= b2.farm_sell_values[self.game_state.farms[k].code]
 
                                     entry = {
                                         'Type': 'Compound Upgrade',
                                         'Index': h,
                                         'Farms To Sell': k+1,
-                                        'Upgrades': tuple(new_upgrades),
+                                        'Upgrades': new_upgrades,
                                         'Income': ppr,
                                         'Cost': cost
                                     }
@@ -414,8 +451,11 @@ class AI():
         # self.actions_list = pruneActions(self.actions_list)
         self.actions_list.sort(key=lambda x: x['Cost'])
 
-    def determineEcoSend(self, intensity, eco_sends):
-        ind = bisect_left(eco_sends, intensity, key = lambda send_name: b2.eco_send_info[send_name]['Eco Intensity']) - 1
+    def determineEcoSend(self, intensity, eco_sends, intensities = None):
+        # intensities, if given, lists the eco intensity of each send in eco_sends
+        if intensities is None:
+            intensities = [b2.eco_send_info[send_name]['Eco Intensity'] for send_name in eco_sends]
+        ind = bisect_left(intensities, intensity) - 1
 
         send_name = None
         if ind >= 0:
@@ -434,46 +474,42 @@ class AI():
         
 
 
+# The AI used by the worker processes of AI.train when genomes are evaluated in parallel
+worker_ai = None
+
+def initGenomeWorker(ai):
+    '''
+    Initializer for the worker processes used in parallel genome evaluation. Stores the AI that genomes will be evaluated with.
+    '''
+    global worker_ai
+    worker_ai = ai
+
+def evaluateGenome(genome, config, target_time, increment_value, fitness_function, fitness_parameters):
+    '''
+    Determine the fitness of a genome inside of a worker process.
+
+    Each genome is evaluated with its own (shallow) copy of the worker's AI, so the game state and fitness multiplier of one genome never leak into another.
+
+    Returns:
+    fitness (float): A rating of how well the genome performed
+    fitness_multiplier (float): The fitness multiplier the genome ended with
+    eco (float): The final eco of the genome's simulation
+    '''
+    ai = copy(worker_ai)
+    fitness = ai.processGenome(genome, config, target_time, increment_value, fitness_function, fitness_parameters)
+    return fitness, ai.fitness_multiplier, ai.game_state.eco
+
 def efficientFrontier(eco_sends):
     '''
     Given a list of eco sends, determine which ones belong to the efficient eco frontier
     
     Parameters:
-    eco_sends (List[str]): A list containing names of eco sends for consideration
+    eco_sends (List[str]): A list containing names of eco sends for consideration. The list is not modified.
 
     Returns:
     (List[str]): A list containing names of non-dominated pure eco sends
     '''
-
-    # First, sort the sends based on cost intensity
-    eco_sends.sort(key = lambda send_name: b2.eco_send_info[send_name]['Cost Intensity'])
-
-    # Now determine the indices that correspond to eef sends
-    i = 0
-    eef = [0]
-    while i < len(eco_sends)-1:
-        
-        #Test remaining eco sends to determine which ones belong on the EEF
-        slope = 0
-        index = None
-        for j in range(i+1,len(eco_sends)):
-            test_num = b2.eco_send_info[eco_sends[j]]['Eco Intensity'] - b2.eco_send_info[eco_sends[i]]['Eco Intensity']
-            test_den = b2.eco_send_info[eco_sends[j]]['Cost Intensity'] - b2.eco_send_info[eco_sends[i]]['Cost Intensity']
-            test_val = test_num/test_den
-            #print("Test value for index (" + str(i) + ", " + str(j) + "): " + str(test_val))
-            if test_val > slope:
-                slope = test_val
-                index = j
-                
-        # When the correct index is discovered, append it to eef
-        if index is not None and index > i:
-            eef.append(index)
-            i = index
-        else:
-            #It is possible we may run out of eco sends to add to the frontier, in which case...
-            break
-        
-    return [eco_sends[ind] for ind in eef]
+    return list(b2.computeEfficientFrontier(eco_sends))
 
 def ecoIntensity(intensity: float, eco_sends):
     '''
@@ -509,7 +545,7 @@ def farmIncome(gs):
 
     round_income = 0
     for farm in gs.farms:
-        ppr = b2.farm_payout_values[tuple(farm.upgrades)][0]*b2.farm_payout_values[tuple(farm.upgrades)][1]
+        ppr = b2.farm_round_incomes[farm.code]
         if gs.T5_exists[0] and farm.upgrades[0] == 4:
             ppr = ppr*b2.farm_globals['Banana Central Multiplier']
 
@@ -1,3 +1,5 @@
 from b2sim.engine.main import *
 from b2sim.engine.rounds import *
-from b2sim.engine.actions import *
\ No newline at end of file
+from b2sim.engine.actions import *
+from b2sim.engine.queues import *
+from b2sim.engine.batch import *
\ No newline at end of file
@@ -0,0 +1,288 @@
+# %%
+import multiprocessing
+import random
+from itertools import islice
+from array import array
+from time import perf_counter
+from math import floor
+from copy import deepcopy as dc
+from b2sim.engine.main import *
+from b2sim.engine.rounds import Rounds
+
+# %%
+class BatchResults():
+    '''
+    The results of simulateBatch, stored as one array per column rather than as one dictionary (or GameState) per simulation.
+
+    The i-th simulation in the batch ended at game time final_time[i] with cash[i] dollars, eco[i] eco, and loan[i] dollars of outstanding IMF loans.
+    Over the course of the simulation, its farms made farm_revenue[i] dollars and cost farm_expenses[i] dollars.
+    run_time[i] is how long (in seconds) the i-th simulation took to run.
+    '''
+
+    columns = ('final_time', 'cash', 'eco', 'loan', 'farm_revenue', 'farm_expenses', 'run_time')
+
+    def __init__(self):
+        for name in self.columns:
+            setattr(self, name, array('d'))
+
+    def __len__(self):
+        return len(self.cash)
+
+    def append(self, row):
+        for name, value in zip(self.columns, row):
+            getattr(self, name).append(value)
+
+    def row(self, i):
+        '''
+        Return the results of the i-th simulation as a dictionary.
+        '''
+        return {name: getattr(self, name)[i] for name in self.columns}
+
+    def toDict(self):
+        '''
+        Return the results as a dictionary of lists, one per column. This can be passed directly to pandas.DataFrame.
+        '''
+        return {name: list(getattr(self, name)) for name in self.columns}
+
+def runSimulation(initial_state: dict, target_time = None, target_round = None, interval = 0.1, stepping = 'Interval'):
+    '''
+    Simulate a single initial state and summarize how it ended. This is the function that simulateBatch runs for each initial state.
+
+    Parameters:
+    initial_state (dict): The initial state of the game state. If it contains the keys 'Target Time' or 'Target Round', these override target_time and target_round.
+    target_time (float): The time to simulate to
+    target_round (float): The round to simulate to
+    interval (float): The interval argument passed to GameState.fastForward
+    stepping (str): The stepping argument passed to GameState.fastForward. 'Event' is considerably faster.
+
+    Returns:
+    (tuple): The row (final_time, cash, eco, loan, farm_revenue, farm_expenses, run_time) of the simulation in BatchResults
+    '''
+    start = perf_counter()
+
+    target_time = initial_state.get('Target Time', target_time)
+    target_round = initial_state.get('Target Round', target_round)
+
+    # Unless told otherwise, don't spend time and memory on logs and cash/eco histories nobody will look at
+    if 'Log Level' not in initial_state or 'History Mode' not in initial_state:
+        initial_state = dict(initial_state)
+        initial_state.setdefault('Log Level', 'Off')
+        initial_state.setdefault('History Mode', 'Window')
+
+    game_state = GameState(initial_state)
+    game_state.fastForward(target_time = target_time, target_round = target_round, interval = interval, stepping = stepping)
+
+    farm_revenue = 0
+    farm_expenses = 0
+    for farm in game_state.farms:
+        farm_revenue += farm.revenue
+        farm_expenses += farm.expenses
+
+    return (game_state.current_time, game_state.cash, game_state.eco, game_state.loan, farm_revenue, farm_expenses, perf_counter() - start)
+
+def simulateBatch(initial_states, target_time = None, target_round = None, interval = 0.1, stepping = 'Interval', num_workers = 1, chunk_size = 16):
+    '''
+    Simulate many initial states and collect their results in a single table.
+
+    Parameters:
+    initial_states (iterable): A list (or generator) of initial state dicts, just like the ones passed to GameState.
+    target_time (float): The time to simulate each initial state to
+    target_round (float): The round to simulate each initial state to. If both a target_time and a target_round are given, the code will prioritize the target_round
+    interval (float): The interval argument passed to GameState.fastForward
+    stepping (str): The stepping argument passed to GameState.fastForward. 'Event' is considerably faster.
+    num_workers (int): How many processes to run the simulations with. If 1, the simulations are run in this process.
+    chunk_size (int): How many simulations each worker runs at a time.
+
+    Returns:
+    results (BatchResults): The results of the simulations, in the same order as initial_states
+    '''
+    results = BatchResults()
+
+    if num_workers <= 1:
+        for initial_state in initial_states:
+            # GameState modifies the dictionaries it is given, so give it a copy to keep the caller's initial states intact.
+            results.append(runSimulation(dc(initial_state), target_time, target_round, interval, stepping))
+        return results
+
+    # To keep memory usage bounded when initial_states is a (large) generator, only pull out as many initial states as the workers can take at once.
+    initial_states = iter(initial_states)
+    with multiprocessing.Pool(num_workers) as pool:
+        while True:
+            batch = list(islice(initial_states, num_workers*chunk_size))
+            if len(batch) == 0:
+                break
+            rows = pool.starmap(runSimulation, [(initial_state, target_time, target_round, interval, stepping) for initial_state in batch], chunk_size)
+            for row in rows:
+                results.append(row)
+
+    return results
+
+# %%
+class StreamingSummary():
+    '''
+    Summarizes a stream of numbers in bounded memory.
+
+    The count, mean, minimum, and maximum of the numbers are tracked exactly.
+    Quantiles are estimated from a uniform random sample (a "reservoir") of at most reservoir_size of the numbers,
+    so they are exact as long as no more than reservoir_size numbers have been added.
+    '''
+
+    def __init__(self, reservoir_size = 1000, seed = None):
+        self.reservoir_size = reservoir_size
+        self.reservoir = array('d')
+        self.rng = random.Random(seed)
+
+        self.count = 0
+        self.total = 0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def __len__(self):
+        return self.count
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        # Reservoir sampling: the i-th number replaces a random entry of the reservoir with probability reservoir_size/i
+        if len(self.reservoir) < self.reservoir_size:
+            self.reservoir.append(value)
+        else:
+            j = self.rng.randrange(self.count)
+            if j < self.reservoir_size:
+                self.reservoir[j] = value
+
+    def mean(self):
+        return self.total/self.count if self.count > 0 else None
+
+    def quantile(self, q):
+        '''
+        Estimate the q-th quantile (0 <= q <= 1) of the numbers, interpolating linearly between sampled numbers.
+        '''
+        if self.count == 0:
+            return None
+        values = sorted(self.reservoir)
+        pos = q*(len(values) - 1)
+        lower = floor(pos)
+        upper = min(lower + 1, len(values) - 1)
+        return values[lower] + (pos - lower)*(values[upper] - values[lower])
+
+    def summary(self, quantiles = (0.05, 0.25, 0.5, 0.75, 0.95)):
+        '''
+        Returns:
+        (dict): The count, mean, min, and max of the numbers, plus an estimate of each of the given quantiles
+        '''
+        info = {'Count': self.count, 'Mean': self.mean(), 'Min': self.min, 'Max': self.max}
+        for q in quantiles:
+            info[q] = self.quantile(q)
+        return info
+
+class StallVarianceResults():
+    '''
+    The results of simulateStallVariance, stored as StreamingSummary objects so that memory use doesn't grow with the number of samples.
+
+    self.cash, self.eco, and self.final_time summarize the cash, eco, and game time each sample ended with.
+    self.purchase_times[k] summarizes the time at which the k-th purchase from the buy queue was made, over the samples which made it.
+    '''
+
+    def __init__(self, reservoir_size = 1000, seed = None):
+        self.reservoir_size = reservoir_size
+        self.rng = random.Random(seed)
+        self.num_samples = 0
+        self.cash = StreamingSummary(reservoir_size, self.rng.getrandbits(64))
+        self.eco = StreamingSummary(reservoir_size, self.rng.getrandbits(64))
+        self.final_time = StreamingSummary(reservoir_size, self.rng.getrandbits(64))
+        self.purchase_times = []
+
+    def add(self, row):
+        final_time, cash, eco, purchase_times = row
+        self.num_samples += 1
+        self.final_time.add(final_time)
+        self.cash.add(cash)
+        self.eco.add(eco)
+        for k, purchase_time in enumerate(purchase_times):
+            if k == len(self.purchase_times):
+                self.purchase_times.append(StreamingSummary(self.reservoir_size, self.rng.getrandbits(64)))
+            self.purchase_times[k].add(purchase_time)
+
+    def summary(self, quantiles = (0.05, 0.25, 0.5, 0.75, 0.95)):
+        return {
+            'Samples': self.num_samples,
+            'Final Time': self.final_time.summary(quantiles),
+            'Cash': self.cash.summary(quantiles),
+            'Eco': self.eco.summary(quantiles),
+            'Purchase Times': [purchase_time.summary(quantiles) for purchase_time in self.purchase_times]
+        }
+
+def runStallSample(initial_state: dict, stall_info, seed, target_time = None, target_round = None, interval = 0.1, stepping = 'Interval'):
+    '''
+    Simulate the initial state once with randomly drawn round times. This is the function that simulateStallVariance runs for each sample.
+
+    Parameters:
+    initial_state (dict): The initial state of the game state. Its 'Rounds' entry (if any) is ignored.
+    stall_info: The stall factor distributions to draw round times from (see Rounds, mode 'Random Stall Factor')
+    seed (int): The seed for drawing the round times
+    target_time (float): The time to simulate to
+    target_round (float): The round to simulate to
+    interval (float): The interval argument passed to GameState.fastForward
+    stepping (str): The stepping argument passed to GameState.fastForward
+
+    Returns:
+    (tuple): (final_time, cash, eco, purchase_times), where purchase_times lists the time each entry of the buy queue was bought, in order
+    '''
+    state = dc({key: value for key, value in initial_state.items() if key != 'Rounds'})
+    state['Rounds'] = Rounds(stall_info, mode = 'Random Stall Factor', seed = seed)
+    state.setdefault('Log Level', 'Off')
+    state.setdefault('History Mode', 'Window')
+
+    game_state = GameState(state)
+    game_state.fastForward(target_time = target_time, target_round = target_round, interval = interval, stepping = stepping)
+
+    # NOTE: Don't read these off the 'Buy' event messages! Entries bought at the same time share a single message.
+    return (game_state.current_time, game_state.cash, game_state.eco, list(game_state.buy_times))
+
+def simulateStallVariance(initial_state: dict, stall_info, num_samples, target_time = None, target_round = None, seed = None, interval = 0.1, stepping = 'Interval', num_workers = 1, chunk_size = 16, reservoir_size = 1000):
+    '''
+    Monte Carlo analysis of how robust a strategy is to the opponent's stalling.
+    Simulate the initial state num_samples times, each time with round times drawn from the given stall factor distributions,
+    and summarize the distribution of the final cash, eco, and purchase times.
+
+    Parameters:
+    initial_state (dict): The initial state of the game state. Its 'Rounds' entry (if any) is ignored.
+    stall_info: The stall factor distributions to draw round times from (see Rounds, mode 'Random Stall Factor').
+    If num_workers > 1, any functions in stall_info must be picklable (so no lambdas).
+    num_samples (int): How many times to simulate the initial state
+    target_time (float): The time to simulate each sample to
+    target_round (float): The round to simulate each sample to. Since round times vary between samples, this is usually what you want.
+    seed (int): Makes the results reproducible. The results do not depend on num_workers or chunk_size.
+    interval (float): The interval argument passed to GameState.fastForward
+    stepping (str): The stepping argument passed to GameState.fastForward. 'Event' is considerably faster.
+    num_workers (int): How many processes to run the simulations with. If 1, the simulations are run in this process.
+    chunk_size (int): How many simulations each worker runs at a time.
+    reservoir_size (int): How many values each StreamingSummary keeps for estimating quantiles
+
+    Returns:
+    results (StallVarianceResults): Summaries of the simulation results
+    '''
+    rng = random.Random(seed)
+    results = StallVarianceResults(reservoir_size, rng.getrandbits(64))
+    sample_seeds = (rng.getrandbits(64) for i in range(num_samples))
+
+    if num_workers <= 1:
+        for sample_seed in sample_seeds:
+            results.add(runStallSample(initial_state, stall_info, sample_seed, target_time, target_round, interval, stepping))
+        return results
+
+    # Only hand the workers as many samples as they can take at once, and aggregate their results as they come in
+    with multiprocessing.Pool(num_workers) as pool:
+        while True:
+            batch = list(islice(sample_seeds, num_workers*chunk_size))
+            if len(batch) == 0:
+                break
+            rows = pool.starmap(runStallSample, [(initial_state, stall_info, sample_seed, target_time, target_round, interval, stepping) for sample_seed in batch], chunk_size)
+            for row in rows:
+                results.add(row)
+
+    return results
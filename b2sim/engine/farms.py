@@ -1,25 +1,44 @@
-#DEFINITIONS OF THE 
-import copy
+#DEFINITIONS OF THE INCOME SOURCES IN THE GAME
+from array import array
+from math import floor
 from b2sim.engine.info import *
 
+def copySlots(obj):
+    #Helper function for the copy methods of the classes below. Makes a shallow copy of an object whose attributes are declared in __slots__.
+    cls = obj.__class__
+    new_obj = cls.__new__(cls)
+    for klass in cls.__mro__:
+        for name in getattr(klass, '__slots__', ()):
+            setattr(new_obj, name, getattr(obj, name))
+    return new_obj
+
 class MonkeyFarm():
+    # Thousands of game states (and therefore farms) may be held in memory at once when forking game states, so farms are declared with __slots__ rather than a __dict__.
+    __slots__ = ('upgrades', 'code', 'sell_value', 'purchase_time', 'init_purchase_time', 'payout_amount', 'payout_frequency', 
+                 'bank', 'account_value', 'max_account_value', 'min_use_time', 'overclock_expiration_time', 
+                 'sell_time', 'revenue', 'expenses')
+
     def __init__(self, initial_state):
         
         ###############
         #BASIC FEATURES
         ###############
         
-        #self.upgrades is an array [i,j,k] representing the upgrade state of the farm
-        #EXAMPLE: [4,2,0] represents a Banana Research Facility with Valuable Bananas
+        #self.upgrades is a tuple (i,j,k) representing the upgrade state of the farm
+        #EXAMPLE: (4,2,0) represents a Banana Research Facility with Valuable Bananas
+        #self.code is the integer code of that upgrade state, which indexes the dense farm tables in info.py
         
-        self.upgrades = initial_state.get('Upgrades')
-        self.sell_value = farm_sellback_values[tuple(self.upgrades)]
+        self.upgrades = tuple(initial_state.get('Upgrades'))
+        self.code = farmCode(self.upgrades)
+        if farm_payout_amounts[self.code] is None:
+            raise KeyError(self.upgrades)
+        self.sell_value = farm_sell_values[self.code]
         
         self.purchase_time = initial_state.get('Purchase Time')
         self.init_purchase_time = self.purchase_time #This isn't great code, *but*, I do this so that the sim can accurately track eco impact.
         
-        self.payout_amount = farm_payout_values[tuple(self.upgrades)][0]
-        self.payout_frequency = farm_payout_values[tuple(self.upgrades)][1]
+        self.payout_amount = farm_payout_amounts[self.code]
+        self.payout_frequency = farm_payout_frequencies[self.code]
         
         ##############
         #BANK FEATURES
@@ -55,10 +74,6 @@ class MonkeyFarm():
         self.revenue = 0
         self.expenses = 0
 
-        # Tracks hypothetical revenue while processing the buy queue.
-        # In general this is necessary because of the impact of Loans on revenue generation.
-        self.h_revenue = 0
-
     def payout(self, time, mws_bonus = False, brf_buff = False, bank_interest = False):
         #This method should be used over calling self.payout_amount directly because it automatically accounts for overclock & MWS buffs
 
@@ -91,30 +106,31 @@ class MonkeyFarm():
         
         # In order to perform the initilization checks when a farm is upgraded to x3x or higher, 
         # I need to have both the new and old farm upgrade information on hand at any given point. 
-        upgrades = copy.deepcopy(self.upgrades)
+        # Since self.upgrades is a tuple, the old upgrade info stays intact until we replace it at the end.
 
         if mode == 'Upgrades':
-            #Expense tracking
-            self.expenses = farm_total_cost_values[info]
             #Update the upgrade info
-            for i in range(3):
-                upgrades[i] = info[i]
+            upgrades = tuple(info)
+            code = farmCode(upgrades)
+            #Expense tracking
+            self.expenses = farm_total_costs[code]
 
         elif mode == 'Path':
             #Expense tracking
             self.expenses += farm_upgrades_costs[info][self.upgrades[info]]
             #Update the upgrade info
-            upgrades[info] += 1
+            code = self.code + farm_path_steps[info]
+            upgrades = farmUpgrades(code)
 
         #Update the payout information of the farm
-        self.payout_amount = farm_payout_values[tuple(upgrades)][0]
-        self.payout_frequency = farm_payout_values[tuple(upgrades)][1]
+        self.payout_amount = farm_payout_amounts[code]
+        self.payout_frequency = farm_payout_frequencies[code]
         
         #So that we can accurately track payments for the farm
         self.purchase_time = time
         
         #Update the sellback value of the farm
-        self.sell_value = farm_sellback_values[tuple(upgrades)]
+        self.sell_value = farm_sell_values[code]
         
         #If the resulting farm is a Monkey Bank, indicate as such and set its max account value appropriately
         if upgrades[1] >= 3 and self.upgrades[1] < 3:
@@ -127,6 +143,7 @@ class MonkeyFarm():
             self.min_use_time = time + farm_globals['Monkeynomics Initial Cooldown']
 
         self.upgrades = upgrades
+        self.code = code
 
     def overclock(self, time):
         #What tier of farm do we have right now?
@@ -134,6 +151,14 @@ class MonkeyFarm():
         uptime = 105 - 15*tier
         self.overclock_expiration_time = time + uptime
 
+    def sell(self, time):
+        #Rather than remove a farm from the simulator when sold, we just mark its sell time
+        self.sell_time = time
+
+    def copy(self):
+        #A cheaper alternative to copy.deepcopy(farm). Every attribute of the farm (including the upgrades tuple) is immutable, so a shallow copy suffices.
+        return copySlots(self)
+
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return False
@@ -143,7 +168,7 @@ class MonkeyFarm():
             return True
         
         # Two active farms are considered the same if their upgrades are the same
-        return self.upgrades == other.upgrades
+        return self.code == other.code
     
     def __repr__(self):
         if self.sell_time:
@@ -151,4 +176,247 @@ class MonkeyFarm():
         else:
             end_str = "ACTIVE"
 
-        return "(%s,%s,%s) Farm %s"%(self.upgrades[0], self.upgrades[1], self.upgrades[2],end_str)
\ No newline at end of file
+        return "(%s,%s,%s) Farm %s"%(self.upgrades[0], self.upgrades[1], self.upgrades[2],end_str)
+
+class BoatFarm():
+    '''
+    A Merchantmen (3xx), Favored Trades (4xx), or Trade Empire (5xx) boat farm.
+    '''
+    __slots__ = ('initial_purchase_time', 'purchase_time', 'tier', 'sell_time', 'revenue', 'expenses')
+
+    def __init__(self, purchase_time, tier = 3, expenses = None):
+        self.initial_purchase_time = purchase_time
+        self.purchase_time = purchase_time
+        self.tier = tier # 3, 4, or 5
+
+        self.sell_time = None
+        self.revenue = 0
+        if expenses is None:
+            expenses = boat_globals['Merchantmen Cost'] + sum(boat_upgrades_costs[:tier-3])
+        self.expenses = expenses
+
+    def payout(self, multiplier = 1):
+        #The multiplier accounts for the Trade Empire buff, which is handled by the GameState class.
+        return multiplier*boat_payout_values[self.tier - 3]
+
+    def upgradeCost(self):
+        return boat_upgrades_costs[self.tier - 3]
+
+    def sellValue(self):
+        return boat_sell_values[self.tier - 3]
+
+    def upgrade(self, time):
+        self.expenses += self.upgradeCost()
+        self.tier += 1
+        #So that we can accurately track payments for the boat farm
+        self.purchase_time = time
+
+    def sell(self, time):
+        self.sell_time = time
+
+    def copy(self):
+        return copySlots(self)
+
+    def __repr__(self):
+        return "Tier %s Boat Farm %s"%(self.tier, "INACTIVE" if self.sell_time else "ACTIVE")
+
+def columnProperty(column):
+    #Helper function for AltEcoFarm. Makes a property which reads and writes the tower's entry in the given column of its store.
+    def getter(self):
+        return getattr(self.store, column)[self.index]
+    def setter(self, value):
+        getattr(self.store, column)[self.index] = value
+    return property(getter, setter)
+
+class AltEcoFarm():
+    '''
+    Base class for the alt eco towers that pay out a fixed amount of money on a cooldown: druid farms, supply drops, and heli farms.
+    Each of these can be upgraded once (to Spirit of the Forest, Elite Sniper, and Special Poperations respectively).
+    Subclasses fill in the class attributes below from the corresponding globals in info.py.
+
+    Automated purchases can create hundreds of these towers, so the towers of each type are stored column-wise in an AltEcoFarms object.
+    An AltEcoFarm object is only a lightweight view of one entry in that store.
+    '''
+    __slots__ = ('store', 'index')
+
+    name = 'alt eco farm'
+    cost = 0
+    upgrade_cost = 0
+    initial_cooldown = 0
+    usage_cooldown = 0
+    payout_amount = 0
+    upgraded_payout_amount = 0
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    purchase_time = columnProperty('purchase_times')
+    revenue = columnProperty('revenue')
+    expenses = columnProperty('expenses')
+
+    @property
+    def upgraded(self):
+        return bool(self.store.upgraded[self.index])
+
+    @property
+    def sell_time(self):
+        if self.store.sold[self.index]:
+            return self.store.sell_times[self.index]
+        return None
+
+    def payout(self):
+        return self.store.payout(self.index)
+
+    def sellValue(self):
+        return game_globals['Sellback Value']*self.expenses
+
+    def upgrade(self):
+        self.store.upgraded[self.index] = 1
+        self.expenses += self.upgrade_cost
+
+    def sell(self, time):
+        self.store.sold[self.index] = 1
+        self.store.sell_times[self.index] = time
+
+    def __repr__(self):
+        return "%s %s"%(self.name, "INACTIVE" if self.store.sold[self.index] else "ACTIVE")
+
+class AltEcoFarms():
+    '''
+    Every druid farm (or supply drop, or heli farm) in a game state, stored as one array per attribute.
+
+    The store behaves like a dictionary from indices to towers: game_state.druid_farms[i] is an AltEcoFarm view of the i-th druid farm,
+    and the keys of the store are the indices 0, 1, ..., len(store) - 1. Sold towers stay in the store and are marked as sold.
+    '''
+
+    columns = ('purchase_times', 'sell_times', 'revenue', 'expenses')
+
+    def __init__(self, tower_class, purchase_times = (), upgraded_index = None):
+        self.tower_class = tower_class
+        for column in self.columns:
+            setattr(self, column, array('d'))
+        self.sold = bytearray()
+        self.upgraded = bytearray()
+
+        for i, purchase_time in enumerate(purchase_times):
+            self.add(purchase_time, upgraded = i == upgraded_index)
+
+    def __len__(self):
+        return len(self.purchase_times)
+
+    def __getitem__(self, index):
+        if index < 0 or index >= len(self.purchase_times):
+            raise KeyError(index)
+        return self.tower_class(self, index)
+
+    def __iter__(self):
+        return iter(range(len(self.purchase_times)))
+
+    def __repr__(self):
+        return str(dict(self.items()))
+
+    def keys(self):
+        return range(len(self.purchase_times))
+
+    def values(self):
+        return [self.tower_class(self, index) for index in range(len(self.purchase_times))]
+
+    def items(self):
+        return [(index, self.tower_class(self, index)) for index in range(len(self.purchase_times))]
+
+    def add(self, purchase_time, upgraded = False):
+        '''
+        Add a new tower purchased at the given time to the store.
+
+        Returns:
+        (int): The index of the new tower
+        '''
+        self.purchase_times.append(purchase_time)
+        self.sell_times.append(0)
+        self.sold.append(0)
+        self.upgraded.append(1 if upgraded else 0)
+        self.revenue.append(0)
+        self.expenses.append(self.tower_class.cost + (self.tower_class.upgrade_cost if upgraded else 0))
+        return len(self.purchase_times) - 1
+
+    def payout(self, index):
+        if self.upgraded[index]:
+            return self.tower_class.upgraded_payout_amount
+        return self.tower_class.payout_amount
+
+    def nextUse(self, index, time):
+        '''
+        Determine the earliest activation of the given tower that occurs strictly after the given time.
+
+        Returns:
+        use_time (float): The time of the activation
+        use_index (int): Which activation of the tower it is (the first activation has use_index 1)
+        '''
+        purchase_time = self.purchase_times[index]
+        initial_cooldown = self.tower_class.initial_cooldown
+        usage_cooldown = self.tower_class.usage_cooldown
+        use_index = max(1,floor(1 + (time - purchase_time - initial_cooldown)/usage_cooldown)+1)
+        return purchase_time + initial_cooldown + usage_cooldown*(use_index-1), use_index
+
+    def nextUses(self, time):
+        '''
+        Determine the earliest activation after the given time of every tower in the store which hasn't been sold, all in one pass over the purchase times.
+
+        Returns:
+        (list): A list of tuples (index, use_time, use_index)
+        '''
+        initial_cooldown = self.tower_class.initial_cooldown
+        usage_cooldown = self.tower_class.usage_cooldown
+        sold = self.sold
+        uses = []
+        for index, purchase_time in enumerate(self.purchase_times):
+            if sold[index]:
+                continue
+            use_index = max(1,floor(1 + (time - purchase_time - initial_cooldown)/usage_cooldown)+1)
+            uses.append((index, purchase_time + initial_cooldown + usage_cooldown*(use_index-1), use_index))
+        return uses
+
+    def useTime(self, index, use_index):
+        #The time of the use_index-th activation of the given tower
+        return self.purchase_times[index] + self.tower_class.initial_cooldown + self.tower_class.usage_cooldown*(use_index-1)
+
+    def copy(self):
+        store = AltEcoFarms.__new__(AltEcoFarms)
+        store.tower_class = self.tower_class
+        for column in self.columns:
+            setattr(store, column, array('d', getattr(self, column)))
+        store.sold = bytearray(self.sold)
+        store.upgraded = bytearray(self.upgraded)
+        return store
+
+class DruidFarm(AltEcoFarm):
+    __slots__ = ()
+    name = 'Druid Farm'
+    cost = druid_globals['Druid Farm Cost']
+    upgrade_cost = druid_globals['Spirit of the Forest Upgrade Cost']
+    initial_cooldown = druid_globals['Druid Farm Initial Cooldown']
+    usage_cooldown = druid_globals['Druid Farm Usage Cooldown']
+    # Spirit of the Forest does not change the druid's active payout. It instead gives a separate bonus at the start of each round.
+    payout_amount = druid_globals['Druid Farm Payout']
+    upgraded_payout_amount = druid_globals['Druid Farm Payout']
+
+class SupplyDrop(AltEcoFarm):
+    __slots__ = ()
+    name = 'Supply Drop'
+    cost = sniper_globals['Supply Drop Cost']
+    upgrade_cost = sniper_globals['Elite Sniper Upgrade Cost']
+    initial_cooldown = sniper_globals['Supply Drop Initial Cooldown']
+    usage_cooldown = sniper_globals['Supply Drop Usage Cooldown']
+    payout_amount = sniper_globals['Supply Drop Payout']
+    upgraded_payout_amount = sniper_globals['Elite Sniper Payout']
+
+class HeliFarm(AltEcoFarm):
+    __slots__ = ()
+    name = 'Heli Farm'
+    cost = heli_globals['Heli Farm Cost']
+    upgrade_cost = heli_globals['Special Poperations Upgrade Cost']
+    initial_cooldown = heli_globals['Heli Farm Initial Cooldown']
+    usage_cooldown = heli_globals['Heli Farm Usage Cooldown']
+    payout_amount = heli_globals['Heli Farm Payout']
+    upgraded_payout_amount = heli_globals['Special Poperations Payout']
@@ -0,0 +1,778 @@
+# %%
+from math import floor
+from b2sim.engine.info import *
+from b2sim.engine.actions import *
+from b2sim.engine.farms import *
+from b2sim.engine.schedule import *
+
+# %%
+
+# Logging levels for the GameState class. Each level records everything the levels below it record.
+LOG_OFF = 0 # Nothing is logged at all
+LOG_WARNINGS = 1 # Only fail-safes and other unexpected events
+LOG_EVENTS = 2 # Warnings plus transactions, eco changes, and simulation summaries
+LOG_DEBUG = 3 # Everything, including every payout and every eco send
+
+log_levels = {
+    'Off': LOG_OFF,
+    'Warnings': LOG_WARNINGS,
+    'Events': LOG_EVENTS,
+    'Debug': LOG_DEBUG
+}
+
+def impact(cash: float, loan: float, amount: float):
+    #If the amount is positive (like a payment), half of the payment should be directed to the outstanding loan
+    #If the amount is negative (like a purchase), then we can treat it "normally"
+    if amount > 0:
+        if amount > 2*loan:
+            cash = cash + amount - loan
+            loan = 0
+        else:
+            cash = cash + amount/2
+            loan = loan - amount/2
+    else:
+        cash = cash + amount
+    return cash, loan
+
+# %%
+class RevenueJournal():
+    '''
+    The revenue each tower would make if the buy queue entry being checked were purchased (from selling the tower, withdrawing from it, or taking out a loan from it).
+    Only the towers the actions actually touch are recorded. If the purchase goes through, the revenue is added to the towers with commit. Otherwise, it is thrown away with discard.
+    '''
+    __slots__ = ('entries',)
+
+    def __init__(self):
+        self.entries = []
+
+    def record(self, tower, amount):
+        self.entries.append((tower, amount))
+
+    def commit(self):
+        # The entries are applied in the order they were recorded, so a tower touched by several actions ends up with exactly the revenue it would have had if it were updated directly
+        for tower, amount in self.entries:
+            tower.revenue += amount
+        self.entries.clear()
+
+    def discard(self):
+        self.entries.clear()
+
+class ActionHandler():
+    '''
+    Carries out one type of action from the buy queue (see actions.py). GameState.processAction looks up the handler for each action by its 'Type' and uses it in two stages:
+    1. check: Determine whether the action can be performed and how much cash and loan we would have afterwards, without changing the game state.
+    Any revenue a tower would make from the action (like from selling it) should be recorded with game_state.revenue_journal.record.
+    If the action is impossible, the handler should warn and set game_state.valid_action_flag to False.
+    2. apply: Actually carry out the action. This is only done after every action in the buy queue entry passes the check.
+
+    To add a new type of action, subclass ActionHandler and pass an instance of it to registerAction.
+    '''
+
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        '''
+        Returns:
+        h_cash (float): Our cash after performing the action
+        h_loan (float): Our loan after performing the action
+        '''
+        return h_cash, h_loan
+
+    def apply(self, game_state, dict_obj, payout_time):
+        pass
+
+    def cost(self, game_state, dict_obj):
+        '''
+        Returns:
+        cost (float): The cost of the action, provided that cost is all the action does to our cash. Otherwise (for instance, if the action gives us money), None.
+        '''
+        return None
+
+# Maps the 'Type' of each action to the ActionHandler which carries it out
+action_handlers = {}
+
+def registerAction(action_type, handler):
+    '''
+    Make the simulator carry out actions with the given 'Type' using the given ActionHandler. This replaces any handler already registered for that type.
+    '''
+    action_handlers[action_type] = handler
+
+def checkAltEcoSale(game_state, tower, h_cash, h_loan):
+    #Checks the sale of a druid farm, supply drop, or heli farm and returns the hypothetical cash and loan values after the sale.
+    if tower.sell_time is not None:
+        game_state.warn("WARNING! Tried to sell a %s that is not on screen! Aborting buy queue"%(tower.name.lower()))
+        game_state.valid_action_flag = False
+        return h_cash, h_loan
+
+    #Selling a tower counts as that tower generating revenue
+    h_new_cash, h_new_loan = impact(h_cash, h_loan, tower.sellValue())
+    game_state.revenue_journal.record(tower, h_new_cash - h_cash)
+    return h_new_cash, h_new_loan
+
+class PurchaseHandler(ActionHandler):
+    '''
+    An action whose only effect on our cash is a fixed price, given by the price method.
+    '''
+
+    def price(self, game_state, dict_obj):
+        return 0
+
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        return impact(h_cash, h_loan, -1*self.price(game_state, dict_obj))
+
+    def cost(self, game_state, dict_obj):
+        return self.price(game_state, dict_obj)
+
+# %%
+# DEFENSE RELATED MATTERS
+
+class BuyDefenseHandler(PurchaseHandler):
+    # We don't need to do anything here in the processing stage
+    def price(self, game_state, dict_obj):
+        return dict_obj['Cost']
+
+# %%
+# FARM RELATED MATTERS
+
+class BuyFarmHandler(PurchaseHandler):
+    def price(self, game_state, dict_obj):
+        return farm_total_cost_values[dict_obj['Upgrades']]
+
+    def apply(self, game_state, dict_obj, payout_time):
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Purchasing farm!")
+        farm_info = initFarm(purchase_time = payout_time, upgrades = list(dict_obj['Upgrades']))
+        farm = MonkeyFarm(farm_info)
+        game_state.farms.append(farm)
+        game_state.active_farms.append(len(game_state.farms) - 1)
+        game_state.addFarmOrder(len(game_state.farms) - 1)
+
+        #For revenue and expense tracking
+        farm.revenue = 0
+        farm.expenses = farm_total_cost_values[dict_obj['Upgrades']]
+
+        game_state.payout_scheduler.resetSource(game_state, FARM_SOURCE, len(game_state.farms) - 1, payout_time)
+
+class UpgradeFarmHandler(ActionHandler):
+    # There are two ways this action can be used: either with a specific set of upgrades to upgrade the farm to, or with a path to upgrade once.
+
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        ind = dict_obj['Index']
+        path = dict_obj['Path']
+        upgrades = dict_obj['Upgrades']
+        farm = game_state.farms[ind]
+
+        #Do not upgrade a farm that has already been sold!
+        if farm.sell_time is not None:
+            game_state.warn("WARNING! Tried to upgrade a farm that was already sold! Aborting buy queue!")
+            game_state.valid_action_flag = False
+
+        #If the user specified for a specific set of upgrades, use that argument
+        if upgrades is not None:
+            #Prevent the user from upgrading to a T5 farm if that T5 is already in play
+            for i in range(3):
+                if upgrades[i] == 5 and game_state.T5_exists[i]:
+                    game_state.warn("WARNING! Tried to purchase a T5 farm when one of the same kind already existed! Aborting buy queue!")
+                    game_state.valid_action_flag = False
+
+            #For each of top path, middle path, and bottom path, determine the number of upgrades that need to be made
+            #Then, determine the cost of those upgrades
+            upgrades_costs = 0
+            for i in range(3):
+                #How many times do we need to upgrade the path?
+                times_to_upgrade = upgrades[i] - farm.upgrades[i]
+                if times_to_upgrade < 0:
+                    game_state.warn("----")
+                    game_state.warn("WARNING! Tried to downgrade a farm! Aborting buy queue!")
+                    game_state.warn("The farm at index %s was a (%s,%s,%s) farm"%(ind, farm.upgrades[0], farm.upgrades[1], farm.upgrades[2]))
+                    game_state.warn("We tried to upgrade it to a (%s,%s,%s) farm"%(upgrades[0],upgrades[1],upgrades[2]))
+                    game_state.warn("The current list of farms is given by:")
+                    game_state.warn(str(game_state.farms))
+                    game_state.warn("The current buy queue looks like: ")
+                    game_state.warn(str(game_state.buy_queue))
+                    game_state.valid_action_flag = False
+
+                #How much do those upgrades cost?
+                for j in range(times_to_upgrade):
+                    upgrades_costs += farm_upgrades_costs[i][farm.upgrades[i] + j]
+
+            h_cash, h_loan = impact(h_cash, h_loan, -1*upgrades_costs)
+
+        elif path is not None:
+            #If the user specifies a specfic path,
+            #Prevent the user from upgrading to a T5 farm if that T5 is already in play
+            if farm.upgrades[path]+1 == 5 and game_state.T5_exists[path] == True:
+                game_state.warn("WARNING! Tried to purchase a T5 farm when one of the same kind already existed! Aborting buy queue!")
+                game_state.valid_action_flag = False
+
+            h_cash, h_loan = impact(h_cash, h_loan, -1*farm_upgrades_costs[path][farm.upgrades[path]])
+        return h_cash, h_loan
+
+    def apply(self, game_state, dict_obj, payout_time):
+        ind = dict_obj['Index']
+        path = dict_obj['Path']
+        upgrades = dict_obj['Upgrades']
+        farm = game_state.farms[ind]
+
+        #Upgrading the farm changes its sellback value, and therefore its place in the game state's order of farms
+        game_state.removeFarmOrder(ind)
+        if upgrades is not None:
+            farm.upgrade(payout_time, upgrades, mode = 'Upgrades')
+            if game_state.log_level >= LOG_EVENTS:
+                game_state.logs.append("Upgraded the farm at index %s to (%s,%s,%s)"%(ind,upgrades[0],upgrades[1],upgrades[2]))
+
+        elif path is not None:
+            if game_state.log_level >= LOG_EVENTS:
+                game_state.logs.append("Upgrading path %s of the farm at index %s"%(path, ind))
+            farm.upgrade(payout_time, path, mode = 'Path')
+
+            if game_state.log_level >= LOG_EVENTS:
+                game_state.logs.append("Upgraded the farm at index %s to (%s,%s,%s)"%(ind, farm.upgrades[0],farm.upgrades[1],farm.upgrades[2]))
+
+        #If the resulting farm is a Banana Central, activate the BRF buff, giving them 25% more payment amount
+        if farm.upgrades[0] == 5 and path == 0:
+            if game_state.log_level >= LOG_EVENTS:
+                game_state.logs.append("The new farm is a Banana Central!")
+            game_state.T5_exists[0] = True
+
+        #If the resutling farm is a Monkeynomics, mark the x5x_exists flag as true to prevent the user from trying to have multiple of them
+        if farm.upgrades[1] == 5 and path == 1:
+            game_state.T5_exists[1] = True
+
+        #If the resulting farm is a MWS, mark the MWS_exists flag as true to prevent the user from trying to have multiple of them.
+        if farm.upgrades[2] == 5 and path == 2:
+            game_state.T5_exists[2] = True
+
+        game_state.addFarmOrder(ind)
+
+        #Upgrading the farm changes when it pays out
+        game_state.payout_scheduler.resetSource(game_state, FARM_SOURCE, ind, payout_time)
+
+    def cost(self, game_state, dict_obj):
+        # The cost of the upgrade depends only on the farm's current upgrades, which only the buy queue changes
+        farm = game_state.farms[dict_obj['Index']]
+        if dict_obj['Upgrades'] is not None:
+            cost = 0
+            for i in range(3):
+                for j in range(dict_obj['Upgrades'][i] - farm.upgrades[i]):
+                    cost += farm_upgrades_costs[i][farm.upgrades[i] + j]
+            return cost
+        elif dict_obj['Path'] is not None and farm.upgrades[dict_obj['Path']] < 5:
+            return farm_upgrades_costs[dict_obj['Path']][farm.upgrades[dict_obj['Path']]]
+        return None
+
+class SellFarmHandler(ActionHandler):
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        ind = dict_obj['Index']
+        farm = game_state.farms[ind]
+        withdraw = dict_obj['Withdraw']
+
+        #Check whether the farm is actually on screen before selling it:
+        h_new_cash, h_new_loan = h_cash, h_loan
+        if farm.sell_time is None:
+            #If indicated, withdraw from the bank before selling it
+            if withdraw and farm.upgrades[1] >= 3:
+                h_new_cash, h_new_loan = impact(h_new_cash, h_new_loan, farm.account_value)
+            #Selling a farm counts as that farm generating revenue
+            h_new_cash, h_new_loan = impact(h_new_cash, h_new_loan, farm_sell_values[farm.code])
+            game_state.revenue_journal.record(farm, h_new_cash - h_cash)
+            h_cash, h_loan = h_new_cash, h_new_loan
+        else:
+            game_state.warn("WARNING! Tried to sell a farm that is not on screen! Aborting buy queue")
+            game_state.valid_action_flag = False
+        return h_cash, h_loan
+
+    def apply(self, game_state, dict_obj, payout_time):
+        ind = dict_obj['Index']
+        farm = game_state.farms[ind]
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Selling the farm at index %s"%(ind))
+
+        # If the farm being sold is a Banana Central, we must turn off the BRF buff
+        # If the farm is a T5 of any sorts, ensure that the game state knows we no longer that particular T5
+
+        if farm.upgrades[0] == 5:
+            if game_state.log_level >= LOG_EVENTS:
+                game_state.logs.append("The farm we're selling is a Banana Central! Removing the BRF buff.")
+            game_state.T5_exists[0] = False
+        elif farm.upgrades[1] == 5:
+            game_state.T5_exists[1] = False
+        elif farm.upgrades[2] == 5:
+            game_state.T5_exists[2] = False
+
+        #Mark the farm's sell time. The code checks whether this value is a number or not before trying to compute farm payments
+        farm.sell_time = payout_time
+        game_state.active_farms.remove(ind)
+        game_state.removeFarmOrder(ind)
+        game_state.payout_scheduler.removeSource(FARM_SOURCE, ind)
+
+class SellAllFarmsHandler(ActionHandler):
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        withdraw = dict_obj['Withdraw']
+        for ind in game_state.active_farms:
+            farm = game_state.farms[ind]
+            h_new_cash, h_new_loan = h_cash, h_loan
+            #Withdraw from the bank first, provided that the withdraw argument is True *and* the farm given is actually a bank
+            if withdraw and farm.upgrades[1] >= 3:
+                h_new_cash, h_new_loan = impact(h_new_cash, h_new_loan, farm.account_value)
+
+            #Now, sell the farm
+            h_new_cash, h_new_loan = impact(h_new_cash, h_new_loan, farm_sell_values[farm.code])
+            game_state.revenue_journal.record(farm, h_new_cash - h_cash)
+            h_cash, h_loan = h_new_cash, h_new_loan
+        return h_cash, h_loan
+
+    def apply(self, game_state, dict_obj, payout_time):
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Selling all farms!")
+        game_state.T5_exists = [False for i in range(3)] #Obviously, if we sell all farms we won't have any T5's anymore!
+        #Farms which were already sold keep their original sell time
+        for ind in game_state.active_farms:
+            game_state.farms[ind].sell_time = payout_time
+            game_state.payout_scheduler.removeSource(FARM_SOURCE, ind)
+        game_state.active_farms.clear()
+        game_state.farm_sell_order.clear()
+
+class WithdrawBankHandler(ActionHandler):
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        #WARNING: The farm in question must actually be a bank for us to perform a withdrawal!
+        #If it isn't, break the loop prematurely
+        ind = dict_obj['Index']
+        farm = game_state.farms[ind]
+        if farm.sell_time is not None:
+            game_state.warn("WARNING! Tried to withdraw from a bank that was already sold! Aborting buy queue!")
+            game_state.valid_action_flag = False
+
+        if farm.upgrades[1] < 3:
+            game_state.warn("WARNING! Tried to Withdraw from a farm that is not a bank! Aborting buy queue!")
+            game_state.valid_action_flag = False
+
+        h_new_cash, h_new_loan = impact(h_cash, h_loan, farm.account_value)
+        game_state.revenue_journal.record(farm, h_new_cash - h_cash)
+        return h_new_cash, h_new_loan
+
+    def apply(self, game_state, dict_obj, payout_time):
+        ind = dict_obj['Index']
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Withdrawing money from the bank at index %s"%(ind))
+        farm = game_state.farms[ind]
+        farm.account_value = 0
+
+class WithdrawAllBanksHandler(ActionHandler):
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        #Sold banks can't be withdrawn from
+        for ind in game_state.active_farms:
+            farm = game_state.farms[ind]
+            if farm.bank:
+                h_new_cash, h_new_loan = impact(h_cash, h_loan, farm.account_value)
+                game_state.revenue_journal.record(farm, h_new_cash - h_cash)
+                h_cash, h_loan = h_new_cash, h_new_loan
+        return h_cash, h_loan
+
+    def apply(self, game_state, dict_obj, payout_time):
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Withdrawing money from all banks!")
+        for ind in game_state.active_farms:
+            farm = game_state.farms[ind]
+            if farm.bank:
+                farm.account_value = 0
+
+class ActivateIMFHandler(ActionHandler):
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        #WARNING: The farm in question must actually be an IMF Loan for us to use this ability!
+        #If it isn't, set a flag to False and break the loop.
+        #DEVELOPER'S NOTE: A farm that has a min_use_time is not necessarily an IMF loan, it could also be an Monkeyopolis
+        #Do not upgrade a farm that has already been sold!
+        ind = dict_obj['Index']
+        farm = game_state.farms[ind]
+
+        if farm.sell_time is not None:
+            game_state.warn("WARNING! Tried to take out a loan from a bank that was already sold! Aborting buy queue!")
+            game_state.valid_action_flag = False
+
+        if farm.upgrades[1] != 4:
+            game_state.warn("WARNING! Tried to take out a loan from a farm that is not an IMF! Aborting buy queue!")
+            game_state.valid_action_flag = False
+
+        #When, a loan is activated, treat it like a payment, then add the debt
+        h_new_cash, h_new_loan = impact(h_cash, h_loan, farm_globals['IMF Loan Amount'])
+        game_state.revenue_journal.record(farm, h_new_cash - h_cash)
+        h_new_loan += farm_globals['IMF Loan Amount']
+        return h_new_cash, h_new_loan
+
+    def apply(self, game_state, dict_obj, payout_time):
+        ind = dict_obj['Index']
+        farm = game_state.farms[ind]
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Taking out a loan from the IMF at index %s"%(ind))
+        farm.min_use_time = payout_time + farm_globals['IMF Usage Cooldown']
+
+# %%
+# BOAT FARM RELATED MATTERS
+
+class BuyBoatFarmHandler(PurchaseHandler):
+    def price(self, game_state, dict_obj):
+        return boat_globals['Merchantmen Cost']
+
+    def apply(self, game_state, dict_obj, payout_time):
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Purchasing boat farm!")
+        game_state.boat_farms[game_state.boat_key] = BoatFarm(game_state.current_time)
+        game_state.boat_key += 1
+        if len(game_state.boat_farms) == 1:
+            #This is our first boat farm. Start scheduling start of round boat payments.
+            game_state.payout_scheduler.resetSource(game_state, BOAT_SOURCE, 0, payout_time)
+
+class UpgradeBoatFarmHandler(ActionHandler):
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        ind = dict_obj['Index']
+        boat_farm = game_state.boat_farms[ind]
+        #The following code prevents from the player from having multiple Trade Empires in play
+        if boat_farm.tier+1 == 5 and game_state.Tempire_exists == True:
+            game_state.warn("WARNING! Tried to purchase a Trade Empire when one already exists! Aborting buy queue!")
+            game_state.valid_action_flag = False
+        return impact(h_cash, h_loan, -1*boat_farm.upgradeCost())
+
+    def apply(self, game_state, dict_obj, payout_time):
+        ind = dict_obj['Index']
+
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Upgrading the boat farm at index %s"%(ind))
+        boat_farm = game_state.boat_farms[ind]
+        boat_farm.upgrade(payout_time)
+
+        #If the new boat farm is a Trade Empire, indicate as such
+        if boat_farm.tier == 5:
+            if game_state.log_level >= LOG_EVENTS:
+                game_state.logs.append("The new boat farm is a Trade Empire!")
+            game_state.Tempire_exists = True
+
+    def cost(self, game_state, dict_obj):
+        if dict_obj['Index'] in game_state.boat_farms:
+            return game_state.boat_farms[dict_obj['Index']].upgradeCost()
+        return None
+
+class SellBoatFarmHandler(ActionHandler):
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        ind = dict_obj['Index']
+        boat_farm = game_state.boat_farms[ind]
+
+        #Check whether the boat farm is actually on screen before selling it:
+        if boat_farm.sell_time is None:
+            #Selling a farm counts as that farm generating revenue
+            h_new_cash, h_new_loan = impact(h_cash, h_loan, boat_farm.sellValue())
+            game_state.revenue_journal.record(boat_farm, h_new_cash - h_cash)
+            h_cash, h_loan = h_new_cash, h_new_loan
+        else:
+            game_state.warn("WARNING! Tried to sell a boat farm that is not on screen! Aborting buy queue")
+            game_state.valid_action_flag = False
+        return h_cash, h_loan
+
+    def apply(self, game_state, dict_obj, payout_time):
+        ind = dict_obj['Index']
+        boat_farm = game_state.boat_farms[ind]
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Selling the boat farm at index %s"%(ind))
+        #If the farm being sold is a Trade Empire, indicate as such
+        if boat_farm.tier == 5:
+            if game_state.log_level >= LOG_EVENTS:
+                game_state.logs.append("The boat farm we're selling is a Trade Empire! Removing the Tempire buff.")
+            game_state.Tempire_exists = False
+
+        #Mark the boat farm's sell time
+        boat_farm.sell(payout_time)
+
+# %%
+# DRUID FARM RELATED MATTERS
+
+class BuyDruidFarmHandler(PurchaseHandler):
+    def price(self, game_state, dict_obj):
+        return druid_globals['Druid Farm Cost']
+
+    def apply(self, game_state, dict_obj, payout_time):
+        new_index = game_state.druid_farms.add(payout_time)
+        game_state.payout_scheduler.resetSource(game_state, DRUID_SOURCE, new_index, payout_time)
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Purchased a druid farm!")
+
+class SellDruidFarmHandler(ActionHandler):
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        return checkAltEcoSale(game_state, game_state.druid_farms[dict_obj['Index']], h_cash, h_loan)
+
+    def apply(self, game_state, dict_obj, payout_time):
+        ind = dict_obj['Index']
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Selling the druid farm at index %s"%(ind))
+        #If the druid we're selling is actually SOTF...
+        if game_state.sotf is not None and ind == game_state.sotf:
+            if game_state.log_level >= LOG_EVENTS:
+                game_state.logs.append("The druid farm being sold is a Spirit of the Forest!")
+            game_state.sotf = None
+            game_state.sotf_min_use_time = None
+            game_state.payout_scheduler.removeSource(SOTF_SOURCE, ind)
+        game_state.druid_farms[ind].sell(payout_time)
+        game_state.payout_scheduler.removeSource(DRUID_SOURCE, ind)
+
+class BuySpiritOfTheForestHandler(PurchaseHandler):
+    def price(self, game_state, dict_obj):
+        return druid_globals['Spirit of the Forest Upgrade Cost']
+
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        #WARNING: There can only be one sotf at a time!
+        if game_state.sotf is not None:
+            game_state.warn("WARNING! Tried to purchase a Spirit of the Forest when one already exists! Aborting buy queue!")
+            game_state.valid_action_flag = False
+        return PurchaseHandler.check(self, game_state, dict_obj, payout_time, h_cash, h_loan)
+
+    def apply(self, game_state, dict_obj, payout_time):
+        ind = dict_obj['Index']
+        game_state.sotf = ind
+        druid_farm = game_state.druid_farms[ind]
+        druid_farm.upgrade()
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Upgrading the druid farm at index %s into a Spirit of the Forest!"%(ind))
+        #Determine the minimum time that the SOTF active could be used
+        i = floor((20 + payout_time - druid_farm.purchase_time)/40) + 1
+        game_state.sotf_min_use_time = payout_time + 20 + 40*(i-1)
+        game_state.payout_scheduler.resetSource(game_state, SOTF_SOURCE, ind, payout_time)
+
+class RepeatedlyBuyDruidFarmsHandler(PurchaseHandler):
+    #Note, there is no "checking" stage for this action.
+    def apply(self, game_state, dict_obj, payout_time):
+        game_state.druid_farm_max_buy_time = dict_obj['Maximum Buy Time']
+        game_state.druid_farm_buffer = dict_obj['Buffer']
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Triggered automated druid farm purchases until time %s"%(game_state.druid_farm_max_buy_time))
+
+# %%
+# SUPPLY DROP RELATED MATTERS
+
+class BuySupplyDropHandler(PurchaseHandler):
+    def price(self, game_state, dict_obj):
+        return sniper_globals['Supply Drop Cost']
+
+    def apply(self, game_state, dict_obj, payout_time):
+        new_index = game_state.supply_drops.add(payout_time)
+        game_state.payout_scheduler.resetSource(game_state, SNIPER_SOURCE, new_index, payout_time)
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Purchased a supply drop!")
+
+class SellSupplyDropHandler(ActionHandler):
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        return checkAltEcoSale(game_state, game_state.supply_drops[dict_obj['Index']], h_cash, h_loan)
+
+    def apply(self, game_state, dict_obj, payout_time):
+        ind = dict_obj['Index']
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Selling the supply drop at index %s"%(ind))
+        #If the supply drop we're selling is actually an E-sniper, then...
+        if game_state.elite_sniper is not None:
+            if ind == game_state.elite_sniper:
+                if game_state.log_level >= LOG_EVENTS:
+                    game_state.logs.append("The supply drop being sold is an elite sniper!")
+                game_state.elite_sniper = None
+        game_state.supply_drops[ind].sell(payout_time)
+        game_state.payout_scheduler.removeSource(SNIPER_SOURCE, ind)
+
+class BuyEliteSniperHandler(PurchaseHandler):
+    def price(self, game_state, dict_obj):
+        return sniper_globals['Elite Sniper Upgrade Cost']
+
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        #WARNING: There can only be one e-sniper at a time!
+        if game_state.elite_sniper is not None:
+            game_state.warn("WARNING! Tried to purchase an Elite Sniper when one already exists! Aborting buy queue!")
+            game_state.valid_action_flag = False
+        return PurchaseHandler.check(self, game_state, dict_obj, payout_time, h_cash, h_loan)
+
+    def apply(self, game_state, dict_obj, payout_time):
+        ind = dict_obj['Index']
+        game_state.elite_sniper = ind
+        game_state.supply_drops[ind].upgrade()
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Upgrading the supply drop at index %s into an elite sniper!"%(ind))
+
+class RepeatedlyBuySupplyDropsHandler(PurchaseHandler):
+    #There is no checking stage for this action
+    def apply(self, game_state, dict_obj, payout_time):
+        game_state.supply_drop_max_buy_time = dict_obj['Maximum Buy Time']
+        game_state.supply_drop_buffer = dict_obj['Buffer']
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Triggered automated supply drop purchases until time %s"%(game_state.supply_drop_max_buy_time))
+
+# %%
+# HELI FARM RELATED MATTERS
+
+class BuyHeliFarmHandler(PurchaseHandler):
+    def price(self, game_state, dict_obj):
+        return heli_globals['Heli Farm Cost']
+
+    def apply(self, game_state, dict_obj, payout_time):
+        new_index = game_state.heli_farms.add(payout_time)
+        game_state.payout_scheduler.resetSource(game_state, HELI_SOURCE, new_index, payout_time)
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Purchased a heli farm!")
+
+class SellHeliFarmHandler(ActionHandler):
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        return checkAltEcoSale(game_state, game_state.heli_farms[dict_obj['Index']], h_cash, h_loan)
+
+    def apply(self, game_state, dict_obj, payout_time):
+        ind = dict_obj['Index']
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Selling the heli farm at index %s"%(ind))
+        #If the heli farm we're selling is actually a special poperations, then...
+        if game_state.special_poperations is not None:
+            if ind == game_state.special_poperations:
+                if game_state.log_level >= LOG_EVENTS:
+                    game_state.logs.append("The heli farm being sold is a special poperations!")
+                game_state.special_poperations = None
+
+        game_state.heli_farms[ind].sell(payout_time)
+        game_state.payout_scheduler.removeSource(HELI_SOURCE, ind)
+
+class BuySpecialPoperationsHandler(PurchaseHandler):
+    def price(self, game_state, dict_obj):
+        return heli_globals['Special Poperations Upgrade Cost']
+
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        #WARNING: There can only be one Special Poperations on screen at a time!
+        if game_state.special_poperations is not None:
+            game_state.warn("WARNING! Tried to purchase Special Poperations when one already exists! Aborting buy queue!")
+            game_state.valid_action_flag = False
+        return PurchaseHandler.check(self, game_state, dict_obj, payout_time, h_cash, h_loan)
+
+    def apply(self, game_state, dict_obj, payout_time):
+        ind = dict_obj['Index']
+        game_state.special_poperations = ind
+        game_state.heli_farms[ind].upgrade()
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Upgrading the heli farm at index %s into special poperations!"%(ind))
+
+class RepeatedlyBuyHeliFarmsHandler(PurchaseHandler):
+    #This action does not have a checking stage.
+    def apply(self, game_state, dict_obj, payout_time):
+        game_state.heli_farm_max_buy_time = dict_obj['Maximum Buy Time']
+        game_state.heli_farm_buffer = dict_obj['Buffer']
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Triggered automated heli farm purchases until time %s"%(game_state.heli_farm_max_buy_time))
+
+# %%
+# JERICHO RELATED MATTERS
+
+class JerichoStealHandler(ActionHandler):
+    def apply(self, game_state, dict_obj, payout_time):
+        game_state.jericho_steal_time = dict_obj['Minimum Buy Time']
+        game_state.jericho_steal_amount = dict_obj['Steal Amount']
+        game_state.payout_scheduler.resetSource(game_state, JERICHO_SOURCE, 0, payout_time)
+        game_state.cash, game_state.loan = impact(game_state.cash, game_state.loan, dict_obj['Steal Amount']) #If this line is not here, the sim would fail to capture the jeri payment that occurs immediately upon activation.
+
+# %%
+# OVERCLOCK RELATED MATTERS
+
+class BuyOverclockHandler(PurchaseHandler):
+    def price(self, game_state, dict_obj):
+        return engi_globals['Overclock Cost']
+
+    def apply(self, game_state, dict_obj, payout_time):
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Purchasing overclock!")
+        game_state.overclocks.append({
+            'Initial Purchase Time': payout_time,
+            'Use Time': payout_time,
+            'Sell Time': None
+        })
+
+class UseOverclockHandler(PurchaseHandler):
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        overclock = game_state.overclocks[dict_obj['Engineer Index']]
+        if overclock['Sell Time'] is not None:
+            game_state.warn("WARNING! Tried to use an overclock that was already sold! Aborting buy queue!")
+            game_state.valid_action_flag = False
+        return h_cash, h_loan
+
+    def apply(self, game_state, dict_obj, payout_time):
+        ind = dict_obj['Engineer Index']
+        overclock = game_state.overclocks[ind]
+
+        # Overclock the farm
+        farm = game_state.farms[dict_obj['Farm Index']]
+        farm.overclock(payout_time)
+
+        # Update the use time of the overclock
+        if game_state.ultraboost_index is not None and ind == game_state.ultraboost_index:
+            #The overclock is in fact an ultraboost
+            overclock['Use Time'] = payout_time + engi_globals['Ultraboost Usage Cooldown']
+        else:
+            #The overclock is just a normal overclock
+            overclock['Use Time'] = payout_time + engi_globals['Overclock Usage Cooldown']
+
+class SellOverclockHandler(ActionHandler):
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        ind = dict_obj['Index']
+        overclock = game_state.overclocks[ind]
+        #Check whether the overclock is actually on screen before selling it:
+        if overclock['Sell Time'] is None:
+            if game_state.ultraboost_index is not None and ind == game_state.ultraboost_index:
+                sell_value = game_globals['Sellback Value']*(engi_globals['Overclock Cost'] + engi_globals['Ultraboost Upgrade Cost'])
+            else:
+                sell_value = game_globals['Sellback Value']*engi_globals['Overclock Cost']
+            h_cash, h_loan = impact(h_cash, h_loan, sell_value)
+        else:
+            game_state.warn("WARNING! Tried to sell an overclock that is not on screen! Aborting buy queue")
+            game_state.valid_action_flag = False
+        return h_cash, h_loan
+
+    def apply(self, game_state, dict_obj, payout_time):
+        ind = dict_obj['Index']
+        overclock = game_state.overclocks[ind]
+        overclock['Sell Time'] = payout_time
+
+        #If the overclock being sold is an ultraboost, update the ultraboost index
+        if game_state.ultraboost_index is not None and ind == game_state.ultraboost_index:
+            game_state.ultraboost_index = None
+
+        if game_state.log_level >= LOG_EVENTS:
+            game_state.logs.append("Selling the overclock at index %s"%(ind))
+
+class BuyUltraboostHandler(ActionHandler):
+    def check(self, game_state, dict_obj, payout_time, h_cash, h_loan):
+        #Do not allow the ultraboost to be purchased if there is already an ultraboost on screen.
+        if game_state.ultraboost_index is not None:
+            game_state.warn("WARNING! There is already an Ultraboost on screen! Aborting buy queue")
+            game_state.valid_action_flag = False
+        return impact(h_cash, h_loan, engi_globals['Ultraboost Upgrade Cost'])
+
+    def apply(self, game_state, dict_obj, payout_time):
+        ind = dict_obj['Index']
+        overclock = game_state.overclocks[ind]
+        overclock['Use Time'] = payout_time #The Ultraboost ability is battle ready.
+        game_state.ultraboost_index = ind
+
+# %%
+registerAction('Buy Defense', BuyDefenseHandler())
+registerAction('Buy Farm', BuyFarmHandler())
+registerAction('Upgrade Farm', UpgradeFarmHandler())
+registerAction('Sell Farm', SellFarmHandler())
+registerAction('Sell All Farms', SellAllFarmsHandler())
+registerAction('Withdraw Bank', WithdrawBankHandler())
+registerAction('Withdraw All Banks', WithdrawAllBanksHandler())
+registerAction('Activate IMF', ActivateIMFHandler())
+registerAction('Buy Boat Farm', BuyBoatFarmHandler())
+registerAction('Upgrade Boat Farm', UpgradeBoatFarmHandler())
+registerAction('Sell Boat Farm', SellBoatFarmHandler())
+registerAction('Buy Druid Farm', BuyDruidFarmHandler())
+registerAction('Sell Druid Farm', SellDruidFarmHandler())
+registerAction('Buy Spirit of the Forest', BuySpiritOfTheForestHandler())
+registerAction('Repeatedly Buy Druid Farms', RepeatedlyBuyDruidFarmsHandler())
+registerAction('Buy Supply Drop', BuySupplyDropHandler())
+registerAction('Sell Supply Drop', SellSupplyDropHandler())
+registerAction('Buy Elite Sniper', BuyEliteSniperHandler())
+registerAction('Repeatedly Buy Supply Drops', RepeatedlyBuySupplyDropsHandler())
+registerAction('Buy Heli Farm', BuyHeliFarmHandler())
+registerAction('Sell Heli Farm', SellHeliFarmHandler())
+registerAction('Buy Special Poperations', BuySpecialPoperationsHandler())
+registerAction('Repeatedly Buy Heli Farms', RepeatedlyBuyHeliFarmsHandler())
+registerAction('Jericho Steal', JerichoStealHandler())
+registerAction('Buy Overclock', BuyOverclockHandler())
+registerAction('Use Overclock', UseOverclockHandler())
+registerAction('Sell Overclock', SellOverclockHandler())
+registerAction('Buy Ultraboost', BuyUltraboostHandler())
@@ -283,6 +283,40 @@ def computeSellbackValues(farm_upgrades_costs, farm_cost):
 farm_total_cost_values, farm_sellback_values = computeSellbackValues(farm_upgrades_costs, farm_cost)
 farm_total_cost_values[(0,0,0)] = farm_cost
 
+#~~~~~~~~~~~~~~~~~~~
+# DENSE FARM TABLES
+#~~~~~~~~~~~~~~~~~~~
+
+# The dictionaries above are keyed by upgrade tuples, which means every lookup has to build and hash a tuple.
+# The simulator looks these values up constantly, so we also store them in flat lists indexed by a single integer code for each upgrade state.
+# Since each path has tiers 0 through 5, the upgrade state (i,j,k) gets the code 36*i + 6*j + k.
+# Upgrade states which aren't legal in the game (like (3,3,0)) have the value None in every table.
+
+farm_code_count = 216
+
+# Adding farm_path_steps[i] to the code of a farm gives the code of the farm with path i upgraded once more.
+farm_path_steps = (36, 6, 1)
+
+def farmCode(upgrades):
+    return 36*upgrades[0] + 6*upgrades[1] + upgrades[2]
+
+def farmUpgrades(code):
+    return (code//36, (code//6)%6, code%6)
+
+farm_payout_amounts = [None]*farm_code_count
+farm_payout_frequencies = [None]*farm_code_count
+farm_round_incomes = [None]*farm_code_count # Income per round, not counting MWS bonuses, bank interest, or any buffs
+farm_sell_values = [None]*farm_code_count
+farm_total_costs = [None]*farm_code_count
+
+for upgrades, (amount, frequency) in farm_payout_values.items():
+    code = farmCode(upgrades)
+    farm_payout_amounts[code] = amount
+    farm_payout_frequencies[code] = frequency
+    farm_round_incomes[code] = amount*frequency
+    farm_sell_values[code] = farm_sellback_values[upgrades]
+    farm_total_costs[code] = farm_total_cost_values[upgrades]
+
 # %%
 
 dirname = os.path.dirname(__file__)
@@ -321,6 +355,82 @@ with open(filename, newline='') as csvfile:
                 'Cost Intensity': float(row[1])/float(row[5]) if float(row[5]) > 0 else 0
             }
 
+#~~~~~~~~~~~~~~~~~~~~~~~~~
+# ECO SENDS BY ROUND
+#~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Which eco sends are available only depends on the round, so we work out the available sends (and the efficient eco frontier among them) for every round once, here.
+
+def computeAvailableSends(round_number):
+    #Returns a tuple of the names of the eco sends available in the given round, in the order they appear in eco_send_info
+    return tuple(send_name for send_name, info in eco_send_info.items() if info['Start Round'] <= round_number <= info['End Round'])
+
+def computeEfficientFrontier(eco_sends):
+    '''
+    Given a list of eco sends, determine which ones belong to the efficient eco frontier
+    
+    Parameters:
+    eco_sends (List[str]): A list containing names of eco sends for consideration. The list is not modified.
+
+    Returns:
+    (tuple): The names of the non-dominated pure eco sends, in increasing order of cost intensity (and eco intensity)
+    '''
+    if len(eco_sends) == 0:
+        return ()
+
+    # First, sort the sends based on cost intensity
+    eco_sends = sorted(eco_sends, key = lambda send_name: eco_send_info[send_name]['Cost Intensity'])
+
+    # Now determine the indices that correspond to eef sends
+    i = 0
+    eef = [0]
+    while i < len(eco_sends)-1:
+        
+        #Test remaining eco sends to determine which ones belong on the EEF
+        slope = 0
+        index = None
+        for j in range(i+1,len(eco_sends)):
+            test_num = eco_send_info[eco_sends[j]]['Eco Intensity'] - eco_send_info[eco_sends[i]]['Eco Intensity']
+            test_den = eco_send_info[eco_sends[j]]['Cost Intensity'] - eco_send_info[eco_sends[i]]['Cost Intensity']
+            test_val = test_num/test_den
+            if test_val > slope:
+                slope = test_val
+                index = j
+                
+        # When the correct index is discovered, append it to eef
+        if index is not None and index > i:
+            eef.append(index)
+            i = index
+        else:
+            #It is possible we may run out of eco sends to add to the frontier, in which case...
+            break
+        
+    return tuple(eco_sends[ind] for ind in eef)
+
+max_send_round = max(info['End Round'] for info in eco_send_info.values())
+
+available_sends_by_round = tuple(computeAvailableSends(round_number) for round_number in range(max_send_round + 1))
+eco_frontier_by_round = tuple(computeEfficientFrontier(sends) for sends in available_sends_by_round)
+# The eco intensities of the sends in each frontier, for bisecting
+eco_frontier_intensities_by_round = tuple(tuple(eco_send_info[send_name]['Eco Intensity'] for send_name in frontier) for frontier in eco_frontier_by_round)
+
+def availableSends(round_number):
+    #Returns a tuple of the names of the eco sends available in the given round
+    if 0 <= round_number <= max_send_round and round_number == int(round_number):
+        return available_sends_by_round[int(round_number)]
+    return computeAvailableSends(round_number)
+
+def ecoFrontier(round_number):
+    '''
+    Returns:
+    frontier (tuple): The names of the sends on the efficient eco frontier in the given round, in increasing order of eco intensity
+    intensities (tuple): The eco intensity of each of those sends
+    '''
+    if 0 <= round_number <= max_send_round and round_number == int(round_number):
+        return eco_frontier_by_round[int(round_number)], eco_frontier_intensities_by_round[int(round_number)]
+    frontier = computeEfficientFrontier(computeAvailableSends(round_number))
+    return frontier, tuple(eco_send_info[send_name]['Eco Intensity'] for send_name in frontier)
+
 # %%
 
 
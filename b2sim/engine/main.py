@@ -1,34 +1,61 @@
 # %%
 from math import floor, ceil
+from collections import deque
+from bisect import bisect_left, insort
 from b2sim.engine.info import *
 from b2sim.engine.actions import *
 from b2sim.engine.farms import *
+from b2sim.engine.schedule import *
+from b2sim.engine.queues import *
+from b2sim.engine.handlers import *
 from copy import deepcopy as dc
 
 # %%
 
-
-# %%
-def impact(cash: float, loan: float, amount: float):
-    #If the amount is positive (like a payment), half of the payment should be directed to the outstanding loan
-    #If the amount is negative (like a purchase), then we can treat it "normally"
-    if amount > 0:
-        if amount > 2*loan:
-            cash = cash + amount - loan
-            loan = 0
-        else:
-            cash = cash + amount/2
-            loan = loan - amount/2
-    else: 
-        cash = cash + amount
-    return cash, loan
-
 def writeLog(lines, filename = 'log', path = 'logs/'):
     with open(path + filename + '.txt', 'w') as f:
         for line in lines:
             f.write(line)
             f.write('\n')
 
+# Lists of the game state which are only ever appended to during simulation.
+# Snapshots of the game state share these lists with the game state rather than copy them.
+append_only_lists = ('logs', 'warnings', 'time_states', 'cash_states', 'eco_states', 'farm_revenues', 'farm_expenses', 'event_messages')
+
+def copyState(state: dict):
+    '''
+    Helper function for GameState.snapshot and GameState.restore. Given the attributes of a game state, 
+    copy the parts of it which the simulator modifies in place and share everything else.
+
+    Parameters:
+    state (dict): The attributes of a game state (as in, game_state.__dict__)
+
+    Returns:
+    (dict): A new dictionary of attributes which can be modified by simulation without affecting the given one
+    '''
+    state = state.copy()
+    state['farms'] = [farm.copy() for farm in state['farms']]
+    state['active_farms'] = list(state['active_farms'])
+    state['farm_sell_order'] = list(state['farm_sell_order'])
+    state['boat_farms'] = {key: boat_farm.copy() for key, boat_farm in state['boat_farms'].items()}
+    for name in ('druid_farms', 'supply_drops', 'heli_farms'):
+        state[name] = state[name].copy()
+    state['overclocks'] = [overclock.copy() for overclock in state['overclocks']]
+    state['eco_queue'] = [send.copy() for send in state['eco_queue']]
+    # The actions in the buy queue are never modified in place, so only the queue itself has to be copied
+    state['buy_queue'] = list(state['buy_queue'])
+    state['buy_times'] = list(state['buy_times'])
+    state['attack_queue'] = state['attack_queue'].copy()
+    state['T5_exists'] = list(state['T5_exists'])
+    state['payout_scheduler'] = state['payout_scheduler'].copy()
+    state['revenue_journal'] = RevenueJournal()
+
+    # In the 'Window', 'Callback', and 'Buffer' history modes, the cash and eco histories are (short) deques which drop old entries, so they can't be shared.
+    for name in ('time_states', 'cash_states', 'eco_states'):
+        if type(state[name]) == deque:
+            state[name] = state[name].copy()
+    return state
+
 # %%
 class GameState():
 
@@ -38,6 +65,13 @@ class GameState():
         #INITIALIZING THE GAME STATE
         ############################
         
+        #How much information should the game state write to its logs?
+        #The default is to log everything. For large batches of simulations, setting 'Log Level' to 'Off' saves a good deal of time and memory.
+        #NOTE: This has to be set first because the code below may write to the logs!
+        self.log_level = log_levels[initial_state.get('Log Level', 'Debug')]
+        self.logs = [] #To ensure the code runs properly, we'll create a log file which the code writes to track what it's doing
+        self.warnings = [] #These are messages describing where fail-safes or other unexpecated events are triggered.
+
         #Initial cash and eco and loan values
         self.cash = initial_state.get('Cash')
         self.eco = initial_state.get('Eco')
@@ -67,13 +101,50 @@ class GameState():
         #LOGGING
         #~~~~~~~
 
-        self.logs = [] #To ensure the code runs properly, we'll create a log file which the code writes to track what it's doing
-        self.warnings = [] #These are indices corresponding to log messages where fail-safes or other unexpecated events are triggered.
-
         #As the Game State evolves, I'll use these arrays to track how cash and eco have changed over time
-        self.time_states = [self.current_time]
-        self.cash_states = [self.cash] 
-        self.eco_states = [self.eco]
+        #The 'History Mode' of the initial state determines how much of this history is kept:
+        # - 'Full': Record the cash and eco after every payout (the default)
+        # - 'Downsample': Record at most one entry every 'History Resolution' seconds
+        # - 'Window': Keep only the last 'History Length' entries
+        # - 'Callback': Pass each entry to the function 'History Callback' as callback(time, cash, eco)
+        # - 'Buffer': Write each entry as a row (time, cash, eco) into the preallocated buffer 'History Buffer' (for instance, a NumPy array of shape (n,3))
+        #In the 'Callback' and 'Buffer' modes, the game state itself only remembers the last two entries.
+        self.history_mode = initial_state.get('History Mode', 'Full')
+        if self.history_mode not in ('Full', 'Downsample', 'Window', 'Callback', 'Buffer'):
+            raise ValueError("Unknown history mode %s"%(self.history_mode))
+        #Each of the remaining modes needs an extra entry in the initial state to work with
+        if self.history_mode == 'Downsample' and not initial_state.get('History Resolution', 0) > 0:
+            raise ValueError("The 'Downsample' history mode requires a positive 'History Resolution'")
+        if self.history_mode == 'Callback' and initial_state.get('History Callback') is None:
+            raise ValueError("The 'Callback' history mode requires a 'History Callback'")
+        if self.history_mode == 'Buffer' and initial_state.get('History Buffer') is None:
+            raise ValueError("The 'Buffer' history mode requires a 'History Buffer'")
+
+        if self.history_mode == 'Full' or self.history_mode == 'Downsample':
+            self.time_states = []
+            self.cash_states = []
+            self.eco_states = []
+        else:
+            if self.history_mode == 'Window':
+                history_length = initial_state.get('History Length', 2)
+            else:
+                history_length = 2
+            self.time_states = deque(maxlen = history_length)
+            self.cash_states = deque(maxlen = history_length)
+            self.eco_states = deque(maxlen = history_length)
+
+        self.history_resolution = initial_state.get('History Resolution')
+        self.next_history_time = self.current_time
+        self.history_callback = initial_state.get('History Callback')
+        self.history_buffer = initial_state.get('History Buffer')
+        self.history_size = 0 #The number of entries written to the history buffer
+        self.history_dropped = 0 #The number of entries that did not fit into the history buffer
+
+        #When fastForward is run with stepping = 'Event', the cash and eco are only recorded at multiples of self.sample_interval
+        self.sample_interval = None
+        self.next_sample_index = 0
+
+        self.recordHistory(self.current_time)
 
         #I'll use this list to track the amount of money each farm makes over the course of the simulation
         self.farm_revenues = []
@@ -110,9 +181,18 @@ class GameState():
                     if self.farms[-1].upgrades[i] == 5 and self.T5_exists[i] == False:
                         self.T5_exists[i] = True
                     elif self.farms[-1].upgrades[i] == 5 and self.T5_exists[i] == True:
-                        self.logs.append("Warning! The initial state contained multiple T5 farms. Modifying the initial state to prevent this.")
-                        self.warnings.append(len(self.logs)-1)
-                        self.farms[-1].upgrades[i] = 4
+                        self.warn("Warning! The initial state contained multiple T5 farms. Modifying the initial state to prevent this.")
+                        farm = self.farms[-1]
+                        farm.code -= farm_path_steps[i]
+                        farm.upgrades = farmUpgrades(farm.code)
+
+        # Sold farms are never removed from self.farms, so that the indices of farms in the buy queue stay the same (and so their revenue can still be reported).
+        # The indices of the farms which are still on screen are kept in increasing order in self.active_farms, so that loops over the farms can skip the sold ones.
+        self.active_farms = list(range(len(self.farms)))
+
+        # The active farms are also kept sorted in increasing order of sellback value, as a list of (sellback value, index) pairs.
+        # This lets us find the cheapest farms to sell (see cheapestFarms) without sorting the farms every time.
+        self.farm_sell_order = sorted((farm_sell_values[farm.code], ind) for ind, farm in enumerate(self.farms))
 
         #Next, boat farms!
         boat_info = initial_state.get('Boat Farms')
@@ -121,43 +201,25 @@ class GameState():
         self.boat_key = 0
         if boat_info is not None:
             for boat_entry in boat_info:
+                boat_farm = BoatFarm(boat_entry['Purchase Time'], boat_entry['Upgrade'], boat_entry['Expenses'])
+                boat_farm.initial_purchase_time = boat_entry['Initial Purchase Time']
                 #If the boat farm is a Tempire, mark it as such appropriately.
                 #Do not allow the user to initialize with multiple Tempires!
-                if boat_entry['Upgrade'] == 5 and self.Tempire_exists[i] == False:
+                if boat_farm.tier == 5 and self.Tempire_exists == False:
                     self.Tempire_exists = True
-                elif boat_entry['Upgrade'] == 5 and self.Tempire_exists[i] == True:
-                    boat_entry['Upgrade'] = 4
-                self.boat_farms[self.boat_key] = boat_entry
+                elif boat_farm.tier == 5 and self.Tempire_exists == True:
+                    self.warn("Warning! The initial state contained multiple Trade Empires. Modifying the initial state to prevent this.")
+                    boat_farm.tier = 4
+                self.boat_farms[self.boat_key] = boat_farm
 
                 self.boat_key += 1
                 
-
-        #Next, druid farms!
-        self.druid_farms = initial_state.get('Druid Farms')
-        if self.druid_farms is not None:
-            self.sotf = self.druid_farms['Spirit of the Forest Index']
-            self.druid_key = len(self.druid_farms) - 2
-        else:
-            self.sotf = None
-            self.druid_key = 0
-
-        #Next, supply drops!
-        self.supply_drops = initial_state.get('Supply Drops')
-        if self.supply_drops is not None:
-            self.elite_sniper = self.supply_drops['Elite Sniper Index']
-            self.sniper_key = len(self.supply_drops) - 2
-        else:
-            self.elite_sniper = None
-            self.sniper_key = 0
-
-        #Next, heli farms!
-        self.heli_farms = initial_state.get('Heli Farms')
-        if self.heli_farms is not None:
-            self.special_poperations = self.heli_farms['Special Poperations Index']
-            self.heli_key = len(self.heli_farms) - 2
-        else:
-            self.special_poperations = None
-            self.heli_key = 0
+        #Next, druid farms, supply drops, and heli farms!
+        #In the initial state, these are given as dictionaries whose integer keys map to purchase times (see initDruidFarms in actions.py),
+        #plus one extra key which says which (if any) of them is upgraded. We store each type of tower column-wise in an AltEcoFarms object.
+        self.druid_farms, self.sotf = self.initAltEco(initial_state.get('Druid Farms'), DruidFarm, 'Spirit of the Forest Index')
+        self.supply_drops, self.elite_sniper = self.initAltEco(initial_state.get('Supply Drops'), SupplyDrop, 'Elite Sniper Index')
+        self.heli_farms, self.special_poperations = self.initAltEco(initial_state.get('Heli Farms'), HeliFarm, 'Special Poperations Index')
 
         # Next, overclocks!
         overclock_info = initial_state.get('Overclocks')
@@ -209,25 +271,32 @@ class GameState():
         if len(self.eco_queue) == 0: # In case there's no specified sends at all
             self.eco_queue = [ecoSend(time = 0, send_name = 'Zero')]
 
-        self.available_sends = [] # Tracks the available eco sends at a given point in time.
-        for send_name in eco_send_info.keys():
-            if eco_send_info[send_name]['Start Round'] <= self.current_round <= eco_send_info[send_name]['End Round']:
-                self.available_sends.append(send_name)
+        self.available_sends = availableSends(self.current_round) # Tracks the available eco sends at a given point in time. This is a tuple shared with info.py, so don't modify it!
         self.last_checked_round = self.current_round
 
         #Upgrade queue
         self.buy_queue = initial_state.get('Buy Queue')
-        self.buy_cost = None
+        self.buy_plan = None # The entry at the front of the buy queue which the code has already expanded and validated (see compileBuyEntry)
+        self.buy_costs = None # The cost of each action in self.buy_plan, or None if the plan isn't just a list of purchases
+        self.buy_buffer = 0 # The total buffer of the actions in self.buy_plan
+        self.revenue_journal = RevenueJournal() # The revenue towers would make from the buy queue entry being checked
         self.buffer = 0
         self.min_buy_time = None
+        self.buy_times = [] # The time at which each entry of the buy queue was bought, in the order they were bought
 
         #Attack queue - This is the list of bloons in the center of the screen that pops up whenever you send eco
-        self.attack_queue = []
+        self.attack_queue = AttackQueue(game_globals['Max Queue Length'])
         self.attack_queue_unlock_time = self.current_time
         self.eco_delay = game_globals['Eco Delay']
         self.max_queue_length = game_globals['Max Queue Length']
         self.attack_queue_threshold = game_globals['Max Queue Length']
 
+        #How updateEco simulates eco sends:
+        # - 'Per Send': Simulate sends one at a time (the default)
+        # - 'Bulk': Whenever the attack queue is full, sends go out at a steady pace, so work out how many sends occur before the next payout and apply them all at once.
+        #   This is faster, but because the cash and eco are computed with multiplication rather than repeated addition, results may differ from 'Per Send' by floating point rounding.
+        self.eco_mode = initial_state.get('Eco Mode', 'Per Send')
+
         #For the AI
         self.save = 0 # When eco'ing, we will not let our cash dip below this amount.
 
@@ -253,21 +322,56 @@ class GameState():
             self.buy_queue = []
         if self.loan is None:
             self.loan = 0
-        if self.boat_farms is None:
-            self.boat_farms = {}
-        if self.druid_farms is None:
-            self.druid_farms = {}
-        if self.heli_farms is None:
-            self.heli_farms = {}
-        if self.supply_drops is None:
-            self.supply_drops = {}
         self.simulation_start_time = 0
+
+        #~~~~~~~~~~~~~~~~~~~
+        #THE PAYOUT SCHEDULE
+        #~~~~~~~~~~~~~~~~~~~
+
+        # The payout scheduler holds the next payout of every source of income in the game state.
+        # WARNING: If you modify the farms/alt-eco of the game state directly (rather than through the buy queue), call self.payout_scheduler.reset(self, self.current_time) afterwards!
+        self.payout_scheduler = PayoutScheduler(self)
             
-        self.logs.append("MESSAGE FROM GameState.__init__(): ")
-        self.logs.append("Initialized Game State!")
-        self.logs.append("The current game round is %s"%(self.current_round))
-        self.logs.append("The current game time is %s seconds"%(self.current_time))
-        self.logs.append("The game round start times are given by %s \n"%(self.rounds.round_starts))
+        if self.log_level >= LOG_DEBUG:
+            self.logs.append("MESSAGE FROM GameState.__init__(): ")
+            self.logs.append("Initialized Game State!")
+            self.logs.append("The current game round is %s"%(self.current_round))
+            self.logs.append("The current game time is %s seconds"%(self.current_time))
+            self.logs.append("The game round start times are given by %s \n"%(self.rounds.round_starts))
+
+    def initAltEco(self, info, tower_class, upgraded_key):
+        '''
+        Helper method for __init__. Converts the druid farm, supply drop, or heli farm info from the initial state into an AltEcoFarms store.
+
+        Parameters:
+        info (dict): The info given by initDruidFarms, initSupplyDrops, or initHeliFarms in actions.py (or None)
+        tower_class (type): DruidFarm, SupplyDrop, or HeliFarm
+        upgraded_key (str): The key of info which gives the index of the upgraded tower
+
+        Returns:
+        towers (AltEcoFarms): The towers, indexed in order of their keys in info
+        upgraded_index (int): The index of the upgraded tower, or None if there isn't one
+        '''
+        if info is None:
+            return AltEcoFarms(tower_class), None
+        keys = sorted(key for key in info.keys() if type(key) == int)
+        upgraded_index = keys.index(info[upgraded_key]) if info.get(upgraded_key) is not None else None
+        return AltEcoFarms(tower_class, [info[key] for key in keys], upgraded_index), upgraded_index
+
+    def trackAltEcoRevenue(self, source, index, revenue):
+        #Helper method for advanceGameState. Credits the revenue from a payout to the boat farm, druid farm, supply drop, or heli farm that generated it.
+        if source == DRUID_SOURCE or source == SOTF_SOURCE:
+            self.druid_farms.revenue[index] += revenue
+        elif source == SNIPER_SOURCE:
+            self.supply_drops.revenue[index] += revenue
+        elif source == HELI_SOURCE:
+            self.heli_farms.revenue[index] += revenue
+        elif source == BOAT_SOURCE:
+            #Boat farms are paid out all at once, so split the payment between the active boat farms according to how much each one pays
+            active_boats = [boat_farm for boat_farm in self.boat_farms.values() if boat_farm.sell_time is None]
+            total_payout = sum(boat_farm.payout() for boat_farm in active_boats)
+            for boat_farm in active_boats:
+                boat_farm.revenue += revenue*boat_farm.payout()/total_payout
 
     def sortFarms(self, debug = False):
         '''
@@ -278,44 +382,67 @@ class GameState():
 
         if len(self.farms) > 0:
             # print(self.farms)
-            def crit(farm):
-                val = farm_total_cost_values[tuple(farm.upgrades)]
-                # print("val: %s"%(val))
-                if farm.sell_time:
-                    # Since no single farm costs $200,000 or more, this causes all inactive farms to be sorted *last* when we sort in increasing order
-                    val += 200000
-                return val
-            
-            self.farms.sort(key=crit)
-        
+            # Inactive farms are sorted *last*, and otherwise farms are sorted in increasing order of cost
+            keys = [(farm.sell_time is not None, farm_total_costs[farm.code]) for farm in self.farms]
+
+            # If the farms are already in order (as they usually are when the AI calls this method), there's nothing to do
+            if any(keys[i] > keys[i+1] for i in range(len(keys) - 1)):
+                order = sorted(range(len(self.farms)), key = keys.__getitem__)
+                self.farms[:] = [self.farms[i] for i in order]
+                self.active_farms = list(range(len(self.active_farms)))
+                self.farm_sell_order = sorted((farm_sell_values[self.farms[ind].code], ind) for ind in self.active_farms)
+
+                # Sorting the farms changes their indices, so the payouts of every farm need to be rescheduled
+                self.payout_scheduler.resetFarms(self, self.current_time)
+
+                # ...and the entry at the front of the buy queue needs to be compiled again
+                self.buy_plan = None
+
         if debug:
             print(self.farms)
 
     def argsortFarms(self):
         '''
-        Returns a list of indices corresponding to farms sorted by the following criteria:
-        1. Active vs. inactive farms (active farms go first)
-        2. Increasing sellback value
+        Returns a list of indices corresponding to the active farms, sorted in increasing order of sellback value
 
         Returns None if no farms (active or inactive) are present
         '''
-        # print("RUNNING ARGSORT")
         if len(self.farms) > 0:
-            def crit(n):
-                farm = self.farms[n]
-                val = farm_sellback_values[tuple(farm.upgrades)]
-                if farm.sell_time:
-                    val = val + 200000
-                return val
-            
-            arg_list = [i for i in range(len(self.farms))]
-            arg_list.sort(key=crit)
-            # print("RESULT: %s"%(arg_list))
-            return arg_list
+            return self.cheapestFarms()
         else:
             # print("WARNING! No farms to sort!")
             return None
 
+    def cheapestFarms(self, k = None, exclude = None):
+        '''
+        Find the k active farms with the lowest sellback values.
+
+        Parameters:
+        k (int): How many farms to return. If None, every active farm is returned.
+        exclude (int): The index of a farm to leave out, if any (for example, the farm we're selling the others to upgrade)
+
+        Returns:
+        (List[int]): The indices of the farms, in increasing order of sellback value
+        '''
+        indices = []
+        for sell_value, ind in self.farm_sell_order:
+            if k is not None and len(indices) >= k:
+                break
+            if ind != exclude:
+                indices.append(ind)
+        return indices
+
+    def addFarmOrder(self, ind):
+        #Helper method for the farm action handlers. Call after buying or upgrading the active farm at index ind.
+        insort(self.farm_sell_order, (farm_sell_values[self.farms[ind].code], ind))
+
+    def removeFarmOrder(self, ind):
+        #Helper method for the farm action handlers. Call before selling or upgrading the active farm at index ind.
+        key = (farm_sell_values[self.farms[ind].code], ind)
+        pos = bisect_left(self.farm_sell_order, key)
+        if pos < len(self.farm_sell_order) and self.farm_sell_order[pos] == key:
+            del self.farm_sell_order[pos]
+
     def checkProperties(self):
         '''
         Helper method for self.ecoQueueCorrection. 
@@ -364,10 +491,7 @@ class GameState():
         # To begin, if necessary, update the list of available eco sends to use.
         if self.last_checked_round is None or self.last_checked_round < self.current_round:
             # If we have yet to form the list of available eco sends...
-            self.available_sends = []
-            for send_name in eco_send_info.keys():
-                if eco_send_info[send_name]['Start Round'] <= self.current_round <= eco_send_info[send_name]['End Round']:
-                    self.available_sends.append(send_name)
+            self.available_sends = availableSends(self.current_round)
             self.last_checked_round = self.current_round
 
         # This flag is set to true when the first send in the queue is known to be valid AND it is not possible to change to that send right now.
@@ -393,7 +517,8 @@ class GameState():
                         #Is the eco send too late?
                         if self.eco_queue[0]['Time'] >= self.rounds.getTimeFromRound(eco_send_info[self.eco_queue[0]['Send Name']]['End Round']+1):
                             #Yes, the send is too late. Remove it from the queue.
-                            self.logs.append("Warning! Time %s is too late to call %s. Removing from eco queue"%(self.eco_queue[0]['Time'],self.eco_queue[0]['Send Name']))
+                            if self.log_level >= LOG_EVENTS:
+                                self.logs.append("Warning! Time %s is too late to call %s. Removing from eco queue"%(self.eco_queue[0]['Time'],self.eco_queue[0]['Send Name']))
                             self.eco_queue.pop(0)
                             
                         else:
@@ -404,7 +529,8 @@ class GameState():
                             candidate_time = self.rounds.getTimeFromRound(eco_send_info[self.eco_queue[0]['Send Name']]['Start Round'])
                             if self.eco_queue[0]['Time'] < candidate_time:
                                 #Yes, the send is too early
-                                self.logs.append("Warning! Time %s is too early to call %s. Adjusting the queue time to %s"%(self.eco_queue[0]['Time'],self.eco_queue[0]['Send Name'], candidate_time))
+                                if self.log_level >= LOG_EVENTS:
+                                    self.logs.append("Warning! Time %s is too early to call %s. Adjusting the queue time to %s"%(self.eco_queue[0]['Time'],self.eco_queue[0]['Send Name'], candidate_time))
                                 self.eco_queue[0]['Time'] = candidate_time
                                 #Is the adjusted time still valid?
                                 print(self.eco_queue)
@@ -414,7 +540,8 @@ class GameState():
                                     break_flag = True
                                 else:
                                     #No, it's not valid
-                                    self.logs.append("Warning! Time %s is too late to call %s because the next item in the eco queue is slated to come earlier. Removing from eco queue"%(self.eco_queue[0]['Time'],self.eco_queue[0]['Send Name']))
+                                    if self.log_level >= LOG_EVENTS:
+                                        self.logs.append("Warning! Time %s is too late to call %s because the next item in the eco queue is slated to come earlier. Removing from eco queue"%(self.eco_queue[0]['Time'],self.eco_queue[0]['Send Name']))
                                     self.eco_queue.pop(0)
                             else:
                                 #No, the send is not too early
@@ -489,31 +616,29 @@ class GameState():
         # Check if the given send name corresponds to a valid send. If not, default to the zero send.
         eco_send_keys = list(eco_send_info.keys())
         if eco_send_keys.count(send_info['Send Name']) == 0:
-            self.logs.append("Warning! The name %s does not correspond with an eco send! Switching to the zero send."%(send_info['Send Name']))
+            self.warn("Warning! The name %s does not correspond with an eco send! Switching to the zero send."%(send_info['Send Name']))
             send_info['Send Name'] = 'Zero'
-            self.warnings.append(len(self.logs) - 1)
 
         self.current_round = self.rounds.getRoundFromTime(self.current_time)
 
         # FAIL SAFE: Switch to the zero send instead if the send is not yet available, and reinsert the send we tried to switch to back into the eco queue.
         if self.current_round < eco_send_info[send_info['Send Name']]['Start Round']:
-            self.logs.append("Warning! The eco send %s is not available yet! Switching to the zero send for now, we will attempt to use this send later."%(send_info['Send Name']))
-            self.warnings.append(len(self.logs) - 1)
+            self.warn("Warning! The eco send %s is not available yet! Switching to the zero send for now, we will attempt to use this send later."%(send_info['Send Name']))
             send_info['Time'] = self.rounds.getTimeFromRound(eco_send_info[send_info['Send Name']]['Start Round'])
-            self.logs.append("We are about to insert the following send into the eco queue: ")
-            self.logs.append(str(send_info))
+            if self.log_level >= LOG_DEBUG:
+                self.logs.append("We are about to insert the following send into the eco queue: ")
+                self.logs.append(str(send_info))
             self.eco_queue.insert(0,dc(send_info))
             send_info['Send Name'] = 'Zero'
-            self.logs.append("The next item in the eco queue now looks like this: ")
-            self.logs.append(str(self.eco_queue[0]))
+            if self.log_level >= LOG_DEBUG:
+                self.logs.append("The next item in the eco queue now looks like this: ")
+                self.logs.append(str(self.eco_queue[0]))
         
         # FAIL SAFE: Switch to the zero send if the send is no longer available.
         # The only scenario this should trigger is if the initially specified eco send is no good.
         if self.current_round > eco_send_info[send_info['Send Name']]['End Round']:
-            self.logs.append("Warning! The eco send %s is no longer available! Switching to the zero send."%(send_info['Send Name']))
-            self.logs.append("Warning! The above message occurred during the changeEcoSend method, which means something's probably wrong with the code!")
-            self.warnings.append(len(self.logs) - 1)
-            self.warnings.append(len(self.logs) - 2)
+            self.warn("Warning! The eco send %s is no longer available! Switching to the zero send."%(send_info['Send Name']))
+            self.warn("Warning! The above message occurred during the changeEcoSend method, which means something's probably wrong with the code!")
             send_info['Send Name'] = 'Zero'
 
 
@@ -551,31 +676,137 @@ class GameState():
         #Setting the queue threshold
         self.attack_queue_threshold = send_info['Queue Threshold']
 
-        self.logs.append("Modified the eco send to %s"%(self.send_name))
+        if self.log_level >= LOG_EVENTS:
+            self.logs.append("Modified the eco send to %s"%(self.send_name))
         self.event_messages.append({
             'Time': self.current_time, 
             'Type': "Eco",
             'Message': "Change eco to %s"%(self.send_name)
         })
 
+    def recordHistory(self, time):
+        '''
+        Record the game state's current cash and eco in the cash and eco history, according to the game state's history mode.
+
+        Parameters:
+        time (float): The time to associate with the current cash and eco values
+
+        Returns:
+        None
+        '''
+        if self.history_mode == 'Downsample':
+            if time < self.next_history_time:
+                return None
+            self.next_history_time = (floor(time/self.history_resolution) + 1)*self.history_resolution
+        elif self.history_mode == 'Callback':
+            self.history_callback(time, self.cash, self.eco)
+        elif self.history_mode == 'Buffer':
+            if self.history_size < len(self.history_buffer):
+                self.history_buffer[self.history_size] = (time, self.cash, self.eco)
+                self.history_size += 1
+            else:
+                if self.history_dropped == 0:
+                    self.warn("Warning! The history buffer is full! Further cash and eco values will not be written to it.")
+                self.history_dropped += 1
+
+        self.time_states.append(time)
+        self.cash_states.append(self.cash)
+        self.eco_states.append(self.eco)
+
+    def sampleHistory(self, time, inclusive = False):
+        '''
+        Helper method for event-driven stepping (see fastForward). Record the current cash and eco for every multiple of self.sample_interval 
+        which is before the given time (or at, if inclusive is True) and has not been recorded yet.
+        This should be called right *before* anything changes the cash or eco.
+        '''
+        sample_time = self.next_sample_index*self.sample_interval
+        while sample_time < time or (inclusive and sample_time == time):
+            self.recordHistory(sample_time)
+            self.next_sample_index += 1
+            sample_time = self.next_sample_index*self.sample_interval
+
+    def warn(self, message):
+        '''
+        Record a warning message in both the logs and the list of warnings, unless logging is turned off.
+        '''
+        if self.log_level >= LOG_WARNINGS:
+            self.logs.append(message)
+            self.warnings.append(message)
+
     def showWarnings(self,warnings):
-        for index in warnings:
-            print(self.logs[index])
+        for message in warnings:
+            print(message)
+
+    def snapshot(self):
+        '''
+        Capture the current state of the game state so that we can return to it later with self.restore.
+        This is *much* cheaper than copy.deepcopy(game_state), because only the parts of the game state that are modified in place are copied.
+        The logs, history lists, and event messages are shared with the game state (the snapshot just remembers how long they were),
+        and the rounds object is shared outright.
+
+        Returns:
+        snapshot (dict): An object which can be passed to GameState.restore
+        '''
+        state = copyState(self.__dict__)
+        lengths = {}
+        for name in append_only_lists:
+            if type(state[name]) == list:
+                lengths[name] = len(state[name])
+        return {
+            'State': state,
+            'Lengths': lengths
+        }
+
+    def restore(self, snapshot: dict):
+        '''
+        Return the game state to the state captured by snapshot. The same snapshot can be restored any number of times.
+
+        Parameters:
+        snapshot (dict): An object produced by GameState.snapshot. The snapshot may come from a different game state.
+
+        Returns:
+        None
+        '''
+        state = copyState(snapshot['State'])
+        for name, length in snapshot['Lengths'].items():
+            state[name] = state[name][:length]
+        self.__dict__.clear()
+        self.__dict__.update(state)
+
+    def fork(self):
+        '''
+        Create an independent copy of the game state which can be simulated without affecting this one.
+        Use this instead of copy.deepcopy(game_state) for what-if analysis.
+
+        Returns:
+        (GameState): The copy of the game state
+        '''
+        game_state = GameState.__new__(GameState)
+        game_state.restore(self.snapshot())
+        return game_state
         
-    def fastForward(self, target_time = None, target_round = None, interval = 0.1):
+    def fastForward(self, target_time = None, target_round = None, interval = 0.1, stepping = 'Interval'):
         '''
         Simulates the game state over the time period (self.current_time, target_time].
 
+        There are two ways the simulator can step through time:
+        - 'Interval': Advance the game state interval seconds at a time, checking the buy queue and recording the cash and eco at every payout and at the end of every interval.
+        - 'Event': Advance the game state from payout to payout, stopping only when a purchase becomes available, a round starts, or the eco send changes.
+          The cash and eco are recorded at every multiple of interval, but the results of the simulation do not depend on interval.
+        Note that the two modes do not give identical results, since in 'Interval' mode purchases can only be made at payouts or at the end of an interval.
+
         Parameters:
         target_time: The time the simulation should end at
         target_round: The round the simulation should end at. If both a target_time and a target_round are given, the code will prioritize the target_round
         interval: Determines how frequently the code will record cash and eco values.
+        stepping: Either 'Interval' or 'Event'
 
         Returns:
         None
         '''
 
-        self.logs.append("MESSAGE FROM GameState.fastForward: ")
+        if self.log_level >= LOG_EVENTS:
+            self.logs.append("MESSAGE FROM GameState.fastForward: ")
         self.valid_action_flag = True #To prevent the code from repeatedly trying to perform a transaction that obviously can't happen
         self.simulation_start_time = self.current_time
         
@@ -598,10 +829,50 @@ class GameState():
         if target_time < self.current_time:
             target_time = self.current_time
         
-        while self.current_time < target_time:
-            intermediate_time = min(max(floor(self.current_time/interval + 1)*interval,self.current_time + interval/2),target_time)
-            self.logs.append("Advancing game to time %s"%(round(intermediate_time,3)))
+        if stepping == 'Event':
+            self.sample_interval = interval
+            self.next_sample_index = floor(self.current_time/interval) + 1
+
+            # advanceGameState only checks the buy queue after a payout, so check it now in case the next purchase is already available
+            if self.current_time < target_time:
+                self.processBuyQueue(self.current_time)
+
+        while self.current_time < target_time and stepping == 'Event':
+            # Stop at the start of the next round (so that the list of available eco sends stays up to date) or when the next purchase in the buy queue becomes available.
+            # Every other event (payouts, eco sends, changes to the eco send) is handled by advanceGameState itself.
+            intermediate_time = min(self.rounds.round_starts[self.current_round+1], target_time)
+            if len(self.buy_queue) > 0 and self.valid_action_flag == True:
+                if self.min_buy_time is None:
+                    self.computeMinBuyTime()
+                if self.current_time < self.min_buy_time < intermediate_time:
+                    intermediate_time = self.min_buy_time
+            if self.log_level >= LOG_DEBUG:
+                self.logs.append("Advancing game to time %s"%(round(intermediate_time,3)))
             self.advanceGameState(target_time = intermediate_time)
+
+        self.sample_interval = None
+
+        while self.current_time < target_time:
+            if self.isIdle():
+                # FAST PATH: When there is nothing in the buy queue or eco queue, the only thing that happens at the end of each interval is that the cash and eco get recorded.
+                # So rather than call advanceGameState once per interval, call it once for the rest of the round, 
+                # and have it stop at the end of each interval (as a "ghost" payout) along the way.
+                # NOTE: The pass must end at the first interval boundary in the next round so that the list of available eco sends is updated on time.
+                ghost_times = []
+                intermediate_time = self.current_time
+                round_end = self.rounds.round_starts[self.current_round+1]
+                while intermediate_time < target_time and intermediate_time < round_end:
+                    intermediate_time = min(max(floor(intermediate_time/interval + 1)*interval,intermediate_time + interval/2),target_time)
+                    ghost_times.append(intermediate_time)
+                intermediate_time = ghost_times.pop()
+                if self.log_level >= LOG_DEBUG:
+                    self.logs.append("Advancing game to time %s (no queued actions)"%(round(intermediate_time,3)))
+                self.advanceGameState(target_time = intermediate_time, ghost_times = ghost_times)
+            else:
+                intermediate_time = min(max(floor(self.current_time/interval + 1)*interval,self.current_time + interval/2),target_time)
+                if self.log_level >= LOG_DEBUG:
+                    self.logs.append("Advancing game to time %s"%(round(intermediate_time,3)))
+                self.advanceGameState(target_time = intermediate_time)
             #self.logs.append("----------")
 
         # Sort the messages in self.event_messages so that they are listed chronologically
@@ -610,18 +881,54 @@ class GameState():
         # Show warning messages for fail-safes triggered during simulation
         self.showWarnings(self.warnings)
         
-        self.logs.append("Advanced game state to round " + str(self.current_round))
-        self.logs.append("The current time is " + str(self.current_time))
-        self.logs.append("The next round starts at time " + str(self.rounds.round_starts[self.current_round+1]))
-        self.logs.append("Our new cash and eco is given by (%s,%s) \n"%(round(self.cash,2),round(self.eco,2)))
+        if self.log_level >= LOG_EVENTS:
+            self.logs.append("Advanced game state to round " + str(self.current_round))
+            self.logs.append("The current time is " + str(self.current_time))
+            self.logs.append("The next round starts at time " + str(self.rounds.round_starts[self.current_round+1]))
+            self.logs.append("Our new cash and eco is given by (%s,%s) \n"%(round(self.cash,2),round(self.eco,2)))
 
-    def advanceGameState(self, target_time = None, target_round = None):
+    def changeStallFactor(self, stall_factor):
+        '''
+        Change the opponent's stall factor from the current time onwards, without re-simulating the game from the start.
+        Every round which hasn't finished sending yet gets the new stall factor (see Rounds.changeStallFactor),
+        and only payouts which depend on when future rounds start are rescheduled.
+
+        Parameters:
+        stall_factor (float): The new stall factor
+
+        Returns:
+        None
+        '''
+        # The Rounds object may be shared with other game states (forks of this one, or other simulations from the same initial state), so change a copy of it.
+        self.rounds = self.rounds.copy()
+        first_round = self.rounds.changeStallFactor(stall_factor, self.current_time)
+        self.payout_scheduler.resetRoundSources(self, self.current_time)
+
+        if self.log_level >= LOG_EVENTS:
+            self.logs.append("Changed the stall factor to %s at time %s. The start times of round %s onwards have changed."%(stall_factor, round(self.current_time,2), first_round))
+            self.logs.append("The new round start times are %s"%(self.rounds.round_starts))
+
+    def isIdle(self):
+        '''
+        Helper method for self.fastForward. Returns True if there is nothing for the game state to do except collect payouts and send eco.
+        That is, there are no purchases in the buy queue, no automated purchases in progress, and no eco changes scheduled.
+        '''
+        if len(self.buy_queue) > 0 or len(self.eco_queue) > 0:
+            return False
+        if self.current_time <= max(self.supply_drop_max_buy_time, self.druid_farm_max_buy_time, self.heli_farm_max_buy_time):
+            return False
+        return True
+
+    def advanceGameState(self, target_time = None, target_round = None, ghost_times = ()):
         '''
         Helper method for self.fastForward, attempts to simulate the game state to target_time but terminates early if:
         - The code needs to change eco sends
         - A purchase is made in the buy queue
 
         In order to simulate to the desired target time, fastForward *repeatedly* runs this method until the game state finally reachs the target time.
+
+        ghost_times is an increasing list of times before target_time at which the game state should stop as if advanceGameState had been called with that target time.
+        That is, at each of those times the game state updates its eco, checks the buy queue, and records its cash and eco.
         '''
 
         ###################
@@ -638,29 +945,30 @@ class GameState():
 
         # FAIL-SAFE: Check whether the current eco send is valid. If it is not, change the eco send to zero.
         if eco_send_info[self.send_name]['End Round'] < self.current_round:
-            self.logs.append("Warning! The eco send %s is no longer available! Switching to the zero send."%(self.send_name))
-            self.warnings.append(len(self.logs) - 1)
+            self.warn("Warning! The eco send %s is no longer available! Switching to the zero send."%(self.send_name))
             self.eco_queue.insert(0,ecoSend(time = 0, send_name='Zero'))
             target_time = self.eco_queue[0]['Time']
 
         # FAIL-SAFE: Prevent advanceGameState from using an eco send after it becomes unavailable by terminating early in this case.
         if eco_send_info[self.send_name]['End Round'] + 1 <= self.rounds.getRoundFromTime(target_time):
             target_time = self.rounds.getTimeFromRound(eco_send_info[self.send_name]['End Round'] + 1)
-            self.logs.append("Warning! The current eco send will not be available after the conclusion of round %s. Adjusting the target time."%(eco_send_info[self.send_name]['End Round']))
+            if self.log_level >= LOG_EVENTS:
+                self.logs.append("Warning! The current eco send will not be available after the conclusion of round %s. Adjusting the target time."%(eco_send_info[self.send_name]['End Round']))
 
         # FAIL-SAFE: Only try to update if we are trying to go into the future. Do NOT try to go back in time!
         if target_time <= self.current_time:
-            self.logs.append("Warning! The target time is in the past! Terminating advanceGameState()")
-            self.warnings.append(len(self.logs) - 1)
+            self.warn("Warning! The target time is in the past! Terminating advanceGameState()")
             return None
         
         ############################################
         #PART 1: COMPUTATION OF PAYOUT TIMES & INFOS
         ############################################
         
-        #Entries in payout_times take the format of a dictionary with paramters 'Time' and 'Payment' (if possible).
+        # The payout schedule is a PayoutSchedule object (see schedule.py) which stores the time, amount, type, and source of each payout in parallel arrays.
         
-        payout_times = self.computePayoutSchedule(target_time)
+        schedule = self.computePayoutSchedule(target_time, ghost_times)
+        times, amounts, types, sources, indices, flags = schedule.times, schedule.amounts, schedule.types, schedule.sources, schedule.indices, schedule.flags
+        num_payouts = len(schedule)
 
         ##############################
         #PART 2: COMPUTATION OF WEALTH
@@ -673,21 +981,28 @@ class GameState():
             # Try to make purchases immediately after receiving the payment.
         
         made_purchase = False
-        for i in range(len(payout_times)):
-            payout = payout_times[i]
+        for i in range(num_payouts):
+            payout_time = times[i]
+            if flags[i] & INT_TIME:
+                payout_time = int(payout_time)
+            payout_type = types[i]
             
             #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
             #First, compute the impact of eco from the previous payout (or starting time) to the current one
             #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-            self.updateEco(payout['Time'])
+            self.updateEco(payout_time)
+            if self.sample_interval is not None:
+                self.sampleHistory(payout_time)
 
             if (self.max_send_amount is not None and self.number_of_sends >= self.max_send_amount) or (self.max_eco_amount is not None and self.eco >= self.max_eco_amount) or (self.max_send_time is not None and self.current_time > self.max_send_time):
-                self.logs.append("Reached the limit on eco'ing for this send! Moving to the next send in the queue.")
+                if self.log_level >= LOG_EVENTS:
+                    self.logs.append("Reached the limit on eco'ing for this send! Moving to the next send in the queue.")
 
                 #Switch to the zero send
                 if len(self.eco_queue) == 0:
-                    self.logs.append("No more sends in the eco queue! Switching to the zero send.")
+                    if self.log_level >= LOG_EVENTS:
+                        self.logs.append("No more sends in the eco queue! Switching to the zero send.")
                     self.eco_queue.append(ecoSend(send_name = 'Zero'))
                 else:
                     # Adjust the time of the next eco send so that the simulator attempts to change to it at simulation end
@@ -695,12 +1010,15 @@ class GameState():
                 
                 # In rare cases, we may break from the eco queue on exactly same time that we are slated to receive a payment
                 # In that rare case, we need to award the payment for that time and check the buy queue to ensure that we do not "skip" over anything essential.
-                if self.current_time < payout['Time']:
-                    self.logs.append("The break time does not occur exactly when a payout is scheduled.")
+                if self.current_time < payout_time:
+                    if self.log_level >= LOG_DEBUG:
+                        self.logs.append("The break time does not occur exactly when a payout is scheduled.")
                     target_time = self.current_time
+                    self.payout_scheduler.requeue(schedule, i)
                     break
                 else:
-                    self.logs.append("The break time does occur exactly when a payout is scheduled.")
+                    if self.log_level >= LOG_DEBUG:
+                        self.logs.append("The break time does occur exactly when a payout is scheduled.")
                     made_purchase = True
 
             
@@ -710,53 +1028,65 @@ class GameState():
             
             # WARNING! If an IMF Loan is active, half of the payment must go towards the loan.
             
-            if payout['Payout Type'] == 'Direct':
+            if payout_type == DIRECT_PAYOUT:
                 #This case is easy! Just award the payment and move on
-                if payout['Source'] != 'Ghost': # To avoid having the "ghost payment" included in the logs
-                    new_cash, new_loan = impact(self.cash,self.loan, payout['Payout'])
+                if sources[i] != GHOST_SOURCE: # To avoid having the "ghost payment" included in the logs
+                    amount = int(amounts[i]) if flags[i] & INT_AMOUNT else amounts[i]
+                    new_cash, new_loan = impact(self.cash,self.loan, amount)
 
-                    if payout['Source'] == 'Farm':
+                    if sources[i] == FARM_SOURCE:
                         #Track the money generated by the farm
-                        key = payout['Index']
-                        farm = self.farms[key]
+                        farm = self.farms[indices[i]]
                         farm.revenue += new_cash - self.cash
+                    elif sources[i] != ECO_SOURCE and sources[i] != JERICHO_SOURCE:
+                        #Track the money generated by alt eco
+                        self.trackAltEcoRevenue(sources[i], indices[i], new_cash - self.cash)
 
                     self.cash, self.loan = new_cash, new_loan
-                    self.logs.append("Awarded direct payment %s at time %s"%(round(payout['Payout'],2),round(payout['Time'],2)))
+                    if self.log_level >= LOG_DEBUG:
+                        self.logs.append("Awarded direct payment %s at time %s"%(round(amount,2),round(payout_time,2)))
                 
                 
-            elif payout['Payout Type'] == 'Bank Payment':
+            elif payout_type == BANK_PAYMENT:
                 #Identify the bank that we're paying and deposit money into that bank's account
                 #NOTE: Bank deposits are not impacted by IMF Loans. It is only when we withdraw the money that the loan is repaid
-                key = payout['Index']
+                key = indices[i]
                 farm = self.farms[key]
-                farm.account_value += payout['Payout']
-                self.logs.append("Awarded bank payment %s at time %s to farm at index %s"%(round(payout['Payout'],2),round(payout['Time'],2), key))
+                amount = int(amounts[i]) if flags[i] & INT_AMOUNT else amounts[i]
+                farm.account_value += amount
+                if self.log_level >= LOG_DEBUG:
+                    self.logs.append("Awarded bank payment %s at time %s to farm at index %s"%(round(amount,2),round(payout_time,2), key))
                 if farm.account_value >= farm.max_account_value:
                     #At this point, the player should withdraw from the bank.
                     farm.account_value = 0
                     new_cash, new_loan = impact(self.cash,self.loan,farm.max_account_value)
                     farm.revenue += new_cash - self.cash #Track the money generated by the farm
                     self.cash, self.loan = new_cash, new_loan
-                    self.logs.append("The bank at index %s reached max capacity! Withdrawing money"%(key))
-                self.logs.append("The bank's new account value is %s"%(farm.account_value))
-            elif payout['Payout Type'] == 'Bank Interest':
+                    if self.log_level >= LOG_DEBUG:
+                        self.logs.append("The bank at index %s reached max capacity! Withdrawing money"%(key))
+                if self.log_level >= LOG_DEBUG:
+                    self.logs.append("The bank's new account value is %s"%(farm.account_value))
+            elif payout_type == BANK_INTEREST:
                 #Identify the bank that we're paying and deposit the start of round bank bonus, then give interest
-                key = payout['Index']
+                key = indices[i]
                 farm = self.farms[key]
-                farm.account_value += farm.payout(payout['Time'], bank_interest = True)
+                farm.account_value += farm.payout(payout_time, bank_interest = True)
                 farm.account_value *= farm_globals['Start of Round Bank Multiplier']
-                self.logs.append("Awarded bank interest at time %s to the farm at index %s"%(round(payout['Time'],2), key))
+                if self.log_level >= LOG_DEBUG:
+                    self.logs.append("Awarded bank interest at time %s to the farm at index %s"%(round(payout_time,2), key))
                 if farm.account_value >= farm.max_account_value:
                     farm.account_value = 0
                     new_cash, new_loan = impact(self.cash,self.loan,farm.max_account_value)
                     farm.revenue += new_cash - self.cash #Track the money generated by the farm
                     self.cash, self.loan = new_cash, new_loan
-                    self.logs.append("The bank at index %s reached max capacity! Withdrawing money"%(key))
-                self.logs.append("The bank's new account value is %s"%(farm.account_value))
-            elif payout['Payout Type'] == 'Eco':
+                    if self.log_level >= LOG_DEBUG:
+                        self.logs.append("The bank at index %s reached max capacity! Withdrawing money"%(key))
+                if self.log_level >= LOG_DEBUG:
+                    self.logs.append("The bank's new account value is %s"%(farm.account_value))
+            elif payout_type == ECO_PAYOUT:
                 self.cash, self.loan = impact(self.cash,self.loan, self.eco)
-                self.logs.append("Awarded eco payment %s at time %s"%(round(self.eco,2),round(payout['Time'],2)))
+                if self.log_level >= LOG_DEBUG:
+                    self.logs.append("Awarded eco payment %s at time %s"%(round(self.eco,2),round(payout_time,2)))
             
             #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
             #Now, check whether we can perform the next buy in the buy queue
@@ -765,15 +1095,10 @@ class GameState():
             # The simulation should attempt to process the buy queue after every payout, *except* if multiple payouts occur at the same time
             # If multiple payouts occur at the same time, only access the buy queue after the *last* of those payments occurs.
 
-            try_to_buy = False
-
-            if i == len(payout_times)-1:
-                try_to_buy = True
-            elif payout_times[i]['Time'] < payout_times[i+1]['Time']:
-                try_to_buy = True
+            try_to_buy = i == num_payouts-1 or payout_time < times[i+1]
             
             if try_to_buy:
-                if self.processBuyQueue(payout):
+                if self.processBuyQueue(payout_time):
                     made_purchase = True
             
             #~~~~~~~~~~~~~~~~~~~~
@@ -785,50 +1110,54 @@ class GameState():
             # WARNING: Unusual results will occur if you attempt to implement automated purchases of multiple alt eco's at the same time.
             # WARNING: Because automated purchases are processed after checking the buy queue, unexpected results may occur if items in the buy queue do not have a min_buy_time designated.
 
-            if payout['Time'] <= self.supply_drop_max_buy_time and try_to_buy == True:
+            if payout_time <= self.supply_drop_max_buy_time and try_to_buy == True:
                 while self.cash >= sniper_globals['Supply Drop Cost'] + self.supply_drop_buffer:
                     made_purchase = True
                     self.cash -= sniper_globals['Supply Drop Cost']
-                    self.supply_drops[self.sniper_key] = payout['Time']
-                    self.sniper_key += 1
-                    self.logs.append("Purchased a supply drop! (Automated purchase)")
+                    new_index = self.supply_drops.add(payout_time)
+                    self.payout_scheduler.resetSource(self, SNIPER_SOURCE, new_index, payout_time)
+                    if self.log_level >= LOG_EVENTS:
+                        self.logs.append("Purchased a supply drop! (Automated purchase)")
 
-            if payout['Time'] <= self.druid_farm_max_buy_time and try_to_buy == True:
+            if payout_time <= self.druid_farm_max_buy_time and try_to_buy == True:
                 while self.cash >= druid_globals['Druid Farm Cost'] + self.druid_farm_buffer:
                     made_purchase = True
                     self.cash -= druid_globals['Druid Farm Cost']
-                    self.druid_farms[self.druid_key] = payout['Time']
-                    self.druid_key += 1
-                    self.logs.append("Purchased a druid farm! (Automated purchase)")
+                    new_index = self.druid_farms.add(payout_time)
+                    self.payout_scheduler.resetSource(self, DRUID_SOURCE, new_index, payout_time)
+                    if self.log_level >= LOG_EVENTS:
+                        self.logs.append("Purchased a druid farm! (Automated purchase)")
 
-            if payout['Time'] <= self.heli_farm_max_buy_time and try_to_buy == True:
+            if payout_time <= self.heli_farm_max_buy_time and try_to_buy == True:
                 while self.cash >= heli_globals['Heli Farm Cost'] + self.heli_farm_buffer:
                     made_purchase = True
                     self.cash -= heli_globals['Heli Farm Cost']
-                    self.heli_farms[self.heli_key] = payout['Time']
-                    self.heli_key += 1
-                    self.logs.append("Purchased a heli farm! (Automated purchase)")
+                    new_index = self.heli_farms.add(payout_time)
+                    self.payout_scheduler.resetSource(self, HELI_SOURCE, new_index, payout_time)
+                    if self.log_level >= LOG_EVENTS:
+                        self.logs.append("Purchased a heli farm! (Automated purchase)")
             
             #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
             #Record the cash & eco history and advance the game time
             #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
             
             #print("New cash and eco is (%s,%s)"%(round(self.cash,2), round(self.eco,2)))
-            if i == len(payout_times)-1 or payout_times[i]['Time'] < payout_times[i+1]['Time']:
-                self.time_states.append(payout['Time'])
-                self.cash_states.append(self.cash)
-                self.eco_states.append(self.eco)
+            if try_to_buy and self.sample_interval is None:
+                self.recordHistory(payout_time)
 
             #If either the cash or eco values changed since last time, record this in the log
-            if len(self.cash_states) == 1 or self.cash_states[-1] != self.cash_states[-2] or len(self.eco_states) == 1 or self.eco_states[-1] != self.eco_states[-2]:
-                self.logs.append("Recorded cash and eco values (%s,%s) at time %s"%(round(self.cash,2),round(self.eco,2),round(payout['Time'],2)))
+            if self.log_level >= LOG_DEBUG:
+                if len(self.cash_states) == 1 or self.cash_states[-1] != self.cash_states[-2] or len(self.eco_states) == 1 or self.eco_states[-1] != self.eco_states[-2]:
+                    self.logs.append("Recorded cash and eco values (%s,%s) at time %s"%(round(self.cash,2),round(self.eco,2),round(payout_time,2)))
             
             # NOTE: The last payment is a "ghost" payment to be awarded at the target time.
-            self.current_time = payout['Time']
+            self.current_time = payout_time
 
             #If a purchase occured in the buy queue, exit the processing of payments early
             if made_purchase == True:
                 target_time = self.current_time
+                # Any payouts we didn't get to go back into the payout schedule
+                self.payout_scheduler.requeue(schedule, i+1)
                 break
 
             #end of for loop
@@ -842,6 +1171,8 @@ class GameState():
         
         # DEVELOPER'S NOTE: The list of payments always includes a "ghost" payment of 0 dollars at the designated target time. That payment helps to simplify this code. 
         self.current_time = target_time
+        if self.sample_interval is not None:
+            self.sampleHistory(target_time, inclusive = True)
 
         while self.rounds.round_starts[self.current_round] <= self.current_time:
             self.current_round += 1
@@ -856,287 +1187,23 @@ class GameState():
         #self.logs.append("The next round starts at time " + str(self.rounds.round_starts[self.current_round+1]))
         #self.logs.append("Our new cash and eco is given by (%s,%s) \n"%(round(self.cash,2),round(self.eco,2)))
            
-    def computePayoutSchedule(self, target_time: float):
+    def computePayoutSchedule(self, target_time: float, ghost_times = ()):
         '''
         Helper method for advanceGameState
 
         Given a target time target_time, return an ordered list of all payouts to occur from the game state's current time until the designated target time.
+        The payouts are taken from self.payout_scheduler, which only computes the payouts of income sources that have changed since the last time we asked it for payouts.
         
         Parameters:
         target_time (float): the latest time (inclusive) of any payment to be included in the payout schedule.
+        ghost_times (List[float]): Times (before target_time) at which to include additional "ghost" payouts of 0 dollars.
 
         Returns:
-        payout_times (List[dict]): a list of dictionaries, each of which represents a payment.
+        schedule (PayoutSchedule): the payouts, stored as parallel arrays of times, amounts, payout types, and sources.
 
         '''
-        
-        
-        payout_times = []
-        
-        #ECO PAYOUTS
-        eco_time = 6*(floor(self.current_time/6)+1)
-        while eco_time <= target_time:
-            payout_entry = {
-                'Time': eco_time,
-                'Payout Type': 'Eco'
-            }
-            payout_times.append(payout_entry)
-            eco_time += 6
-
-        #DRUID FARMS
-        if self.druid_farms is not None:
-            for key in self.druid_farms.keys():
-                druid_farm = self.druid_farms[key]
-
-                #Determine the earliest druid farm activation that could occur within the interval of interest (self.current_time,target_time]
-                use_index = max(1,floor(1 + (self.current_time - druid_farm - druid_globals['Druid Farm Initial Cooldown'])/druid_globals['Druid Farm Usage Cooldown'])+1)
-                druid_farm_time = druid_farm + druid_globals['Druid Farm Initial Cooldown'] + druid_globals['Druid Farm Usage Cooldown']*(use_index-1)
-                while druid_farm_time <= target_time:
-                    payout_entry = {
-                        'Time': druid_farm_time,
-                        'Payout Type': 'Direct',
-                        'Payout': druid_globals['Druid Farm Payout'],
-                        'Source': 'Druid'
-                    }
-                    payout_times.append(payout_entry)
-                    druid_farm_time += druid_globals['Druid Farm Usage Cooldown']
-
-                if key == self.sotf:
-                    #Spirit of the Forest has a start of round payment of 3000 dollars in addition to the payouts that x4x druids can give out 
-                    #At the start of each round, append a payout entry with the SOTF payout
-                    self.inc = 1
-                    while self.rounds.getTimeFromRound(self.current_round + self.inc) <= target_time:
-                        payout_entry = {
-                            'Time': self.rounds.getTimeFromRound(self.current_round + self.inc),
-                            'Payout Type': 'Direct',
-                            'Payout': druid_globals['Spirit of the Forest Bonus'],
-                            'Source': 'Druid'
-                        }
-                        payout_times.append(payout_entry)
-                        self.inc += 1
-
-
-        #SUPPLY DROPS
-        if self.supply_drops is not None:
-            for key in self.supply_drops.keys():
-                supply_drop = self.supply_drops[key]
-                if key == self.elite_sniper:
-                    payout_amount = sniper_globals['Elite Sniper Payout']
-                else:
-                    payout_amount = sniper_globals['Supply Drop Payout']
-
-                #Determine the earliest supply drop activation that could occur within the interval of interest (self.current_time,target_time]
-                drop_index = max(1,floor(1 + (self.current_time - supply_drop - sniper_globals['Supply Drop Initial Cooldown'])/sniper_globals['Supply Drop Usage Cooldown'])+1)
-                supply_drop_time = supply_drop + sniper_globals['Supply Drop Initial Cooldown'] + sniper_globals['Supply Drop Usage Cooldown']*(drop_index-1)
-                while supply_drop_time <= target_time:
-                    
-                    payout_entry = {
-                        'Time': supply_drop_time,
-                        'Payout Type': 'Direct',
-                        'Payout': payout_amount,
-                        'Source': 'Sniper'
-                    }
-                    payout_times.append(payout_entry)
-                    supply_drop_time += sniper_globals['Supply Drop Usage Cooldown']
-
-        #HELI FARMS
-        if self.heli_farms is not None:
-            for key in self.heli_farms.keys():
-                heli_farm = self.heli_farms[key]
-                if key == self.special_poperations:
-                    payout_amount = heli_globals['Special Poperations Payout']
-                else:
-                    payout_amount = heli_globals['Heli Farm Payout']
-
-                #Determine the earliest heli farm usage that could occur within the interval of interest (self.current_time,target_time]
-                drop_index = max(1,floor(1 + (self.current_time - heli_farm - heli_globals['Heli Farm Initial Cooldown'])/heli_globals['Heli Farm Usage Cooldown'])+1)
-                heli_farm_time = heli_farm + heli_globals['Heli Farm Initial Cooldown'] + heli_globals['Heli Farm Usage Cooldown']*(drop_index-1)
-                while heli_farm_time <= target_time:
-                    
-                    payout_entry = {
-                        'Time': heli_farm_time,
-                        'Payout Type': 'Direct',
-                        'Payout': payout_amount,
-                        'Source': 'Heli'
-                    }
-                    payout_times.append(payout_entry)
-                    heli_farm_time += heli_globals['Heli Farm Usage Cooldown']
-
-        #FARMS
-        if len(self.farms) > 0:
-            for key, farm in enumerate(self.farms):
-                if farm.sell_time is None:
-                    #If the farm is a monkeynomics, determine the payout times of the active ability
-                    if farm.upgrades[1] == 5:
-                        farm_time = farm.min_use_time
-                        while farm_time <= target_time:
-                            if farm_time > self.current_time:
-                                payout_entry = {
-                                    'Time': farm_time,
-                                    'Payout Type': 'Direct',
-                                    'Payout': farm_globals['Monkeynomics Payout'],
-                                    'Source': 'Farm',
-                                    'Index': key
-                                }
-                                payout_times.append(payout_entry)
-                            farm_time += farm_globals['Monkeynomics Usage Cooldown']
-                        farm.min_use_time = farm_time
-                    
-                    farm_purchase_round = self.rounds.getRoundFromTime(farm.purchase_time)
-                    self.inc = 0
-                    self.flag = False
-                    while self.flag == False:
-                        #If computing farm payments on the same round as we are currently on, precompute the indices the for loop should go through.
-                        #NOTE: This is not necessary at the end because the for loop terminates when a "future" payment is reached.
-                        if self.inc == 0:
-                            if self.current_round > farm_purchase_round:
-                                #When the farm was purchased on a previous round
-                                round_time = self.current_time - self.rounds.round_starts[self.current_round]
-                                loop_start = int(floor(farm.payout_frequency*round_time/self.rounds.nat_send_lens[self.current_round]) + 1)
-                                loop_end = farm.payout_frequency
-                            else: #self.current_round == farm_purhcase_round
-                                #When the farm was purchased on the same round as we are currently on
-                                loop_start = int(floor(farm.payout_frequency*(self.current_time - farm.purchase_time)/self.rounds.nat_send_lens[self.current_round]-1)+1)
-                                loop_end = int(ceil(farm.payout_frequency*(1 - (farm.purchase_time - self.rounds.round_starts[self.current_round])/self.rounds.nat_send_lens[self.current_round])-1)-1)
-                        else:
-                            loop_start = 0
-                            loop_end = farm.payout_frequency
-                        
-                        #self.logs.append("Precomputed the loop indices to be (%s,%s)"%(loop_start,loop_end))
-                        #self.logs.append("Now computing payments at round %s"%(self.current_round + self.inc))
-                        
-                        for i in range(loop_start, loop_end):
-                            #Precompute the value i that this for loop should start at (as opposed to always starting at 0) to avoid redundant computations
-                            #Farm payout rules are different for the round the farm is bought on versus subsequent rounds
-                            if self.current_round + self.inc == farm_purchase_round:
-                                farm_time = farm.purchase_time + (i+1)*self.rounds.nat_send_lens[self.current_round + self.inc]/farm.payout_frequency
-                            else:
-                                farm_time = self.rounds.round_starts[self.current_round + self.inc] + i*self.rounds.nat_send_lens[self.current_round + self.inc]/farm.payout_frequency
-                            
-                            #Check if the payment time occurs within our update window. If it does, add it to the payout times list
-                            if farm_time <= target_time and farm_time > self.current_time:
-                                
-                                #Farm payouts will either immediately be added to the player's cash or added to the monkey bank's account value
-                                #This depends of course on whether the farm is a bank or not.
-                                
-                                #WARNING: If the farm we are dealing with is a bank, we must direct the payment into the bank rather than the player.
-                                #WARNING: If the farm we are dealing with is a MWS, we must check whether we are awarding the MWS bonus payment!
-                                #WARNING: If the farm we are dealing with is a BRF, we must check whether the BRF buff is being applied or not!
-                                
-                                if farm.upgrades[1] >= 3:
-                                    if i == 0 and self.current_round + self.inc > farm_purchase_round:
-                                        #At the start of every round, every bank gets a $400 payment and then is awarded 20% interest.
-                                        payout_entry = {
-                                            'Time': farm_time,
-                                            'Payout Type': 'Bank Interest',
-                                            'Index': key,
-                                            'Source': 'Farm'
-                                        }
-                                        payout_times.append(payout_entry)
-                                    payout_entry = {
-                                        'Time': farm_time,
-                                        'Payout Type': 'Bank Payment',
-                                        'Index': key,
-                                        'Payout': farm.payout(farm_time),
-                                        'Source': 'Farm'
-                                    }
-                                elif i == 0 and farm.upgrades[2] == 5 and self.current_round + self.inc > farm_purchase_round:
-                                    payout_entry = {
-                                        'Time': farm_time,
-                                        'Payout Type': 'Direct',
-                                        'Payout': farm.payout(farm_time, mws_bonus = True),
-                                        'Source': 'Farm',
-                                        'Index': key
-                                    }
-                                elif farm.upgrades[0] == 4 and self.T5_exists[0] == True:
-                                    payout_entry = {
-                                        'Time': farm_time,
-                                        'Payout Type': 'Direct',
-                                        'Payout': farm.payout(farm_time, brf_buff = True),
-                                        'Source': 'Farm',
-                                        'Index': key
-                                    }
-                                else:
-                                    payout_entry = {
-                                        'Time': farm_time,
-                                        'Payout Type': 'Direct',
-                                        'Payout': farm.payout(farm_time),
-                                        'Source': 'Farm',
-                                        'Index': key
-                                    }
-                                payout_times.append(payout_entry)
-                            elif farm_time > target_time:
-                                #self.logs.append("The payout time of %s is too late! Excluding payout time!"%(farm_time))
-                                self.flag = True
-                                break
-                        self.inc += 1
-        
-        #BOAT FARMS
-        if len(self.boat_farms) > 0:
-
-            #Is there a Trade Empire on screen right now? 
-            if self.Tempire_exists == True:
-                #Yes, determine the buff to be applied to other boat farm payments.
-                active_boats = 0
-                for key in self.boat_farms.keys():
-                    boat_farm = self.boat_farms[key]
-                    if boat_farm['Sell Time'] is None:
-                        active_boats += 1
-                arg = min(active_boats - 1,20)
-            else:
-                #No, there is not.
-                arg = 0
-
-            multiplier = 1 + 0.05*arg
-
-            #Determine the amount of the money the boats will give each round
-            boat_payout = 0
-            for key in self.boat_farms.keys():
-                boat_farm = self.boat_farms[key]
-                if boat_farm['Sell Time'] is None:
-                    boat_payout += multiplier*boat_payout_values[boat_farm['Upgrade'] - 3]
-
-            #At the start of each round, append a payout entry with the boat payout
-            self.inc = 1
-            while self.rounds.getTimeFromRound(self.current_round + self.inc) <= target_time:
-                payout_entry = {
-                    'Time': self.rounds.getTimeFromRound(self.current_round + self.inc),
-                    'Payout Type': 'Direct',
-                    'Payout': boat_payout,
-                    'Source': 'Boat',
-                }
-                payout_times.append(payout_entry)
-                self.inc += 1
-
-        #JERICHO PAYOUTS
-        jeri_time = self.jericho_steal_time
-        while jeri_time <= min(target_time, self.jericho_steal_time + (hero_globals['Jericho Number of Steals']-1)*hero_globals['Jericho Steal Interval']):
-            if jeri_time > self.current_time:
-                payout_entry = {
-                    'Time': jeri_time,
-                    'Payout Type': 'Direct',
-                    'Payout': self.jericho_steal_amount,
-                    'Source': 'Jericho',
-                }
-                payout_times.append(payout_entry)
-            jeri_time += hero_globals['Jericho Steal Interval']
-
-        #GHOST PAYOUT
-        #This special payout prevents the code from waiting possibly several seconds to carry out purchases in the buy queue that can obviously be afforded
-        payout_entry = {
-            'Time': target_time,
-            'Payout Type': 'Direct',
-            'Payout': 0,
-            'Source': 'Ghost',
-        }
-        payout_times.append(payout_entry)
-
-        #Now that we determined all the payouts, sort the payout times by the order they occur in
-        payout_times = sorted(payout_times, key=lambda x: x['Time']) 
 
-        #self.logs.append("Sorted the payouts in order of increasing time!")
-
-        return payout_times
+        return self.payout_scheduler.drain(self, target_time, ghost_times)
 
     def updateEco(self, target_time):
         '''
@@ -1165,29 +1232,34 @@ class GameState():
         # self.logs.append("Max Send Amount: %s"%(self.max_send_amount))
 
         while self.attack_queue_unlock_time <= target_time and self.send_name != 'Zero' and (self.max_send_amount is None or self.number_of_sends < self.max_send_amount) and (self.max_eco_amount is None or self.eco < self.max_eco_amount) and (self.max_send_time is None or self.attack_queue_unlock_time <= self.max_send_time):
+            if self.eco_mode == 'Bulk' and len(self.attack_queue) > 0 and self.bulkSend(target_time) > 0:
+                continue
+
             self.current_time = max(self.attack_queue_unlock_time, self.current_time)
             # self.logs.append("Advanced current time to %s"%(self.current_time))
 
             # First, check if we can remove any items from the attack queue
-            while len(self.attack_queue) > 0 and self.current_time >= self.attack_queue[0]:
-                self.attack_queue.pop(0)
+            self.attack_queue.expire(self.current_time)
             
             # Next, try to add an attack to the attack_queue.
             # Can we send an attack?
-            if self.cash >= max(self.eco_cost, self.save) and len(self.attack_queue) < min(6, self.attack_queue_threshold):
+            if self.cash >= max(self.eco_cost, self.save) and len(self.attack_queue) < min(self.max_queue_length, self.attack_queue_threshold):
                 # Yes, the queue is empty and we have enough cash
+                if self.sample_interval is not None:
+                    self.sampleHistory(self.current_time)
                 if len(self.attack_queue) == 0:
                     self.attack_queue.append(self.current_time + self.eco_time)
                 else:
                     self.attack_queue.append(max(self.attack_queue[-1] + self.eco_time, self.current_time + self.eco_time))
                 self.cash -= self.eco_cost
                 self.eco += self.eco_gain
-                self.logs.append("Sent a set of %s at time %s"%(self.send_name, self.current_time))
-                self.logs.append("Currently, the send queue looks like this: ")
-                self.logs.append(str(self.attack_queue))
+                if self.log_level >= LOG_DEBUG:
+                    self.logs.append("Sent a set of %s at time %s"%(self.send_name, self.current_time))
+                    self.logs.append("Currently, the send queue looks like this: ")
+                    self.logs.append(str(self.attack_queue))
 
                 # Did the attack fill up the eco queue?
-                if len(self.attack_queue) >= min(6, self.attack_queue_threshold):
+                if len(self.attack_queue) >= min(self.max_queue_length, self.attack_queue_threshold):
                     # Yes, The next send will cause the attack queue to fill up. Wait until the queue empties (if necessary)
                     self.attack_queue_unlock_time = max(self.current_time + self.eco_delay, self.attack_queue[0])
                 else:
@@ -1196,7 +1268,7 @@ class GameState():
                 
                 self.number_of_sends += 1
 
-            elif len(self.attack_queue) >= min(6, self.attack_queue_threshold):
+            elif len(self.attack_queue) >= min(self.max_queue_length, self.attack_queue_threshold):
                 # No, the queue is full!
                 # NOTE: This block of code won't get reached unless the game state is initalized with a full attack queue.
                 self.attack_queue_unlock_time = self.attack_queue[0]
@@ -1205,13 +1277,223 @@ class GameState():
                 # No, we don't have money!
                 self.attack_queue_unlock_time = target_time + self.eco_delay/2
 
-    def processBuyQueue(self, payout):
+    def computeMinBuyTime(self):
+        '''
+        Helper method for processBuyQueue. Determine the earliest time at which the first purchase in the buy queue can be made and store it in self.min_buy_time.
+        If the purchase is found to be invalid, self.valid_action_flag is set to False.
+        '''
+        self.min_buy_time = 0
+        purchase_info = self.buy_queue[0]
+        for dict_obj in purchase_info:
+            min_buy_time = dict_obj.get('Minimum Buy Time')
+            if min_buy_time is not None:
+                if min_buy_time > self.min_buy_time:
+                    self.min_buy_time = min_buy_time
+
+            #If the dict_obj is an IMF Loan activation, force self.min_buy_time to be at least the min_use_time of the loan
+            if dict_obj['Type'] == 'Activate IMF':
+                ind = dict_obj['Index']
+                farm = self.farms[ind]
+                if farm.min_use_time is not None and farm.min_use_time > self.min_buy_time:
+                    self.min_buy_time = farm.min_use_time
+                elif farm.min_use_time is None:
+                    #If the farm doesn't have a min_use_time designated, it can't be an IMF farm!
+                    self.warn("Warning! Buy queue entry includes attempt to take out a loan from a farm that is not an IMF Loan! Aborting buy queue!")
+                    self.valid_action_flag = False
+                    return None
+
+            #If the dict_obj is a Overclock use, force self.min_buy_time to be least the use time of the Overclock
+            if dict_obj['Type'] == 'Use Overclock':
+                ind = dict_obj['Engineer Index']
+                if self.overclocks[ind]['Use Time'] is not None and self.overclocks[ind]['Use Time'] > self.min_buy_time:
+                    self.min_buy_time = self.overclocks[ind]['Use Time']
+
+    def compileBuyEntry(self):
+        '''
+        Helper method for processBuyQueue. Prepare the entry at the front of the buy queue for purchase. This happens once per entry, the first time it is examined on or after its minimum buy time.
+        Compound farm upgrades are broken up into single upgrades and automatic farm sales are resolved into the specific farms to sell,
+        and then the fixed cost of each action in the (new) entry is stored in self.buy_costs so that later checks are a simple cash comparison.
+
+        Returns:
+        purchase_info (List[dict]): The compiled entry, which is now at the front of the buy queue
+        '''
+        purchase_info = self.buy_queue[0]
+
+        # If the purchase info requires us to upgrade a farm more than once...
+        new_actions = []
+        for i in range(len(purchase_info)):
+            if purchase_info[i]['Type'] == 'Upgrade Farm' and purchase_info[i]['Upgrades'] is not None:
+                upgrades = list(purchase_info[i]['Upgrades'])
+                ind = purchase_info[i]['Index']
+                farm = self.farms[ind]
+                current_upgrades = list(farm.upgrades)
+
+                # How many times do we have to upgrade the farm in order for it to reach it's desired path?
+                num_upgrades = sum([upgrades[j] - current_upgrades[j] for j in range(3)])
+                # print("num_upgrades: %s"%(num_upgrades))
+
+                if num_upgrades > 1:
+                    # Which path would be the farm's primary path?
+                    arr = [0,1,2]
+                    arr.sort(key = lambda n: upgrades[n])
+                    primary_path = arr[-1]
+                    secondary_path = arr[-2]
+
+                    # Amend the buy queue by adding items which upgrade the farm in a certain order
+                    # First, if necessary, build the 200 farm
+                    while current_upgrades[0] < min(2, upgrades[0]):
+                        current_upgrades[0] += 1
+                        new_actions.append([upgradeFarm(ind, upgrades=tuple(current_upgrades))])
+                    
+                    # Next, build the farm's *primary* path to T3
+                    while current_upgrades[primary_path] < min(3, upgrades[primary_path]):
+                        current_upgrades[primary_path] += 1
+                        new_actions.append([upgradeFarm(ind, upgrades=tuple(current_upgrades))])
+
+                    # Next, build the farm's crosspath up twice
+                    while current_upgrades[secondary_path] < min(2,upgrades[secondary_path]):
+                        current_upgrades[secondary_path] += 1
+                        new_actions.append([upgradeFarm(ind, upgrades=tuple(current_upgrades))])
+
+                    # Finally, build the primary path up completely
+                    while current_upgrades[primary_path] < min(5, upgrades[primary_path]):
+                        current_upgrades[primary_path] += 1
+                        new_actions.append([upgradeFarm(ind, upgrades=tuple(current_upgrades))])
+
+                    # If the original compound action *also* involved automatic farm selling, tack this on to the *final* element in new actions
+                    if len(new_actions) > 0:
+                        new_actions[-1][0]['Auto Sell'] = purchase_info[i]['Auto Sell']
+
+                    # Carryovers
+                    for action in new_actions:
+                        action[0]['Buffer'] = purchase_info[i]['Buffer']
+                        action[0]['Minimum Buy Time'] = purchase_info[i]['Minimum Buy Time']
+                    break
+        
+        # Break up multiple farm upgrades into different actions
+        if len(new_actions) > 0:
+            self.buy_queue.pop(0)
+            self.buy_queue = new_actions + self.buy_queue
+            # self.logs.append("Warning! Automatically splitting a farm upgrade action into multiple actions! The new buy queue is %s"%(self.buy_queue))
+            # self.warnings.append(len(self.logs)-1)
+            purchase_info = new_actions[0]
+            
+        # If the purchase info includes an action for automated selling into more complicated purchases
+        # print("Checking for compound purchase:")
+        for i in range(len(purchase_info)):
+            # print(purchase_info[i]['Type'] + ' ' + str(purchase_info[i].get('Auto Sell')))
+            if purchase_info[i]['Type'] == 'Upgrade Farm' and purchase_info[i]['Auto Sell'] is not None:
+                # NOTE: The actions in the buy queue may be shared with snapshots of the game state (see self.snapshot), so we build a new list of actions rather than modify the old one.
+                new_purchase_info = purchase_info[0:i]
+
+                # Sell the cheapest active farms other than the one being upgraded
+                for ind in self.cheapestFarms(purchase_info[i]['Auto Sell'], exclude = purchase_info[i]['Index']):
+                    new_purchase_info.append(sellFarm(ind))
+
+                upgrade_info = dict(purchase_info[i])
+                upgrade_info['Auto Sell'] = None
+                new_purchase_info.append(upgrade_info)
+                new_purchase_info.extend(purchase_info[i+1:])
+                purchase_info = new_purchase_info
+                self.buy_queue[0] = new_purchase_info
+
+                # self.logs.append("Warning! Automatically determining farms to sell for a compound upgrade! The new buy queue is %s"%(self.buy_queue))
+                # self.warnings.append(len(self.logs)-1)
+                break
+
+        # If every action in the entry is a plain purchase, its cost won't change while it waits at the front of the queue.
+        # NOTE: The cost of each action is stored separately so that the cash comparison in processBuyQueue rounds exactly like processAction does.
+        self.buy_plan = purchase_info
+        self.buy_costs = []
+        self.buy_buffer = 0
+        for dict_obj in purchase_info:
+            handler = action_handlers.get(dict_obj['Type'])
+            cost = handler.cost(self, dict_obj) if handler is not None else None
+            buffer = dict_obj.get('Buffer')
+            if cost is None or (buffer is not None and buffer < 0):
+                self.buy_costs = None
+                break
+            self.buy_costs.append(cost)
+            if buffer is not None:
+                self.buy_buffer += buffer
+
+        return purchase_info
+
+    def bulkSend(self, target_time):
+        '''
+        Helper method for updateEco when the eco mode is 'Bulk'.
+
+        Once the attack queue is full (and the eco send takes at least self.eco_delay seconds to send), each send goes out at the exact moment the oldest send in the queue finishes.
+        Every send then finishes self.eco_time seconds after the one before it, so the times of all subsequent sends are known in advance.
+        This method determines how many of those sends the player can make before target_time and applies them all at once.
+
+        Parameters:
+        target_time (float): The time to simulate to.
+
+        Returns:
+        num_sends (int): How many sends were made. If 0, the game state is unchanged and updateEco should simulate the next send normally.
+        '''
+        queue = self.attack_queue
+        queue_length = min(self.max_queue_length, self.attack_queue_threshold)
+        if len(queue) != queue_length or self.attack_queue_unlock_time != queue[0] or queue[0] < self.current_time or self.eco_time < self.eco_delay:
+            return 0
+        min_cash = max(self.eco_cost, self.save)
+        if self.cash < min_cash or self.eco_cost <= 0:
+            return 0
+
+        # The k-th send goes out at time queue[k] (for k < queue_length), and after that at times queue[-1] + eco_time, queue[-1] + 2*eco_time, etc.
+        end_time = target_time
+        if self.max_send_time is not None:
+            end_time = min(end_time, self.max_send_time)
+        if self.sample_interval is not None:
+            # Stop at the next history sample, so that it can be recorded with the right cash and eco
+            end_time = min(end_time, self.next_sample_index*self.sample_interval)
+        num_sends = queue.countFinished(end_time)
+        if num_sends == queue_length:
+            num_sends += max(0, floor((end_time - queue[-1])/self.eco_time))
+
+        # How many sends can we afford?
+        num_sends = min(num_sends, floor((self.cash - min_cash)/self.eco_cost) + 1)
+
+        # How many sends are we allowed to make?
+        if self.max_send_amount is not None:
+            num_sends = min(num_sends, self.max_send_amount - self.number_of_sends)
+        if self.max_eco_amount is not None and self.eco_gain > 0:
+            num_sends = min(num_sends, ceil((self.max_eco_amount - self.eco)/self.eco_gain))
+
+        if num_sends <= 0:
+            return 0
+
+        # Determine the state of the attack queue after the last send
+        if num_sends <= queue_length:
+            self.current_time = queue[num_sends-1]
+            last_time = queue[-1]
+            queue.discard(num_sends)
+            for i in range(num_sends):
+                queue.append(last_time + (i+1)*self.eco_time)
+        else:
+            last_time = queue[-1]
+            self.current_time = last_time + (num_sends - queue_length)*self.eco_time
+            queue.clear()
+            for i in range(queue_length):
+                queue.append(last_time + (num_sends - queue_length + i + 1)*self.eco_time)
+        self.attack_queue_unlock_time = queue[0]
+
+        self.cash -= num_sends*self.eco_cost
+        self.eco += num_sends*self.eco_gain
+        self.number_of_sends += num_sends
+        if self.log_level >= LOG_DEBUG:
+            self.logs.append("Sent %s sets of %s, the last at time %s"%(num_sends, self.send_name, self.current_time))
+
+        return num_sends
+
+    def processBuyQueue(self, payout_time):
         '''
         Helper function for advanceGameState. Examine the buy queue and determine if any purchases can be made within said queue.
         Generally, this method is called every time a payout is received in the simulator.
 
         Parameters:
-        payout (dict): The payout just received before looking at the buy queue
+        payout_time (float): The time of the payout just received before looking at the buy queue
 
         Returns:
         None
@@ -1241,150 +1523,37 @@ class GameState():
             purchase_info = self.buy_queue[0]
             
             if self.min_buy_time is None:
-                self.min_buy_time = 0
                 # DEVELOPER NOTE: self.min_buy_time is initialized as None and set to None following the completion of a purhcase in the buy queue
                 # This if condition prevents the redundant computation.
-                for dict_obj in purchase_info:
-                    min_buy_time = dict_obj.get('Minimum Buy Time')
-                    if min_buy_time is not None:
-                        if min_buy_time > self.min_buy_time:
-                            self.min_buy_time = min_buy_time
-
-                    #If the dict_obj is an IMF Loan activation, force self.min_buy_time to be at least the min_use_time of the loan
-                    if dict_obj['Type'] == 'Activate IMF':
-                        ind = dict_obj['Index']
-                        farm = self.farms[ind]
-                        if farm.min_use_time is not None and farm.min_use_time > self.min_buy_time:
-                            self.min_buy_time = farm.min_use_time
-                        elif farm.min_use_time is None:
-                            #If the farm doesn't have a min_use_time designated, it can't be an IMF farm!
-                            self.logs.append("Warning! Buy queue entry includes attempt to take out a loan from a farm that is not an IMF Loan! Aborting buy queue!")
-                            self.warnings.append(len(self.logs)-1)
-                            self.valid_action_flag = False
-                            break
-
-                    #If the dict_obj is a Overclock use, force self.min_buy_time to be least the use time of the Overclock
-                    if dict_obj['Type'] == 'Use Overclock':
-                        ind = dict_obj['Engineer Index']
-                        if self.overclocks[ind]['Use Time'] is not None and self.overclocks[ind]['Use Time'] > self.min_buy_time:
-                            self.min_buy_time = self.overclocks[ind]['Use Time']
-                    
-                # self.logs.append("Determined the minimum buy time of the next purchase to be %s"%(self.min_buy_time))
+                self.computeMinBuyTime()
                         
             # If we have not yet reached the minimum buy time, break the while loop. 
             # We will check this condition again later:
-            if payout['Time'] < self.min_buy_time:
+            if payout_time < self.min_buy_time:
                 break
 
-            # If the purchase info requires us to upgrade a farm more than once...
-            new_actions = []
-            for i in range(len(purchase_info)):
-                if purchase_info[i]['Type'] == 'Upgrade Farm' and purchase_info[i]['Upgrades'] is not None:
-                    upgrades = list(purchase_info[i]['Upgrades'])
-                    ind = purchase_info[i]['Index']
-                    farm = self.farms[ind]
-                    current_upgrades = dc(farm.upgrades)
-
-                    # How many times do we have to upgrade the farm in order for it to reach it's desired path?
-                    num_upgrades = sum([upgrades[j] - current_upgrades[j] for j in range(3)])
-                    # print("num_upgrades: %s"%(num_upgrades))
-
-                    if num_upgrades > 1:
-                        # Which path would be the farm's primary path?
-                        arr = [0,1,2]
-                        arr.sort(key = lambda n: upgrades[n])
-                        primary_path = arr[-1]
-                        secondary_path = arr[-2]
-
-                        # Amend the buy queue by adding items which upgrade the farm in a certain order
-                        # First, if necessary, build the 200 farm
-                        while current_upgrades[0] < min(2, upgrades[0]):
-                            current_upgrades[0] += 1
-                            new_actions.append([upgradeFarm(ind, upgrades=tuple(current_upgrades))])
-                        
-                        # Next, build the farm's *primary* path to T3
-                        while current_upgrades[primary_path] < min(3, upgrades[primary_path]):
-                            current_upgrades[primary_path] += 1
-                            new_actions.append([upgradeFarm(ind, upgrades=tuple(current_upgrades))])
-
-                        # Next, build the farm's crosspath up twice
-                        while current_upgrades[secondary_path] < min(2,upgrades[secondary_path]):
-                            current_upgrades[secondary_path] += 1
-                            new_actions.append([upgradeFarm(ind, upgrades=tuple(current_upgrades))])
-
-                        # Finally, build the primary path up completely
-                        while current_upgrades[primary_path] < min(5, upgrades[primary_path]):
-                            current_upgrades[primary_path] += 1
-                            new_actions.append([upgradeFarm(ind, upgrades=tuple(current_upgrades))])
-
-                        # If the original compound action *also* involved automatic farm selling, tack this on to the *final* element in new actions
-                        if len(new_actions) > 0:
-                            new_actions[-1][0]['Auto Sell'] = purchase_info[i]['Auto Sell']
-
-                        # Carryovers
-                        for action in new_actions:
-                            action[0]['Buffer'] = purchase_info[i]['Buffer']
-                            action[0]['Minimum Buy Time'] = purchase_info[i]['Minimum Buy Time']
-                        break
-            
-            # Break up multiple farm upgrades into different actions
-            if len(new_actions) > 0:
-                self.buy_queue.pop(0)
-                self.buy_queue = new_actions + self.buy_queue
-                # self.logs.append("Warning! Automatically splitting a farm upgrade action into multiple actions! The new buy queue is %s"%(self.buy_queue))
-                # self.warnings.append(len(self.logs)-1)
-                purchase_info = new_actions[0]
-                
-            # If the purchase info includes an action for automated selling into more complicated purchases
-            # print("Checking for compound purchase:")
-            for i in range(len(purchase_info)):
-                # print(purchase_info[i]['Type'] + ' ' + str(purchase_info[i].get('Auto Sell')))
-                if purchase_info[i]['Type'] == 'Upgrade Farm' and purchase_info[i]['Auto Sell'] is not None:
-                    arg_list = self.argsortFarms()
-                    new_purchase_info = dc(purchase_info[0:i])
-                    
-                    try:
-                        arg_list.remove(purchase_info[i]['Index'])
-                    except:
-                        pass
-                    
-                    j = 0
-                    while (arg_list is not None) and (j < min(len(arg_list), purchase_info[i]['Auto Sell'])) and (self.farms[arg_list[j]].sell_time is None):
-                        # self.logs.append("GOT TO HERE!")
-                        # self.warnings.append(len(self.logs)-1)
-                        new_purchase_info.append(sellFarm(arg_list[j]))
-                        j += 1
-                            
-
-                    purchase_info[i]['Auto Sell'] = None
-                    new_purchase_info.extend(purchase_info[i:])
-                    purchase_info = dc(new_purchase_info)
-                    self.buy_queue[0] = dc(new_purchase_info)
-
-                    # self.logs.append("Warning! Automatically determining farms to sell for a compound upgrade! The new buy queue is %s"%(self.buy_queue))
-                    # self.warnings.append(len(self.logs)-1)
+            if purchase_info is not self.buy_plan:
+                # This is the first time we've looked at this entry since it reached the front of the queue, so compile it
+                purchase_info = self.compileBuyEntry()
+            elif self.buy_costs is not None:
+                # The entry is a plain list of purchases, so we can tell whether we can afford it without checking each action again
+                cash_left = self.cash
+                for cost in self.buy_costs:
+                    cash_left -= cost
+                if cash_left < self.buy_buffer:
                     break
 
-                
-            
             # Next, let's compute the cash and loan values we would have if the transaction was performed
-            # We will compute the hypothetical revenues each farm would have if the transactions were carried out
+            # We will also compute the revenue each tower would make if the transactions were carried out (from being sold, from bank withdrawals, or from loans)
             # In general the this step is necessary if there are in the presence of loans.
             # NOTE: Loans do not influence purchases, so we can process expense tracking for farms only when a transaction actually occurs.
+            # The handlers record this revenue in self.revenue_journal, which only holds the towers the actions actually touch.
+            self.revenue_journal.discard()
 
-            #For tracking the revenue of farms
-            for farm in self.farms:
-                farm.h_revenue = farm.revenue
-
-            #For tracking the revenue of boat farms
-            for key in self.boat_farms.keys():
-                boat_farm = self.boat_farms[key]
-                boat_farm['Hypothetical Revenue'] = boat_farm['Revenue']
-            
             for dict_obj in purchase_info:
 
                 h_loan_before = h_loan
-                h_cash, h_loan = self.processAction(dict_obj, payout, h_cash = h_cash, h_loan = h_loan, stage = 'check')
+                h_cash, h_loan = self.processAction(dict_obj, payout_time, h_cash = h_cash, h_loan = h_loan, stage = 'check')
 
                 #Immediately abort attempting the purchase if we try to process an action that is not possible:
                 if not self.valid_action_flag:
@@ -1405,6 +1574,7 @@ class GameState():
             
             #Immediately break from processing the buy queue entirely if we try to process an action that is not possible.
             if not self.valid_action_flag:
+                self.revenue_journal.discard()
                 break
             
             # If the amount of cash we have exceeds our buffer, perform the transaction.
@@ -1415,20 +1585,15 @@ class GameState():
             if h_cash >= self.buffer:
                 #If we do, perform the buy!
                 made_purchase = True
-                self.logs.append("We have %s cash! We can do the next buy, which costs %s and has a buffer of %s and a minimum buy time of %s!"%(round(self.cash,2), round(self.cash - h_cash,2),round(self.buffer,2),round(self.min_buy_time,2)))
+                if self.log_level >= LOG_DEBUG:
+                    self.logs.append("We have %s cash! We can do the next buy, which costs %s and has a buffer of %s and a minimum buy time of %s!"%(round(self.cash,2), round(self.cash - h_cash,2),round(self.buffer,2),round(self.min_buy_time,2)))
 
                 # Make the adjustments to the cash and loan amounts
                 self.cash = h_cash
                 self.loan = h_loan
 
-                # Track the revenue made by each farm
-                for farm in self.farms:
-                    farm.revenue = farm.h_revenue
-
-                # Track the revenue made by each boat farm
-                for key in self.boat_farms.keys():
-                    boat_farm = self.boat_farms[key]
-                    boat_farm['Revenue'] = boat_farm['Hypothetical Revenue']
+                # Track the revenue made by each tower involved in the transaction
+                self.revenue_journal.commit()
 
                 # self.logs.append("The new lists of farm revenues and expenses are given by: ")
                 # self.logs.append(str(self.farm_revenues))
@@ -1437,17 +1602,21 @@ class GameState():
                 for dict_obj in purchase_info:
 
                     buy_message_list.append(dict_obj['Message'])
-                    self.processAction(dict_obj, payout, stage = 'process')
+                    self.processAction(dict_obj, payout_time, stage = 'process')
 
                 #Now, we have finished the for loop through purchase_info and thus correctly performed the buys
-                #Remove the buy from the queue and set self.buy_cost to None so the code knows next time to re-compute
-                #the buy cost for the next item in the buy queue
+                #Remove the buy from the queue and set self.min_buy_time to None so the code knows next time to re-compute
+                #the minimum buy time for the next item in the buy queue
                 self.min_buy_time = None
+                self.buy_plan = None
                 self.buffer = 0
                 self.buy_queue.pop(0)
-                self.logs.append("Completed the buy operation! The buy queue now has %s items remaining in it"%(len(self.buy_queue)))
+                self.buy_times.append(payout_time)
+                if self.log_level >= LOG_DEBUG:
+                    self.logs.append("Completed the buy operation! The buy queue now has %s items remaining in it"%(len(self.buy_queue)))
             else:
                 #If we can't afford the buy, break the while loop
+                self.revenue_journal.discard()
                 #self.logs.append("We can't afford the buy! Terminating the buy queue while loop")
                 break
         
@@ -1455,530 +1624,28 @@ class GameState():
         if len(buy_message_list) > 0:
             buy_message = ', '.join(buy_message_list)
             self.event_messages.append({
-                'Time': payout['Time'], 
+                'Time': payout_time, 
                 'Type': "Buy", 
                 'Message': buy_message
             })
         
         return made_purchase
-    
-    def processAction(self, dict_obj, payout, h_cash = None, h_loan = None, stage = 'check'):
+
+    def processAction(self, dict_obj, payout_time, h_cash = None, h_loan = None, stage = 'check'):
         # Helper method for processBuyQueue
-        # This is essentially just one giant if-elif block
 
         # processBuyQueue will use this method in two stages. 
         # The first stage is for checking if the next transaction in the buy queue can be performed.
         # The second stage is for actually carrying out the transaction
+        # Each type of action is carried out by its own ActionHandler (see handlers.py). Actions with no registered handler do nothing.
 
-        # DEFENSE RELATED MATTERS
-        if dict_obj['Type'] == 'Buy Defense':
-            if stage == 'check':
-                h_cash, h_loan = impact(h_cash, h_loan, -1*dict_obj['Cost'])
-            # We don't need to do anything here in the processing stage
-        # FARM RELATED MATTERS
-        elif dict_obj['Type'] == 'Buy Farm':
-            if stage == 'check':
-                farm_cost = farm_total_cost_values[dict_obj['Upgrades']]
-                h_cash, h_loan = impact(h_cash, h_loan, -1*farm_cost)
-            else:
-                self.logs.append("Purchasing farm!")
-                farm_info = initFarm(purchase_time = payout['Time'], upgrades = list(dict_obj['Upgrades']))
-                farm = MonkeyFarm(farm_info)
-                self.farms.append(farm)
-
-                #For revenue and expense tracking
-                farm.revenue = 0
-                farm.expenses = farm_total_cost_values[dict_obj['Upgrades']]
-        elif dict_obj['Type'] == 'Upgrade Farm':
-            # There are two ways this function can be used. 
-            ind = dict_obj['Index']
-            path = dict_obj['Path']
-            upgrades = dict_obj['Upgrades']
-            farm = self.farms[ind]
-
-            if stage == 'check':
-                #Do not upgrade a farm that has already been sold!
-                if farm.sell_time is not None:
-                    self.logs.append("WARNING! Tried to upgrade a farm that was already sold! Aborting buy queue!")
-                    self.warnings.append(len(self.logs)-1)
-                    self.valid_action_flag = False
-                
-                #If the user specified for a specific set of upgrades, use that argument
-                if upgrades is not None:
-                    #Prevent the user from upgrading to a T5 farm if that T5 is already in play
-                    for i in range(3):
-                        if upgrades[i] == 5 and self.T5_exists[i]:
-                            self.logs.append("WARNING! Tried to purchase a T5 farm when one of the same kind already existed! Aborting buy queue!")
-                            self.warnings.append(len(self.logs)-1)
-                            self.valid_action_flag = False
-
-                    #For each of top path, middle path, and bottom path, determine the number of upgrades that need to be made
-                    #Then, determine the cost of those upgrades
-                    upgrades_costs = 0
-                    for i in range(3):
-                        #How many times do we need to upgrade the path?
-                        times_to_upgrade = upgrades[i] - farm.upgrades[i]
-                        if times_to_upgrade < 0:
-                            self.logs.append("----")
-                            self.logs.append("WARNING! Tried to downgrade a farm! Aborting buy queue!")
-                            self.logs.append("The farm at index %s was a (%s,%s,%s) farm"%(ind, farm.upgrades[0], farm.upgrades[1], farm.upgrades[2]))
-                            self.logs.append("We tried to upgrade it to a (%s,%s,%s) farm"%(upgrades[0],upgrades[1],upgrades[2]))
-                            self.logs.append("The current list of farms is given by:")
-                            self.logs.append(self.farms)
-                            self.logs.append("The current buy queue looks like: ")
-                            self.logs.append(self.buy_queue)
-                            for i in range(8,0,-1):
-                                self.warnings.append(len(self.logs)-i)
-                            self.valid_action_flag = False
-
-                        #How much do those upgrades cost?
-                        for j in range(times_to_upgrade):
-                            upgrades_costs += farm_upgrades_costs[i][farm.upgrades[i] + j]
-
-                    h_cash, h_loan = impact(h_cash, h_loan, -1*upgrades_costs)
-
-                elif path is not None:
-                    #If the user specifies a specfic path, 
-                    #Prevent the user from upgrading to a T5 farm if that T5 is already in play
-                    if farm.upgrades[path]+1 == 5 and self.T5_exists[path] == True:
-                        self.logs.append("WARNING! Tried to purchase a T5 farm when one of the same kind already existed! Aborting buy queue!")
-                        self.warnings.append(len(self.logs)-1)
-                        self.valid_action_flag = False
-                    
-                    h_cash, h_loan = impact(h_cash, h_loan, -1*farm_upgrades_costs[path][farm.upgrades[path]])
-            else:
-                if upgrades is not None:
-                    farm.upgrade(payout['Time'], upgrades, mode = 'Upgrades')
-                    self.logs.append("Upgraded the farm at index %s to (%s,%s,%s)"%(ind,upgrades[0],upgrades[1],upgrades[2]))
-
-                elif path is not None:
-                    self.logs.append("Upgrading path %s of the farm at index %s"%(path, ind))
-                    farm.upgrade(payout['Time'], path, mode = 'Path')
-
-                    self.logs.append("Upgraded the farm at index %s to (%s,%s,%s)"%(ind, farm.upgrades[0],farm.upgrades[1],farm.upgrades[2]))
-                    
-                #If the resulting farm is a Banana Central, activate the BRF buff, giving them 25% more payment amount
-                if farm.upgrades[0] == 5 and path == 0:
-                    self.logs.append("The new farm is a Banana Central!")
-                    self.T5_exists[0] = True
-                    
-                #If the resutling farm is a Monkeynomics, mark the x5x_exists flag as true to prevent the user from trying to have multiple of them
-                if farm.upgrades[1] == 5 and path == 1:
-                    self.T5_exists[1] = True
-                
-                #If the resulting farm is a MWS, mark the MWS_exists flag as true to prevent the user from trying to have multiple of them.
-                if farm.upgrades[2] == 5 and path == 2:
-                    self.T5_exists[2] = True
-                
-        elif dict_obj['Type'] == 'Sell Farm':
-            if stage == 'check':
-                ind = dict_obj['Index']
-                farm = self.farms[ind]
-                withdraw = dict_obj['Withdraw']
-
-                #Check whether the farm is actually on screen before selling it:
-                h_new_cash, h_new_loan = h_cash, h_loan
-                if farm.sell_time is None:
-                    #If indicated, withdraw from the bank before selling it
-                    if withdraw and farm.upgrades[1] >= 3:
-                        h_new_cash, h_new_loan = impact(h_new_cash, h_new_loan, farm.account_value)
-                    #Selling a farm counts as that farm generating revenue
-                    h_new_cash, h_new_loan = impact(h_new_cash, h_new_loan, farm_sellback_values[tuple(farm.upgrades)])
-                    farm.h_revenue += h_new_cash - h_cash
-                    h_cash, h_loan = h_new_cash, h_new_loan
-                else:
-                    self.logs.append("WARNING! Tried to sell a farm that is not on screen! Aborting buy queue")
-                    self.warnings.append(len(self.logs)-1)
-                    self.valid_action_flag = False
-            else:
-                ind = dict_obj['Index']
-                farm = self.farms[ind]
-                self.logs.append("Selling the farm at index %s"%(ind))
-
-                # If the farm being sold is a Banana Central, we must turn off the BRF buff
-                # If the farm is a T5 of any sorts, ensure that the game state knows we no longer that particular T5
-
-                if farm.upgrades[0] == 5:
-                    self.logs.append("The farm we're selling is a Banana Central! Removing the BRF buff.")
-                    self.T5_exists[0] = False
-                elif farm.upgrades[1] == 5:
-                    self.T5_exists[1] = False
-                elif farm.upgrades[2] == 5:
-                    self.T5_exists[2] = False
-
-                #Mark the farm's sell time. The code checks whether this value is a number or not before trying to compute farm payments
-                farm.sell_time = payout['Time']
-        elif dict_obj['Type'] == 'Sell All Farms':
-            withdraw = dict_obj['Withdraw']
-            if stage == 'check':
-                for farm in self.farms:
-                    if farm.sell_time is None:
-                        h_new_cash, h_new_loan = h_cash, h_loan
-                        #Withdraw from the bank first, provided that the withdraw argument is True *and* the farm given is actually a bank
-                        if withdraw and farm.upgrades[1] >= 3:
-                            h_new_cash, h_new_loan = impact(h_new_cash, h_new_loan, farm.account_value)
-
-                        #Now, sell the farm
-                        h_new_cash, h_new_loan = impact(h_new_cash, h_new_loan, farm_sellback_values[tuple(farm.upgrades)])
-                        farm.h_revenue += h_new_cash - h_cash
-                        h_cash, h_loan = h_new_cash, h_new_loan
-            else:
-                self.logs.append("Selling all farms!")
-                self.T5_exists = [False for i in range(3)] #Obviously, if we sell all farms we won't have any T5's anymore!
-                for farm in self.farms:
-                    farm.sell_time = payout['Time']
-        elif dict_obj['Type'] == 'Withdraw Bank':
-            if stage == 'check':
-                #WARNING: The farm in question must actually be a bank for us to perform a withdrawal!
-                #If it isn't, break the loop prematurely
-                ind = dict_obj['Index']
-                farm = self.farms[ind]
-                if farm.sell_time is not None:
-                    self.logs.append("WARNING! Tried to withdraw from a bank that was already sold! Aborting buy queue!")
-                    self.warnings.append(len(self.logs)-1)
-                    self.valid_action_flag = False
-
-                if farm.upgrades[1] < 3:
-                    self.logs.append("WARNING! Tried to Withdraw from a farm that is not a bank! Aborting buy queue!")
-                    self.warnings.append(len(self.logs)-1)
-                    self.valid_action_flag = False
-                
-                h_new_cash, h_new_loan = impact(h_cash, h_loan, farm.account_value)
-                # self.logs.append("Detected bank withdrawal of %s"%(h_new_cash - h_cash))
-                farm.h_revenue += h_new_cash - h_cash
-                h_cash, h_loan = h_new_cash, h_new_loan
-            else:
-                ind = dict_obj['Index']
-                self.logs.append("Withdrawing money from the bank at index %s"%(ind))
-                farm = self.farms[ind]
-                farm.account_value = 0
-        elif dict_obj['Type'] == 'Withdraw All Banks':
-            if stage == 'check':
-                for farm in self.farms:
-                    if farm.bank:
-                        h_new_cash, h_new_loan = impact(h_cash, h_loan, farm.account_value)
-                        farm.h_revenue += h_new_cash - h_cash
-                        h_cash, h_loan = h_new_cash, h_new_loan
-            else:
-                self.logs.append("Withdrawing money from all banks!")
-                for farm in self.farms:
-                    if farm.bank:
-                        farm.account_value = 0
-        elif dict_obj['Type'] == 'Activate IMF':
-            if stage == 'check':
-                #WARNING: The farm in question must actually be an IMF Loan for us to use this ability!
-                #If it isn't, set a flag to False and break the loop.
-                #DEVELOPER'S NOTE: A farm that has a min_use_time is not necessarily an IMF loan, it could also be an Monkeyopolis
-                #Do not upgrade a farm that has already been sold!
-                ind = dict_obj['Index']
-                farm = self.farms[ind]
-
-                if farm.sell_time is not None:
-                    self.logs.append("WARNING! Tried to take out a loan from a bank that was already sold! Aborting buy queue!")
-                    self.warnings.append(len(self.logs)-1)
-                    self.valid_action_flag = False
-
-                if farm.upgrades[1] != 4:
-                    self.logs.append("WARNING! Tried to take out a loan from a farm that is not an IMF! Aborting buy queue!")
-                    self.warnings.append(len(self.logs)-1)
-                    self.valid_action_flag = False
-                    
-                ind = dict_obj['Index']
-                farm = self.farms[ind]
-                
-                #When, a loan is activated, treat it like a payment, then add the debt
-                h_new_cash, h_new_loan = impact(h_cash, h_loan, farm_globals['IMF Loan Amount'])
-                farm.h_revenue += h_new_cash - h_cash
-                h_new_loan += farm_globals['IMF Loan Amount']
-                h_cash, h_loan = h_new_cash, h_new_loan
-            else:
-                ind = dict_obj['Index']
-                farm = self.farms[ind]
-                self.logs.append("Taking out a loan from the IMF at index %s"%(ind))
-                farm.min_use_time = payout['Time'] + farm_globals['IMF Usage Cooldown']
-        # BOAT FARM RELATED MATTERS
-        elif dict_obj['Type'] == 'Buy Boat Farm':
-            if stage == 'check':
-                h_cash, h_loan = impact(h_cash, h_loan, -1*boat_globals['Merchantmen Cost'])
-            else:
-                self.logs.append("Purchasing boat farm!")
-                boat_farm = {
-                    'Initial Purchase Time': self.current_time,
-                    'Purchase Time': self.current_time,
-                    'Upgrade': 3,
-                    'Revenue': 0,
-                    'Expenses': boat_globals['Merchantmen Cost'],
-                    'Hypothetical Revenue': 0,
-                    'Sell Time': None
-                }
-                self.boat_farms[self.boat_key] = boat_farm
-                self.boat_key += 1
-        elif dict_obj['Type'] == 'Upgrade Boat Farm':
-            if stage == 'check':
-                ind = dict_obj['Index']
-                boat_farm = self.boat_farms[ind]
-                #The following code prevents from the player from having multiple Trade Empires in play
-                if boat_farm['Upgrade']+1 == 5 and self.Tempire_exists == True:
-                    self.logs.append("WARNING! Tried to purchase a Trade Empire when one already exists! Aborting buy queue!")
-                    self.warnings.append(len(self.logs)-1)
-                    self.valid_action_flag = False
-                upgrade_cost = boat_upgrades_costs[boat_farm['Upgrade']-3]
-                h_cash, h_loan = impact(h_cash, h_loan, -1*upgrade_cost)
-            else:
-                ind = dict_obj['Index']
-                        
-                self.logs.append("Upgrading the boat farm at index %s"%(ind))
-                boat_farm = self.boat_farms[ind]
-                boat_farm['Upgrade'] += 1
-
-                #Expense tracking
-                boat_farm['Expenses'] += boat_upgrades_costs[boat_farm['Upgrade'] - 4]
-                
-                #Update the payout information of the boat farm
-                boat_farm['Payout'] = boat_payout_values[boat_farm['Upgrade'] - 3]
-                
-                #So that we can accurately track payments for the boat farm
-                boat_farm['Purchase Time'] = payout['Time']
-                
-                #Update the sellback value of the boat farm
-                boat_farm['Sell Value'] = boat_sell_values[boat_farm['Upgrade'] - 3]
-
-                #If the new boat farm is a Trade Empire, indicate as such
-                if boat_farm['Upgrade'] == 5:
-                    self.logs.append("The new boat farm is a Trade Empire!")
-                    self.Tempire_exists = True
-        elif dict_obj['Type'] == 'Sell Boat Farm':
-            if stage == 'check':
-                ind = dict_obj['Index']
-                boat_farm = self.boat_farms[ind]
-
-                #Check whether the boat farm is actually on screen before selling it:
-                if boat_farm['Sell Time'] is None:
-                    #Selling a farm counts as that farm generating revenue
-                    h_new_cash, h_new_loan = impact(h_cash, h_loan, boat_sell_values[boat_farm['Upgrade']-3])
-                    boat_farm['Hypothetical Revenue'] += h_new_cash - h_cash
-                    h_cash, h_loan = h_new_cash, h_new_loan
-                else:
-                    self.logs.append("WARNING! Tried to sell a boat farm that is not on screen! Aborting buy queue")
-                    self.warnings.append(len(self.logs)-1)
-                    self.valid_action_flag = False
-            else:
-                ind = dict_obj['Index']
-                boat_farm = self.boat_farms[ind]
-                self.logs.append("Selling the boat farm at index %s"%(ind))
-                #If the farm being sold is a Trade Empire, indicate as such
-                if boat_farm['Upgrade'] == 5:
-                    self.logs.append("The boat farm we're selling is a Trade Empire! Removing the Tempire buff.")
-                    self.Tempire_exists = False
-
-                #Mark the boat farm's sell time
-                boat_farm['Sell Time'] = payout['Time']
-        # DRUID FARM RELATED MATTERS
-        elif dict_obj['Type'] == 'Buy Druid Farm':
-            if stage == 'check':
-                h_cash, h_loan = impact(h_cash, h_loan, -1*druid_globals['Druid Farm Cost'])
-            else:
-                self.druid_farms[self.druid_key] = payout['Time']
-                self.druid_key += 1
-                self.logs.append("Purchased a druid farm!")
-        elif dict_obj['Type'] == 'Sell Druid Farm':
-            if stage == 'check':
-                if dict_obj['Index'] == self.sotf:
-                    h_cash, h_loan = impact(h_cash, h_loan, game_globals['Sellback Value']*(druid_globals['Druid Farm Cost'] + druid_globals['Spirit of the Forest Upgrade Cost']))
-                else:
-                    h_cash, h_loan = impact(h_cash, h_loan, game_globals['Sellback Value']*druid_globals['Druid Farm Cost'])
-            else:
-                ind = dict_obj['Index']
-                self.logs.append("Selling the druid farm at index %s"%(ind))
-                #If the druid we're selling is actually SOTF...
-                if self.sotf is not None and ind == self.sotf:
-                    self.logs.append("The druid farm being sold is a Spirit of the Forest!")
-                    self.sotf = None
-                    self.sotf_min_use_time = None
-        elif dict_obj['Type'] == 'Buy Spirit of the Forest':
-            if stage == 'check':
-                #WARNING: There can only be one sotf at a time!
-                if self.sotf is not None:
-                    self.logs.append("WARNING! Tried to purchase a Spirit of the Forest when one already exists! Aborting buy queue!")
-                    self.warnings.append(len(self.logs)-1)
-                    self.valid_action_flag = False
-                h_cash, h_loan = impact(h_cash, h_loan, -1*druid_globals['Spirit of the Forest Upgrade Cost'])
-            else:
-                ind = dict_obj['Index']
-                self.sotf = ind
-                self.logs.append("Upgrading the druid farm at index %s into a Spirit of the Forest!"%(ind))
-                #Determine the minimum time that the SOTF active could be used
-                i = floor((20 + payout['Time'] - self.druid_farms[ind])/40) + 1
-                self.sotf_min_use_time = payout['Time'] + 20 + 40*(i-1)
-        elif dict_obj['Type'] == 'Repeatedly Buy Druid Farms':
-            #Note, there is no "checking" stage for this action.
-            if stage != 'check':
-                self.druid_farm_max_buy_time = dict_obj['Maximum Buy Time']
-                self.druid_farm_buffer = dict_obj['Buffer']
-                self.logs.append("Triggered automated druid farm purchases until time %s"%(self.druid_farm_max_buy_time))
-        # SUPPLY DROP RELATED MATTERS
-        elif dict_obj['Type'] == 'Buy Supply Drop':
-            if stage == 'check':
-                h_cash, h_loan = impact(h_cash, h_loan, -1*sniper_globals['Supply Drop Cost'])
-            else:
-                self.supply_drops[self.sniper_key] = payout['Time']
-                self.sniper_key += 1
-                self.logs.append("Purchased a supply drop!")
-        elif dict_obj['Type'] == 'Sell Supply Drop':
-            if stage == 'check':
-                if dict_obj['Index'] == self.elite_sniper:
-                    h_cash, h_loan = impact(h_cash, h_loan, game_globals['Sellback Value']*(sniper_globals['Supply Drop Cost'] + sniper_globals['Elite Sniper Upgrade Cost']) )
-                else:
-                    h_cash, h_loan = impact(h_cash, h_loan, game_globals['Sellback Value']*sniper_globals['Supply Drop Cost'])
-            else:
-                ind = dict_obj['Index']
-                self.logs.append("Selling the supply drop at index %s"%(ind))
-                #If the supply drop we're selling is actually an E-sniper, then...
-                if self.elite_sniper is not None:
-                    if ind == self.elite_sniper:
-                        self.logs.append("The supply drop being sold is an elite sniper!")
-                        self.elite_sniper = None
-        elif dict_obj['Type'] == 'Buy Elite Sniper':
-            if stage == 'check':
-                #WARNING: There can only be one e-sniper at a time!
-                if self.elite_sniper is not None:
-                    self.logs.append("WARNING! Tried to purchase an Elite Sniper when one already exists! Aborting buy queue!")
-                    self.warnings.append(len(self.logs)-1)
-                    self.valid_action_flag = False
-                h_cash, h_loan = impact(h_cash, h_loan, -1*sniper_globals['Elite Sniper Upgrade Cost'])
-            else:
-                ind = dict_obj['Index']
-                self.elite_sniper = ind
-                self.logs.append("Upgrading the supply drop at index %s into an elite sniper!"%(ind))
-        elif dict_obj['Type'] == 'Repeatedly Buy Supply Drops':
-            #There is no checking stage for this action
-            if stage != 'check':
-                self.supply_drop_max_buy_time = dict_obj['Maximum Buy Time']
-                self.supply_drop_buffer = dict_obj['Buffer']
-                self.logs.append("Triggered automated supply drop purchases until time %s"%(self.supply_drop_max_buy_time))
-        # HELI FARM RELATED MATTERS
-        elif dict_obj['Type'] == 'Buy Heli Farm':
-            if stage == 'check':
-                h_cash, h_loan = impact(h_cash, h_loan, -1*heli_globals['Heli Farm Cost'])
-            else:
-                self.heli_farms[self.heli_key] = payout['Time']
-                self.heli_key += 1
-                self.logs.append("Purchased a heli farm!")
-        elif dict_obj['Type'] == 'Sell Heli Farm':
-            if stage == 'check':
-                if dict_obj['Index'] == self.special_poperations:
-                    h_cash, h_loan = impact(h_cash, h_loan, game_globals['Sellback Value']*(heli_globals['Heli Farm Cost'] + heli_globals['Special Poperations Upgrade Cost']) )
-                else:
-                    h_cash, h_loan = impact(h_cash, h_loan, game_globals['Sellback Value']*heli_globals['Heli Farm Cost'])
-            else:
-                ind = dict_obj['Index']
-                self.logs.append("Selling the heli farm at index %s"%(ind))
-                #If the supply drop we're selling is actually a special poperations, then...
-                if self.special_poperations is not None:
-                    if ind == self.special_poperations:
-                        self.logs.append("The heli farm being sold is a special poperations!")
-                        self.elite_sniper = None
-                
-                self.supply_drops.pop(ind)
-        elif dict_obj['Type'] == 'Buy Special Poperations':
-            if stage == 'check':
-                #WARNING: There can only be one Special Poperations on screen at a time!
-                if self.special_poperations is not None:
-                    self.logs.append("WARNING! Tried to purchase Special Poperations when one already exists! Aborting buy queue!")
-                    self.warnings.append(len(self.logs)-1)
-                    self.valid_action_flag = False
-                h_cash, h_loan = impact(h_cash, h_loan, -1*heli_globals['Special Poperations Upgrade Cost'])
-            else:
-                ind = dict_obj['Index']
-                self.special_poperations = ind
-                self.logs.append("Upgrading the heli farm at index %s into special poperations!"%(ind))
-        elif dict_obj['Type'] == 'Repeatedly Buy Heli Farms':
-            #This action does not have a checking stage.
-            if stage != 'check':
-                self.heli_farm_max_buy_time = dict_obj['Maximum Buy Time']
-                self.heli_farm_buffer = dict_obj['Buffer']
-                self.logs.append("Triggered automated heli farm purchases until time %s"%(self.heli_farm_max_buy_time))
-        # JERICHO RELATED MATTERS
-        elif dict_obj['Type'] == 'Jericho Steal':
-            if stage != 'check':
-                self.jericho_steal_time = dict_obj['Minimum Buy Time']
-                self.jericho_steal_amount = dict_obj['Steal Amount']
-                self.cash, self.loan = impact(self.cash,self.loan, dict_obj['Steal Amount']) #If this line is not here, the sim would fail to capture the jeri payment that occurs immediately upon activation.
-        # OVERCLOCK RELATED MATTERS
-        elif dict_obj['Type'] == 'Buy Overclock':
-            if stage == 'check':
-                h_cash, h_loan = impact(h_cash, h_loan, -1*engi_globals['Overclock Cost'])
-            else:
-                self.logs.append("Purchasing overclock!")
-                self.overclocks.append({
-                    'Initial Purchase Time': payout['Time'],
-                    'Use Time': payout['Time'],
-                    'Sell Time': None
-                })
-        elif dict_obj['Type'] == 'Use Overclock':
-            ind = dict_obj['Engineer Index']
-            overclock = self.overclocks[ind]
-
-            if stage == 'check':
-                if overclock['Sell Time'] is not None:
-                    self.logs.append("WARNING! Tried to use an overclock that was already sold! Aborting buy queue!")
-                    self.warnings.append(len(self.logs)-1)
-                    self.valid_action_flag = False
-            else:
-                # Overclock the farm
-                farm = self.farms[dict_obj['Farm Index']]
-                farm.overclock(payout['Time'])
-
-                # Update the use time of the overclock
-                if self.ultraboost_index is not None and ind == self.ultraboost_index:
-                    #The overclock is in fact an ultraboost
-                    overclock['Use Time'] = payout['Time'] + engi_globals['Ultraboost Usage Cooldown']
-                else:
-                    #The overclock is just a normal overclock
-                    overclock['Use Time'] = payout['Time'] + engi_globals['Overclock Usage Cooldown']
-
-
-        elif dict_obj['Type'] == 'Sell Overclock':
-            ind = dict_obj['Index']
-            overclock = self.overclocks[ind]
-            if stage == 'check':
-                #Check whether the overclock is actually on screen before selling it:
-                if overclock['Sell Time'] is None:
-                    if self.ultraboost_index is not None and ind == self.ultraboost_index:
-                        sell_value = game_globals['Sellback Value']*(engi_globals['Overclock Cost'] + engi_globals['Ultraboost Upgrade Cost'])
-                    else:
-                        sell_value = game_globals['Sellback Value']*engi_globals['Overclock Cost']
-                    h_cash, h_loan = impact(h_cash, h_loan, sell_value)
-                else:
-                    self.logs.append("WARNING! Tried to sell an overclock that is not on screen! Aborting buy queue")
-                    self.warnings.append(len(self.logs)-1)
-                    self.valid_action_flag = False
-            else:
-                ind = dict_obj['Index']
-                overclock = self.overclocks[ind]
-                overclock['Sell Time'] = payout['Time']
-
-                #If the overclock being sold is an ultraboost, update the ultraboost index
-                if self.ultraboost_index is not None and ind == self.ultraboost_index:
-                    self.ultraboost_index = None
-                
-                self.logs.append("Selling the overclock at index %s"%(ind))
-        elif dict_obj['Type'] == 'Buy Ultraboost':
-            if stage == 'check':
-                #Do not allow the ultraboost to be purchased if there is already an ultraboost on screen.
-                if self.ultraboost_index is not None:
-                    self.logs.append("WARNING! There is already an Ultraboost on screen! Aborting buy queue")
-                    self.warnings.append(len(self.logs)-1)
-                    self.valid_action_flag = False
-                h_cash, h_loan = impact(h_cash, h_loan, engi_globals['Ultraboost Upgrade Cost'])
-            else:
-                ind = dict_obj['Index']
-                overclock = self.overclocks[ind]
-                overclock['Use Time'] = payout['Time'] #The Ultraboost ability is battle ready.
-                self.ultraboost_index = ind
-
+        handler = action_handlers.get(dict_obj['Type'])
         if stage == 'check':
+            if handler is not None:
+                h_cash, h_loan = handler.check(self, dict_obj, payout_time, h_cash, h_loan)
             return h_cash, h_loan
         elif stage == 'process':
+            if handler is not None:
+                handler.apply(self, dict_obj, payout_time)
             return None
             
\ No newline at end of file
@@ -0,0 +1,93 @@
+# %%
+from array import array
+from b2sim.engine.info import *
+
+# %%
+class AttackQueue():
+    '''
+    The attack queue - the list of bloon sends in the center of the screen that pops up whenever you send eco.
+
+    The queue holds the times at which each send in the queue finishes sending, oldest first.
+    Since the queue can never hold more than game_globals['Max Queue Length'] sends, it is stored as a fixed-capacity ring buffer,
+    so that removing finished sends from the front of the queue does not shift the rest of the queue.
+
+    The queue otherwise behaves like a list of floats: len(queue), queue[0], queue[-1], and iterating over the queue all work as expected.
+    '''
+
+    def __init__(self, capacity = game_globals['Max Queue Length'], times = ()):
+        self.capacity = capacity
+        self.times = array('d', [0.0])*capacity
+        self.start = 0 # The index in self.times of the oldest send in the queue
+        self.size = 0 # The number of sends in the queue
+
+        for time in times:
+            self.append(time)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.size
+        if i < 0 or i >= self.size:
+            raise IndexError("attack queue index out of range")
+        return self.times[(self.start + i) % self.capacity]
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self.times[(self.start + i) % self.capacity]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return str(list(self))
+
+    def append(self, time):
+        '''
+        Add a send finishing at the given time to the back of the queue.
+        '''
+        if self.size == self.capacity:
+            raise IndexError("attack queue is full")
+        self.times[(self.start + self.size) % self.capacity] = time
+        self.size += 1
+
+    def discard(self, num_sends = 1):
+        '''
+        Remove the num_sends oldest sends from the queue.
+        '''
+        num_sends = min(num_sends, self.size)
+        self.start = (self.start + num_sends) % self.capacity
+        self.size -= num_sends
+
+    def countFinished(self, time):
+        '''
+        Return the number of sends in the queue which finish at or before the given time.
+        '''
+        count = 0
+        while count < self.size and self.times[(self.start + count) % self.capacity] <= time:
+            count += 1
+        return count
+
+    def expire(self, time):
+        '''
+        Remove every send which finishes at or before the given time from the queue.
+
+        Returns:
+        (int): The number of sends removed
+        '''
+        count = self.countFinished(time)
+        self.discard(count)
+        return count
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+
+    def copy(self):
+        queue = AttackQueue.__new__(AttackQueue)
+        queue.capacity = self.capacity
+        queue.times = array('d', self.times)
+        queue.start = self.start
+        queue.size = self.size
+        return queue
@@ -2,7 +2,9 @@
 import csv
 from math import floor, ceil
 import os
+import random
 from bisect import bisect_right
+from itertools import accumulate
 
 nat_send = [0.5,18,17,18,23,21,17,17,15,14,5,8,11,12.5,5.5,9,27,33,20,30,1,10,24,6,54,30,21,18,17,40,1,48.294,9.53,22.75,8.44166,41.142,21.698,82.385,58.92083,90,2,35.68,25,21,14.55,11.9,35,15,32.12,30,0.1]
 nat_stall = [5.5,9,10.5,11.5,12.5,13.5,14.5,15.5,13,17.5,16,16,18,13.5,16.5,23.5,11,13,12,14,28.5,16,13,16,15,27,28,22,23,18,38.5,15,15,15,15,15,15,15,15,15,48.5,15,15,15,15,15,15,15,15,15,58.5]
@@ -13,58 +15,144 @@ nat_stall = [5.5,9,10.5,11.5,12.5,13.5,14.5,15.5,13,17.5,16,16,18,13.5,16.5,23.5
 # 2. Theoretical Stall Factor - Just like 
 # 3. Stall Times
 # 4. Manual
+# 5. Random Stall Factor - Like Stall Factor, but each round's stall factor is drawn from a distribution
+
+def maxStallTimes(mode):
+    #Helper function for computeRoundStarts. Returns the maximum stall time of each round and the maximum anti-stall time.
+    max_antistall_time = 5.5
+    if mode == 'Stall Factor':
+        max_stall_times = nat_stall
+    else:
+        #If using the Theoretical Stall Factor or Stall Times modes, use the round timer to determine maximum stall times
+        max_stall_times = [8.5 + i for i in range(51)]
+        max_stall_times[0] = max_antistall_time
+    return max_stall_times, max_antistall_time
+
+def stallMode(mode):
+    #Helper function for the Rounds class. Returns which maximum stall times to use when changing the stall factor of rounds built in the given mode mid-game.
+    if mode == 'Theoretical Stall Factor' or mode == 'Stall Times':
+        return mode
+    return 'Stall Factor'
+
+def computeRoundStarts(info, mode = 'Stall Factor'):
+    '''
+    Compute the start times of each round given stall info. See the Rounds class for the meaning of info and mode.
+
+    Returns:
+    (list): The start time of each round
+    '''
+    max_stall_times, max_antistall_time = maxStallTimes(mode)
+
+    #Backwards compatability with the old system:
+    if type(info) == float or type(info) == int:
+        info = [(0,info)]
+
+    #If the user fails to specify stall factor info for round 0...
+    if info[0][0] > 0:
+        info = [(0,info[0][1])] + list(info[1:])
+
+    #Compute the round times given the stall factor info
+    val = 0
+    round_starts = [0]
+
+    ind_of_interest = 0
+    stall_info = info[ind_of_interest][1]
+    for i in range(len(nat_send)):
+
+        #If we have reached a round where the stall info changes, change the stall info
+        if len(info) >= ind_of_interest + 2 and i >= info[ind_of_interest+1][0]:
+            ind_of_interest += 1
+            stall_info = info[ind_of_interest][1]
+        
+        if mode == 'Stall Times':
+            #Interpret the stall info as meaning, "the given round is stalled for this many seconds"
+            round_len = nat_send[i] + max(max_antistall_time,min(max_stall_times[i],stall_info))
+        elif mode == 'Stall Factor' or mode == 'Theoretical Stall Factor':
+            #Interpret the stall info as meaning, "the given round has this stall factor"
+            round_len = nat_send[i] + (1-stall_info)*max_antistall_time + stall_info*max_stall_times[i]
+        val += round_len
+        round_starts.append(val)
+
+    return round_starts
+
+def sampleStallInfo(info, rng):
+    '''
+    Helper function for the 'Random Stall Factor' mode of the Rounds class. Draws a stall factor for every round.
+
+    Parameters:
+    info: Stall info in the same format as the 'Stall Factor' mode (a list of (round, stall info) pairs, or a single stall info for every round),
+    except that each stall info may be a distribution instead of a number:
+    - A number: The round is always stalled with this stall factor
+    - A tuple (low, high): The stall factor is drawn uniformly between low and high
+    - A function: Called with rng, returns the stall factor
+    rng (random.Random): The random number generator to draw stall factors with
+    Every stall factor drawn is clamped to the interval [0,1], so a wide distribution (for instance a normal distribution) never produces a negative stall or a stall past the round's maximum.
+
+    Returns:
+    (list): Stall info with a fixed stall factor for every round, in the format of the 'Stall Factor' mode
+    '''
+    if type(info) != list:
+        info = [(0,info)]
+
+    stall_factors = []
+    ind_of_interest = 0
+    for i in range(len(nat_send)):
+        if len(info) >= ind_of_interest + 2 and i >= info[ind_of_interest+1][0]:
+            ind_of_interest += 1
+        distribution = info[ind_of_interest][1]
+
+        if type(distribution) == tuple:
+            stall_factor = rng.uniform(distribution[0], distribution[1])
+        elif callable(distribution):
+            stall_factor = distribution(rng)
+        else:
+            stall_factor = distribution
+        stall_factors.append((i, min(max(stall_factor, 0), 1)))
+    return stall_factors
 
 class Rounds():
-    def __init__(self, info, mode = 'Stall Factor'):
+    def __init__(self, info, mode = 'Stall Factor', seed = None):
+
+        #Which maximum stall times to use when changing the stall factor mid-game (see self.changeStallFactor)
+        self.stall_mode = stallMode(mode)
+
+        #Cache for self.getFarmPayoutTimes
+        self.farm_payout_times = {}
+
+        #The index found by the last call of self.getRoundFromTime (see there)
+        self.round_cursor = 1
+
+        #Natural send lengths are needed to determine when farms pay out
+        self.nat_send_lens = nat_send
 
         if mode == 'Manual':
             #For manually setting round times
             self.round_starts = info
             return None
 
-        #Determine natural send lengths, max stall times, and max anti-stall times
-        self.nat_send_lens = nat_send
+        if mode == 'Random Stall Factor':
+            #Real opponents don't stall the same way every game. In this mode, draw each round's stall factor at random (see sampleStallInfo).
+            #The seed makes the draws reproducible.
+            self.stall_factors = sampleStallInfo(info, random.Random(seed))
+            self.round_starts = computeRoundStarts(self.stall_factors, 'Stall Factor')
+            return None
 
-        max_antistall_time = 5.5
-        if mode == 'Stall Factor':
-            max_stall_times = nat_stall
-        else:
-            #If using the Theoretical Stall Factor or Stall Times modes, use the round timer to determine maximum stall times
-            max_stall_times = [8.5 + i for i in range(51)]
-            max_stall_times[0] = max_antistall_time
-        
-        #Backwards compatability with the old system:
-        if type(info) == float:
-            info = [(0,info)]
-
-        #If the user fails to specify stall factor info for round 0...
-        if info[0][0] > 0:
-            info[0] = (0,info[0][1])
-
-        #Compute the round times given the stall factor info
-        val = 0
-        self.round_starts = [0]
-
-        ind_of_interest = 0
-        stall_info = info[ind_of_interest][1]
-        for i in range(len(self.nat_send_lens)):
-
-            #If we have reached a round where the stall info changes, change the stall info
-            if len(info) >= ind_of_interest + 2 and i >= info[ind_of_interest+1][0]:
-                ind_of_interest += 1
-                stall_info = info[ind_of_interest][1]
-            
-            if mode == 'Stall Times':
-                #Interpret the stall info as meaning, "the given round is stalled for this many seconds"
-                round_len = self.nat_send_lens[i] + max(max_antistall_time,min(max_stall_times[i],stall_info))
-            elif mode == 'Stall Factor' or mode == 'Theoretical Stall Factor':
-                #Interpret the stall info as meaning, "the given round has this stall factor"
-                round_len = self.nat_send_lens[i] + (1-stall_info)*max_antistall_time + stall_info*max_stall_times[i]
-            val += round_len
-            self.round_starts.append(val)
+        self.round_starts = computeRoundStarts(info, mode)
             
     def getRoundFromTime(self, time, get_frac_part = False):
-        ind = bisect_right(self.round_starts, time)
+        # As the simulation advances, it mostly asks for the round of times in the same round as the last time it asked about (or the round after).
+        # So before falling back on a binary search, check the round found by the last call and the round after it.
+        round_starts = self.round_starts
+        ind = self.round_cursor
+        if ind < len(round_starts) and round_starts[ind-1] <= time < round_starts[ind]:
+            pass
+        elif ind + 1 < len(round_starts) and round_starts[ind] <= time < round_starts[ind+1]:
+            ind += 1
+            self.round_cursor = ind
+        else:
+            ind = bisect_right(round_starts, time)
+            if ind > 0:
+                self.round_cursor = ind
         
         if get_frac_part:
             frac_part = (time - self.round_starts[ind-1])/(self.round_starts[ind] - self.round_starts[ind-1])
@@ -73,11 +161,35 @@ class Rounds():
         return ind - 1
     
     def getTimeFromRound(self, round_val):
+        #Most calls ask for the start of a whole round, which needs no interpolation.
+        if type(round_val) == int and round_val >= 0:
+            return self.round_starts[min(round_val,50)]
         frac_part = round_val - floor(round_val)
         time = (1-frac_part)*self.round_starts[int(min(floor(round_val),50))] + frac_part*self.round_starts[int(min(ceil(round_val),50))]
         #self.logs.append("Mapped round %s to time %s"%(round_val,time))
         return time
     
+    def getRoundsFromTimes(self, times, get_frac_part = False):
+        #Batch version of self.getRoundFromTime. This is fastest when the times are sorted.
+        return [self.getRoundFromTime(time, get_frac_part) for time in times]
+
+    def getTimesFromRounds(self, round_vals):
+        #Batch version of self.getTimeFromRound
+        return [self.getTimeFromRound(round_val) for round_val in round_vals]
+
+    def getFarmPayoutTimes(self, round_val, payout_frequency):
+        #Returns a tuple of the times a farm which pays out payout_frequency times per round pays out during the given round.
+        #This does not apply to the round the farm was bought in! (see PayoutScheduler.pushFarmPayout)
+        #NOTE: The result is cached. If you change self.round_starts directly, clear self.farm_payout_times afterwards!
+        key = (round_val, payout_frequency)
+        payout_times = self.farm_payout_times.get(key)
+        if payout_times is None:
+            round_start = self.round_starts[round_val]
+            nat_send_len = self.nat_send_lens[round_val]
+            payout_times = tuple([round_start + slot*nat_send_len/payout_frequency for slot in range(payout_frequency)])
+            self.farm_payout_times[key] = payout_times
+        return payout_times
+
     def getStallTimes(self):
         #given self.round_starts, determine how long each round is stalled for in seconds
         stall_times = [0]
@@ -85,25 +197,95 @@ class Rounds():
             stall_times.append((self.round_starts[i+1] - self.round_starts[i]) - self.nat_send_lens[i])
         return stall_times
 
-    def changeStallFactor(self,stall_factor, current_time):
-        #self.logs.append("MESSAGE FROM Rounds.changeStallFactor():")
-        #self.logs.append("Changing the stall factor from %s to %s"%(self.stall_factor,stall_factor))
-        #self.logs.append("The old round start times were %s"%(self.round_starts))
-        
-        game_round = self.rounds.getRoundFromTime(current_time)
-        
+    def changeStallFactor(self, stall_factor, current_time):
+        '''
+        Change the stall factor of the game mid-game. Every round which hasn't finished sending yet as of current_time gets the new stall factor.
+        Only the start times of the rounds after that are recomputed, and self.round_starts is modified in place.
+
+        WARNING: Game states which share this Rounds object will see the change too! 
+        To change the stall factor of a game in progress, use GameState.changeStallFactor, which gives the game state its own copy first.
+
+        Parameters:
+        stall_factor (float): The new stall factor
+        current_time (float): The time at which the stall factor changes
+
+        Returns:
+        (int): The first round whose start time changed
+        '''
+        max_stall_times, max_antistall_time = maxStallTimes(self.stall_mode)
+
+        game_round = self.getRoundFromTime(current_time)
         if current_time < self.round_starts[game_round] + self.nat_send_lens[game_round]:
-            #Yes, the current round should have its stall time modified
+            #The current round is still sending, so its stall time should be modified
             start_ind = game_round
         else:
-            #No, the current round should not have its stall time modified
-            start_ind = game_round+1
-            val = self.round_starts[start_ind]
-        
-        for i in range(start_ind, len(self.nat_send_lens)-1):
-            #print("Trying index %s"%(str(i)))
-            val += self.nat_send_lens[i] + (1-stall_factor)*4 + stall_factor*max_stall_times[i]
+            #The current round has finished sending, so only later rounds are modified
+            start_ind = game_round + 1
+
+        val = self.round_starts[start_ind]
+        for i in range(start_ind, min(len(self.nat_send_lens), len(self.round_starts) - 1)):
+            val += self.nat_send_lens[i] + (1-stall_factor)*max_antistall_time + stall_factor*max_stall_times[i]
             self.round_starts[i+1] = val
-        
-        self.logs.append("The new round start times are %s"%(self.round_starts))
-  
\ No newline at end of file
+
+        #Farm payout times of the rounds which moved are no longer valid
+        for key in list(self.farm_payout_times.keys()):
+            if key[0] > start_ind:
+                del self.farm_payout_times[key]
+
+        return start_ind + 1
+
+    def copy(self):
+        #Returns a copy of the rounds which can be modified (with changeStallFactor, for instance) without affecting this one
+        rounds = Rounds.__new__(Rounds)
+        rounds.__dict__.update(self.__dict__)
+        rounds.round_starts = list(self.round_starts)
+        rounds.farm_payout_times = dict(self.farm_payout_times)
+        return rounds
+
+class RoundsBatch():
+    '''
+    Many Rounds objects at once, for sweeping over stall factors (or stall times) to see how robust a strategy is.
+
+    The round start times of every scenario are kept together in self.round_starts, which is a list with one row per scenario.
+    batch[i] gives a Rounds object for the i-th scenario which shares its row of self.round_starts.
+
+    Parameters:
+    infos (list): A list of stall info, one per scenario, in any format accepted by the Rounds class
+    mode (str): Any mode accepted by the Rounds class except 'Manual'
+    '''
+
+    def __init__(self, infos, mode = 'Stall Factor'):
+        self.mode = mode
+        self.round_starts = [computeRoundStarts(info, mode) for info in infos]
+
+    @classmethod
+    def sweep(cls, stall_factors, mode = 'Stall Factor'):
+        '''
+        Build a batch with one scenario for each (constant) stall factor in stall_factors.
+        Rather than parse stall info round by round for every scenario, each scenario's round lengths are computed in one pass
+        over the natural send lengths and maximum stall times, and its round start times are their cumulative sum.
+        The results are identical to those of Rounds(stall_factor, mode).
+        '''
+        if mode == 'Stall Times':
+            return cls([[(0,stall_time)] for stall_time in stall_factors], mode)
+
+        max_stall_times, max_antistall_time = maxStallTimes(mode)
+        batch = cls([], mode)
+        for stall_factor in stall_factors:
+            antistall = (1-stall_factor)*max_antistall_time
+            round_lens = [nat_send_len + antistall + stall_factor*max_stall_time for nat_send_len, max_stall_time in zip(nat_send, max_stall_times)]
+            batch.round_starts.append([0] + list(accumulate(round_lens)))
+        return batch
+
+    def __len__(self):
+        return len(self.round_starts)
+
+    def __getitem__(self, i):
+        view = Rounds(self.round_starts[i], mode = 'Manual')
+        #Changing the stall factor of a view should use the maximum stall times of the batch's mode, not those of 'Manual' mode
+        view.stall_mode = stallMode(self.mode)
+        return view
+
+    def __iter__(self):
+        for i in range(len(self.round_starts)):
+            yield self[i]
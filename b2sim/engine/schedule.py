@@ -0,0 +1,430 @@
+# %%
+from heapq import heappush, heappop
+from bisect import bisect_right
+from array import array
+from math import floor, ceil
+from b2sim.engine.info import *
+
+# %%
+
+# Sources of income that the payout scheduler keeps track of.
+# WARNING: The order of these values matters! If multiple payouts occur at the same time, they are awarded in increasing order of their source.
+ECO_SOURCE = 0
+DRUID_SOURCE = 1
+SOTF_SOURCE = 2
+SNIPER_SOURCE = 3
+HELI_SOURCE = 4
+FARM_SOURCE = 5
+BOAT_SOURCE = 6
+JERICHO_SOURCE = 7
+GHOST_SOURCE = 8
+
+# Farms produce up to three kinds of payouts. When they occur at the same time, they are awarded in this order.
+MONKEYNOMICS_PAYOUT = 0
+BANK_INTEREST_PAYOUT = 1
+FARM_PAYOUT = 2
+
+# Types of payouts. These tell the GameState *how* a payout should be awarded.
+DIRECT_PAYOUT = 0 # Added directly to the player's cash
+BANK_PAYMENT = 1 # Deposited into a bank's account
+BANK_INTEREST = 2 # The start of round bank bonus plus interest
+ECO_PAYOUT = 3 # The player's eco. The amount is determined when the payout is awarded.
+
+# Flags marking which values of a payout were ints before being stored in the PayoutSchedule
+INT_TIME = 1
+INT_AMOUNT = 2
+
+# The last round the simulator has information for
+max_round = 50
+
+class PayoutSchedule():
+    '''
+    An ordered list of payouts, stored as parallel arrays rather than as one dictionary per payout.
+
+    The i-th payout occurs at times[i], is worth amounts[i] dollars, is of type types[i] (DIRECT_PAYOUT, BANK_PAYMENT, etc.),
+    and comes from the income source sources[i] (ECO_SOURCE, FARM_SOURCE, etc.). For farms, indices[i] is the index of the farm in the game state.
+    entries[i] holds the scheduler's internal record of the payout so that the payout can be put back into the scheduler if it is not awarded.
+
+    The times and amounts arrays turn every value into a float, so flags[i] remembers whether the time (INT_TIME) and amount (INT_AMOUNT) were ints when scheduled.
+    The GameState converts those values back to ints when it awards the payout, so that its cash, times, and logs read "50" and "time 6" rather than "50.0" and "time 6.0".
+    '''
+
+    def __init__(self):
+        self.times = array('d')
+        self.amounts = array('d')
+        self.types = array('b')
+        self.sources = array('b')
+        self.indices = array('l')
+        self.flags = array('b')
+        self.entries = []
+
+    def __len__(self):
+        return len(self.times)
+
+    def append(self, time, amount, payout_type, source, index = -1, entry = None):
+        self.times.append(time)
+        self.amounts.append(amount)
+        self.types.append(payout_type)
+        self.sources.append(source)
+        self.indices.append(index)
+        self.flags.append((type(time) == int)*INT_TIME | (type(amount) == int)*INT_AMOUNT)
+        self.entries.append(entry)
+
+    def clear(self):
+        del self.times[:]
+        del self.amounts[:]
+        del self.types[:]
+        del self.sources[:]
+        del self.indices[:]
+        del self.flags[:]
+        self.entries.clear()
+
+class PayoutScheduler():
+    '''
+    A priority queue of the upcoming payouts of every income source in a GameState.
+
+    Rather than recompute every payout from scratch whenever the GameState is advanced, the scheduler holds onto *one* upcoming payout per income source
+    (in the form of a tuple (time, source, index, sub, version, round, slot, requeued)) and only computes the next payout of a source once the current one has been awarded.
+    When a purchase changes an income source (for instance, upgrading or selling a farm), the GameState tells the scheduler to reset *that* source only.
+
+    Payouts belonging to a source that has been reset are invalidated by bumping the version number of that source.
+    Invalidated payouts are simply discarded when they reach the front of the queue.
+    '''
+
+    def __init__(self, game_state):
+        self.heap = []
+        self.versions = {} # (source, index) -> current version number of that income source
+        self.purchase_rounds = {} # farm index -> the round the farm was purchased (or last upgraded) on
+        self.schedule = PayoutSchedule() # Reused by self.drain to avoid allocating a new schedule every time the game state is advanced
+
+        self.reset(game_state, game_state.current_time)
+
+    def copy(self):
+        #Helper method for GameState.snapshot. The entries of the heap are tuples, so copying the heap itself is enough.
+        scheduler = PayoutScheduler.__new__(PayoutScheduler)
+        scheduler.heap = list(self.heap)
+        scheduler.versions = self.versions.copy()
+        scheduler.purchase_rounds = self.purchase_rounds.copy()
+        scheduler.schedule = PayoutSchedule()
+        return scheduler
+
+    def reset(self, game_state, time):
+        '''
+        Discard all scheduled payouts and compute the next payout of every income source in the game state from scratch.
+
+        Parameters:
+        game_state (GameState): The game state whose payouts we want to schedule
+        time (float): Only payouts occuring strictly after this time will be scheduled.
+
+        Returns:
+        None
+        '''
+        self.heap = []
+        for key in self.versions:
+            self.versions[key] += 1
+
+        self.resetSource(game_state, ECO_SOURCE, 0, time)
+
+        for source in (DRUID_SOURCE, SNIPER_SOURCE, HELI_SOURCE):
+            self.resetAltEco(game_state, source, time)
+        if game_state.sotf is not None:
+            self.resetSource(game_state, SOTF_SOURCE, game_state.sotf, time)
+
+        self.resetFarms(game_state, time)
+
+        if len(game_state.boat_farms) > 0:
+            self.resetSource(game_state, BOAT_SOURCE, 0, time)
+        self.resetSource(game_state, JERICHO_SOURCE, 0, time)
+
+    def resetRoundSources(self, game_state, time):
+        '''
+        Reschedule the payouts of every income source whose payout times depend on when rounds start: 
+        farms (including bank interest and the MWS bonus), boat farms, and Spirit of the Forest.
+        Use this after the round start times of the game state change (see GameState.changeStallFactor).
+
+        Parameters:
+        game_state (GameState): The game state whose payouts we want to schedule
+        time (float): Only payouts occuring strictly after this time will be scheduled.
+        '''
+        if game_state.sotf is not None:
+            self.resetSource(game_state, SOTF_SOURCE, game_state.sotf, time)
+        if len(game_state.boat_farms) > 0:
+            self.resetSource(game_state, BOAT_SOURCE, 0, time)
+        self.resetFarms(game_state, time)
+
+    def resetFarms(self, game_state, time):
+        #Helper method for when the indices of the farms in the game state have been shuffled around (for instance, after sorting them)
+        for key in list(self.versions.keys()):
+            if key[0] == FARM_SOURCE:
+                self.removeSource(FARM_SOURCE, key[1])
+        for index in game_state.active_farms:
+            self.resetSource(game_state, FARM_SOURCE, index, time)
+
+    def removeSource(self, source, index):
+        '''
+        Stop scheduling payouts from the given income source. Any payouts from the source still in the queue are invalidated.
+        '''
+        key = (source, index)
+        self.versions[key] = self.versions.get(key, 0) + 1
+        if source == FARM_SOURCE:
+            self.purchase_rounds.pop(index, None)
+
+    def resetSource(self, game_state, source, index, time):
+        '''
+        Invalidate all scheduled payouts from the given income source and schedule its next payout after the given time.
+        This method should be called whenever a transaction changes *when* a source of income pays out, or when a new source of income is added.
+
+        Parameters:
+        game_state (GameState): The game state the source of income belongs to
+        source (int): The type of income source (ECO_SOURCE, DRUID_SOURCE, etc.)
+        index (int): Identifies the income source among all sources of the same type
+        time (float): The next payout of the source will occur strictly after this time.
+
+        Returns:
+        None
+        '''
+        self.removeSource(source, index)
+        version = self.versions[(source, index)]
+
+        if source == ECO_SOURCE:
+            k = floor(time/6)+1
+            heappush(self.heap, (6*k, source, index, 0, version, 0, k, 0))
+
+        elif source == DRUID_SOURCE or source == SNIPER_SOURCE or source == HELI_SOURCE:
+            store = self.altEcoStore(game_state, source)
+            if store.sold[index]:
+                return None
+            #Determine the earliest activation that could occur after the given time
+            use_time, use_index = store.nextUse(index, time)
+            heappush(self.heap, (use_time, source, index, 0, version, 0, use_index, 0))
+
+        elif source == SOTF_SOURCE or source == BOAT_SOURCE:
+            #These sources pay out at the start of each round
+            round_val = game_state.rounds.getRoundFromTime(time) + 1
+            if round_val <= max_round:
+                heappush(self.heap, (game_state.rounds.getTimeFromRound(round_val), source, index, 0, version, round_val, 0, 0))
+
+        elif source == FARM_SOURCE:
+            farm = game_state.farms[index]
+            if farm.sell_time is not None:
+                return None
+
+            #If the farm is a monkeynomics, determine the next payout time of the active ability
+            if farm.upgrades[1] == 5:
+                farm_time = farm.min_use_time
+                while farm_time <= time:
+                    farm_time += farm_globals['Monkeynomics Usage Cooldown']
+                farm.min_use_time = farm_time
+                heappush(self.heap, (farm_time, source, index, MONKEYNOMICS_PAYOUT, version, 0, 0, 0))
+
+            self.purchase_rounds[index] = game_state.rounds.getRoundFromTime(farm.purchase_time)
+            round_val = max(self.purchase_rounds[index], game_state.rounds.getRoundFromTime(time))
+            self.pushFarmPayout(game_state, index, version, round_val, 0, time)
+
+        elif source == JERICHO_SOURCE:
+            jeri_time = game_state.jericho_steal_time
+            last_time = game_state.jericho_steal_time + (hero_globals['Jericho Number of Steals']-1)*hero_globals['Jericho Steal Interval']
+            while jeri_time <= time:
+                jeri_time += hero_globals['Jericho Steal Interval']
+            if jeri_time <= last_time:
+                heappush(self.heap, (jeri_time, source, index, 0, version, 0, 0, 0))
+
+    def resetAltEco(self, game_state, source, time):
+        '''
+        Like self.resetSource, but for every druid farm, supply drop, or heli farm at once.
+
+        Parameters:
+        game_state (GameState): The game state the towers belong to
+        source (int): DRUID_SOURCE, SNIPER_SOURCE, or HELI_SOURCE
+        time (float): The next payout of each tower will occur strictly after this time.
+        '''
+        store = self.altEcoStore(game_state, source)
+        for index in store.keys():
+            self.removeSource(source, index)
+        for index, use_time, use_index in store.nextUses(time):
+            heappush(self.heap, (use_time, source, index, 0, self.versions[(source, index)], 0, use_index, 0))
+
+    def altEcoStore(self, game_state, source):
+        #Helper method which returns the store of druid farms, supply drops, or heli farms corresponding to the given source.
+        if source == DRUID_SOURCE:
+            return game_state.druid_farms
+        elif source == SNIPER_SOURCE:
+            return game_state.supply_drops
+        else:
+            return game_state.heli_farms
+
+    def pushFarmPayout(self, game_state, index, version, round_val, slot, time):
+        '''
+        Helper method for scheduling farm payments.
+
+        Starting from the slot-th payment of the given round, find the first payment of the farm at the given index which occurs strictly after the given time, and push it onto the queue.
+        '''
+
+        farm = game_state.farms[index]
+        rounds = game_state.rounds
+        farm_purchase_round = self.purchase_rounds[index]
+
+        while round_val <= max_round:
+            #Farm payout rules are different for the round the farm is bought on versus subsequent rounds
+            if round_val == farm_purchase_round:
+                loop_end = int(ceil(farm.payout_frequency*(1 - (farm.purchase_time - rounds.round_starts[round_val])/rounds.nat_send_lens[round_val])-1)-1)
+                while slot < loop_end:
+                    farm_time = farm.purchase_time + (slot+1)*rounds.nat_send_lens[round_val]/farm.payout_frequency
+                    if farm_time > time:
+                        heappush(self.heap, (farm_time, FARM_SOURCE, index, FARM_PAYOUT, version, round_val, slot, 0))
+                        return None
+                    slot += 1
+            else:
+                #In every other round, the farm's payouts are evenly spaced over the round's natural send length.
+                #These times are the same for every farm with the same payout frequency, so the Rounds object computes them once and caches them.
+                payout_times = rounds.getFarmPayoutTimes(round_val, farm.payout_frequency)
+                slot = bisect_right(payout_times, time, slot)
+                if slot < len(payout_times):
+                    farm_time = payout_times[slot]
+                    #At the start of every round, every bank gets a $400 payment and then is awarded 20% interest.
+                    if slot == 0 and farm.upgrades[1] >= 3:
+                        heappush(self.heap, (farm_time, FARM_SOURCE, index, BANK_INTEREST_PAYOUT, version, round_val, slot, 0))
+                    heappush(self.heap, (farm_time, FARM_SOURCE, index, FARM_PAYOUT, version, round_val, slot, 0))
+                    return None
+
+            round_val += 1
+            slot = 0
+
+    def pushNext(self, game_state, entry):
+        #Helper method for self.drain. Given a payout that was just removed from the queue, schedule the next payout of the same source.
+        time, source, index, sub, version, round_val, slot, requeued = entry
+
+        if source == ECO_SOURCE:
+            heappush(self.heap, (6*(slot+1), source, index, sub, version, 0, slot+1, 0))
+
+        elif source == DRUID_SOURCE or source == SNIPER_SOURCE or source == HELI_SOURCE:
+            use_time = self.altEcoStore(game_state, source).useTime(index, slot+1)
+            heappush(self.heap, (use_time, source, index, sub, version, 0, slot+1, 0))
+
+        elif source == SOTF_SOURCE or source == BOAT_SOURCE:
+            if round_val + 1 <= max_round:
+                heappush(self.heap, (game_state.rounds.getTimeFromRound(round_val + 1), source, index, sub, version, round_val + 1, 0, 0))
+
+        elif source == FARM_SOURCE:
+            if sub == MONKEYNOMICS_PAYOUT:
+                farm = game_state.farms[index]
+                farm.min_use_time = time + farm_globals['Monkeynomics Usage Cooldown']
+                heappush(self.heap, (farm.min_use_time, source, index, sub, version, 0, 0, 0))
+            elif sub == FARM_PAYOUT:
+                self.pushFarmPayout(game_state, index, version, round_val, slot+1, time)
+
+        elif source == JERICHO_SOURCE:
+            jeri_time = time + hero_globals['Jericho Steal Interval']
+            if jeri_time <= game_state.jericho_steal_time + (hero_globals['Jericho Number of Steals']-1)*hero_globals['Jericho Steal Interval']:
+                heappush(self.heap, (jeri_time, source, index, sub, version, 0, 0, 0))
+
+    def drain(self, game_state, target_time, ghost_times = ()):
+        '''
+        Remove every payout scheduled to occur at or before the target time from the queue.
+
+        Parameters:
+        game_state (GameState): The game state whose payouts we are computing
+        target_time (float): the latest time (inclusive) of any payment to be included in the payout schedule.
+        ghost_times (List[float]): An increasing list of times at which to add ghost payouts to the schedule. Times at or after the target time are ignored.
+
+        Returns:
+        schedule (PayoutSchedule): the payouts, in the order they should be awarded.
+        WARNING: The same PayoutSchedule object is reused every time this method is called!
+        '''
+
+        schedule = self.schedule
+        schedule.clear()
+        heap = self.heap
+        ghost_index = 0
+        num_ghosts = len(ghost_times)
+        while len(heap) > 0 and heap[0][0] <= target_time:
+            entry = heappop(heap)
+
+            #Ghost payouts come after every other payout occuring at the same time
+            while ghost_index < num_ghosts and ghost_times[ghost_index] < entry[0]:
+                schedule.append(ghost_times[ghost_index], 0, DIRECT_PAYOUT, GHOST_SOURCE)
+                ghost_index += 1
+
+            if self.versions.get((entry[1], entry[2])) != entry[4]:
+                #The payout belongs to an income source that has since been reset or removed
+                continue
+
+            amount, payout_type = self.payoutInfo(game_state, entry)
+            schedule.append(entry[0], amount, payout_type, entry[1], entry[2], entry)
+
+            #If the payout was put back into the queue by self.requeue, the next payout from its source is already in the queue!
+            if not entry[7]:
+                self.pushNext(game_state, entry)
+
+        while ghost_index < num_ghosts and ghost_times[ghost_index] < target_time:
+            schedule.append(ghost_times[ghost_index], 0, DIRECT_PAYOUT, GHOST_SOURCE)
+            ghost_index += 1
+
+        #GHOST PAYOUT
+        #This special payout prevents the code from waiting possibly several seconds to carry out purchases in the buy queue that can obviously be afforded
+        schedule.append(target_time, 0, DIRECT_PAYOUT, GHOST_SOURCE)
+
+        return schedule
+
+    def requeue(self, schedule, start = 0):
+        '''
+        Return payouts obtained from self.drain that were not awarded back to the queue.
+        This happens when the GameState terminates advanceGameState early (say, because a purchase was made).
+
+        Parameters:
+        schedule (PayoutSchedule): The schedule returned by self.drain
+        start (int): Every payout in the schedule from this index onwards is put back into the queue.
+        '''
+        for entry in schedule.entries[start:]:
+            if entry is not None:
+                heappush(self.heap, entry[:7] + (1,))
+
+    def payoutInfo(self, game_state, entry):
+        #Helper method for self.drain. Determine the amount and type of the payment associated with an entry in the queue.
+        time, source, index, sub, version, round_val, slot, requeued = entry
+
+        if source == ECO_SOURCE:
+            return 0, ECO_PAYOUT
+        elif source == DRUID_SOURCE or source == SNIPER_SOURCE or source == HELI_SOURCE:
+            return self.altEcoStore(game_state, source).payout(index), DIRECT_PAYOUT
+        elif source == SOTF_SOURCE:
+            #Spirit of the Forest has a start of round payment of 3000 dollars in addition to the payouts that x4x druids can give out
+            return druid_globals['Spirit of the Forest Bonus'], DIRECT_PAYOUT
+        elif source == FARM_SOURCE:
+            farm = game_state.farms[index]
+            if sub == MONKEYNOMICS_PAYOUT:
+                return farm_globals['Monkeynomics Payout'], DIRECT_PAYOUT
+            elif sub == BANK_INTEREST_PAYOUT:
+                return 0, BANK_INTEREST
+
+            #Farm payouts will either immediately be added to the player's cash or added to the monkey bank's account value
+            #WARNING: If the farm we are dealing with is a MWS, we must check whether we are awarding the MWS bonus payment!
+            #WARNING: If the farm we are dealing with is a BRF, we must check whether the BRF buff is being applied or not!
+            if farm.upgrades[1] >= 3:
+                return farm.payout(time), BANK_PAYMENT
+            elif slot == 0 and farm.upgrades[2] == 5 and round_val > self.purchase_rounds[index]:
+                return farm.payout(time, mws_bonus = True), DIRECT_PAYOUT
+            elif farm.upgrades[0] == 4 and game_state.T5_exists[0] == True:
+                return farm.payout(time, brf_buff = True), DIRECT_PAYOUT
+            return farm.payout(time), DIRECT_PAYOUT
+        elif source == BOAT_SOURCE:
+            #Is there a Trade Empire on screen right now?
+            if game_state.Tempire_exists == True:
+                #Yes, determine the buff to be applied to other boat farm payments.
+                active_boats = 0
+                for boat_farm in game_state.boat_farms.values():
+                    if boat_farm.sell_time is None:
+                        active_boats += 1
+                arg = min(active_boats - 1,20)
+            else:
+                arg = 0
+            multiplier = 1 + 0.05*arg
+
+            #Determine the amount of the money the boats will give this round
+            boat_payout = 0
+            for boat_farm in game_state.boat_farms.values():
+                if boat_farm.sell_time is None:
+                    boat_payout += boat_farm.payout(multiplier)
+            return boat_payout, DIRECT_PAYOUT
+        elif source == JERICHO_SOURCE:
+            return game_state.jericho_steal_amount, DIRECT_PAYOUT
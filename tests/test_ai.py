@@ -0,0 +1,55 @@
+import multiprocessing
+import pytest
+import b2sim.engine as b2
+
+neat = pytest.importorskip('neat')
+ai_module = pytest.importorskip('b2sim.analysis.ai')
+fitness_module = pytest.importorskip('b2sim.analysis.fitness')
+
+parameters = {'Unit Type': 'Rounds', 'Units To Measure': 3, 'Minimum Eco': 0, 'Eco Tolerance': 0}
+
+def initialState():
+    rounds = b2.Rounds(0.1)
+    farms = [b2.initFarm(rounds.getTimeFromRound(7), upgrades = [3,2,0]), b2.initFarm(rounds.getTimeFromRound(13.9), upgrades = [3,2,0])]
+    return {'Cash': 0, 'Eco': 600, 'Rounds': rounds, 'Farms': farms, 'Game Round': 13.99, 'Log Level': 'Off'}
+
+@pytest.fixture(scope = 'module')
+def setup():
+    ai = ai_module.AI(initialState())
+    config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet, neat.DefaultStagnation, ai.config_path)
+    genomes = list(neat.Population(config).population.items())[:8]
+    target_time = initialState()['Rounds'].getTimeFromRound(16)
+    return config, genomes, target_time
+
+def serialResults(config, genomes, target_time):
+    ai = ai_module.AI(initialState())
+    results = []
+    for genome_id, genome in genomes:
+        fitness = ai.processGenome(genome, config, target_time, 3.0, fitness_module.cashGen, parameters)
+        results.append((fitness, ai.fitness_multiplier, ai.game_state.eco))
+    return results
+
+def test_evaluate_genome_matches_serial(setup):
+    config, genomes, target_time = setup
+    ai_module.initGenomeWorker(ai_module.AI(initialState()))
+    try:
+        results = [ai_module.evaluateGenome(genome, config, target_time, 3.0, fitness_module.cashGen, parameters) for genome_id, genome in genomes]
+    finally:
+        ai_module.initGenomeWorker(None)
+    assert results == serialResults(config, genomes, target_time)
+
+def test_pooled_eval_genomes_matches_serial(setup):
+    config, genomes, target_time = setup
+    ai = ai_module.AI(initialState())
+    ai.evalGenomes(genomes, config, target_time, 3.0, fitness_module.cashGen, parameters)
+    serial = [genome.fitness for genome_id, genome in genomes]
+    assert any(fitness > 0 for fitness in serial)
+
+    # Like AI.train, hand the workers an AI whose initial snapshot has already been built
+    worker_ai = ai_module.AI(initialState())
+    worker_ai.initial_snapshot = b2.GameState(initialState()).snapshot()
+    for genome_id, genome in genomes:
+        genome.fitness = None
+    with multiprocessing.Pool(2, initializer = ai_module.initGenomeWorker, initargs = (worker_ai,)) as pool:
+        worker_ai.evalGenomes(genomes, config, target_time, 3.0, fitness_module.cashGen, parameters, pool = pool)
+    assert [genome.fitness for genome_id, genome in genomes] == serial
@@ -0,0 +1,38 @@
+import b2sim.engine as b2
+from b2sim.engine.batch import runStallSample
+
+def test_stall_sample_purchase_times_entries_bought_together():
+    # With 4000 cash, all three farms are bought on the same payout, which the event messages report as a single 'Buy' message
+    initial_state = {
+        'Cash': 4000,
+        'Eco': 600,
+        'Game Round': 10,
+        'Buy Queue': [[b2.buyFarm()], [b2.buyFarm()], [b2.buyFarm()]]
+    }
+    final_time, cash, eco, purchase_times = runStallSample(initial_state, 0.1, seed = 0, target_round = 12)
+    assert len(purchase_times) == 3
+    assert purchase_times[0] == purchase_times[1] == purchase_times[2]
+
+def test_stall_sample_purchase_times_entries_bought_apart():
+    initial_state = {
+        'Cash': 1500,
+        'Eco': 600,
+        'Game Round': 10,
+        'Buy Queue': [[b2.buyFarm()], [b2.buyFarm()], [b2.buyFarm()]]
+    }
+    final_time, cash, eco, purchase_times = runStallSample(initial_state, 0.1, seed = 0, target_round = 14)
+    assert len(purchase_times) == 3
+    assert purchase_times == sorted(purchase_times)
+    assert purchase_times[0] < purchase_times[2]
+
+def test_stall_variance_purchase_times_line_up():
+    # Every sample buys the same three entries, so each entry must get its own summary with one time per sample
+    initial_state = {
+        'Cash': 4000,
+        'Eco': 600,
+        'Game Round': 10,
+        'Buy Queue': [[b2.buyFarm()], [b2.buyFarm()], [b2.buyFarm()]]
+    }
+    results = b2.simulateStallVariance(initial_state, (0, 1), 5, target_round = 12, seed = 1, stepping = 'Event')
+    assert len(results.purchase_times) == 3
+    assert [purchase_time.count for purchase_time in results.purchase_times] == [5, 5, 5]
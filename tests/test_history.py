@@ -0,0 +1,35 @@
+import pytest
+import b2sim.engine as b2
+
+def initialState(**history):
+    state = {
+        'Cash': 0,
+        'Eco': 600,
+        'Rounds': b2.Rounds(0.1),
+        'Game Round': 13
+    }
+    state.update(history)
+    return state
+
+@pytest.mark.parametrize('history', [
+    {'History Mode': 'Donwsample'},
+    {'History Mode': 'Downsample'},
+    {'History Mode': 'Downsample', 'History Resolution': 0},
+    {'History Mode': 'Callback'},
+    {'History Mode': 'Buffer'},
+])
+def test_invalid_history_mode(history):
+    with pytest.raises(ValueError):
+        b2.GameState(initialState(**history))
+
+@pytest.mark.parametrize('history', [
+    {},
+    {'History Mode': 'Full'},
+    {'History Mode': 'Window', 'History Length': 5},
+    {'History Mode': 'Downsample', 'History Resolution': 1},
+    {'History Mode': 'Callback', 'History Callback': lambda time, cash, eco: None},
+    {'History Mode': 'Buffer', 'History Buffer': [None]*10},
+])
+def test_valid_history_mode(history):
+    game_state = b2.GameState(initialState(**history))
+    assert len(game_state.time_states) == 1
@@ -0,0 +1,108 @@
+import pytest
+from b2sim.engine.info import game_globals
+from b2sim.engine.queues import AttackQueue
+
+# The attack queue used to be a plain list of send finish times, so every test here compares AttackQueue against a list.
+
+max_length = game_globals['Max Queue Length']
+
+def expireList(times, time):
+    # How the simulator used to remove finished sends from the attack queue
+    count = 0
+    while len(times) > 0 and times[0] <= time:
+        times.pop(0)
+        count += 1
+    return count
+
+def wrappedQueue():
+    # Returns a full queue whose oldest send is stored in the middle of the buffer, along with the equivalent list
+    queue = AttackQueue(max_length, range(1, max_length + 1))
+    times = list(queue)
+    queue.expire(3)
+    expireList(times, 3)
+    for time in (7, 8, 9):
+        queue.append(time)
+        times.append(time)
+    return queue, times
+
+def test_append_up_to_capacity():
+    queue = AttackQueue(max_length)
+    times = []
+    for i in range(max_length):
+        queue.append(6.0*i)
+        times.append(6.0*i)
+        assert list(queue) == times
+        assert len(queue) == len(times)
+
+def test_append_past_capacity():
+    queue = AttackQueue(max_length, range(max_length))
+    with pytest.raises(IndexError):
+        queue.append(100)
+    # A failed append leaves the queue as it was
+    assert list(queue) == list(range(max_length))
+
+def test_wrap_around_matches_list():
+    queue, times = wrappedQueue()
+    assert queue.start != 0
+    assert list(queue) == times
+    assert queue[0] == times[0]
+    assert queue[-1] == times[-1]
+
+def test_count_finished_and_expire_across_wrap():
+    for time in (0, 3.5, 4, 6.5, 7, 8.5, 9, 100):
+        queue, times = wrappedQueue()
+        assert queue.countFinished(time) == len([t for t in times if t <= time])
+        assert queue.expire(time) == expireList(times, time)
+        assert list(queue) == times
+
+def test_expire_everything():
+    queue, times = wrappedQueue()
+    assert queue.expire(times[-1]) == len(times)
+    assert len(queue) == 0
+    assert list(queue) == []
+
+    # The emptied queue can be filled up again
+    for i in range(max_length):
+        queue.append(10 + i)
+    assert list(queue) == [10 + i for i in range(max_length)]
+
+def test_expire_empty_queue():
+    queue = AttackQueue(max_length)
+    assert queue.countFinished(100) == 0
+    assert queue.expire(100) == 0
+
+def test_copy_is_independent():
+    queue, times = wrappedQueue()
+    copy = queue.copy()
+    assert copy == queue
+
+    copy.expire(5)
+    copy.append(20)
+    assert list(queue) == times
+    assert list(copy) == [6, 7, 8, 9, 20]
+
+    queue.clear()
+    assert list(copy) == [6, 7, 8, 9, 20]
+
+def test_behaves_like_list():
+    queue, times = wrappedQueue()
+    assert len(queue) == len(times)
+    assert [queue[i] for i in range(len(times))] == times
+    assert [queue[-i] for i in range(1, len(times) + 1)] == [times[-i] for i in range(1, len(times) + 1)]
+    assert list(iter(queue)) == times
+    assert queue == times
+    assert queue != times[:-1]
+
+    # Logs print the attack queue, so it must print exactly like the list it replaced
+    float_queue = AttackQueue(max_length, [1.5, 7.25])
+    assert repr(float_queue) == repr([1.5, 7.25])
+    assert str(AttackQueue(max_length)) == str([])
+
+def test_index_out_of_range():
+    queue = AttackQueue(max_length, [1, 2])
+    with pytest.raises(IndexError):
+        queue[2]
+    with pytest.raises(IndexError):
+        queue[-3]
+    with pytest.raises(IndexError):
+        AttackQueue(max_length)[0]
@@ -0,0 +1,27 @@
+import pytest
+import b2sim.engine as b2
+
+@pytest.mark.parametrize('mode', ['Stall Factor', 'Theoretical Stall Factor'])
+def test_batch_matches_rounds(mode):
+    batch = b2.RoundsBatch.sweep([0, 0.3, 1], mode)
+    for stall_factor, view in zip([0, 0.3, 1], batch):
+        assert view.round_starts == pytest.approx(b2.Rounds(stall_factor, mode).round_starts)
+
+@pytest.mark.parametrize('mode', ['Stall Factor', 'Theoretical Stall Factor'])
+def test_batch_view_change_stall_factor(mode):
+    rounds = b2.Rounds(0.3, mode)
+    time = rounds.getTimeFromRound(20.5)
+    view = b2.RoundsBatch.sweep([0.3], mode)[0]
+    assert view.stall_mode == rounds.stall_mode
+
+    rounds.changeStallFactor(0.8, time)
+    view.changeStallFactor(0.8, time)
+    assert view.round_starts == pytest.approx(rounds.round_starts)
+
+def test_batch_view_change_stall_factor_game_state():
+    rounds = b2.Rounds(0.3, 'Theoretical Stall Factor')
+    view = b2.RoundsBatch.sweep([0.3], 'Theoretical Stall Factor')[0]
+    game_states = [b2.GameState({'Cash': 0, 'Eco': 600, 'Rounds': r, 'Game Round': 20, 'Log Level': 'Off'}) for r in (rounds, view)]
+    for game_state in game_states:
+        game_state.changeStallFactor(0.8)
+    assert game_states[1].rounds.round_starts == pytest.approx(game_states[0].rounds.round_starts)
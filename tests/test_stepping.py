@@ -0,0 +1,35 @@
+import pytest
+import b2sim.engine as b2
+
+def boatState():
+    # The first boat farm is affordable the moment the simulation starts
+    rounds = b2.Rounds(0.2)
+    buy_queue = [[b2.buyBoatFarm()], [b2.buyBoatFarm()], [b2.upgradeBoatFarm(0)]]
+    return {
+        'Cash': 3000,
+        'Eco': 2500,
+        'Eco Send': b2.ecoSend(send_name = 'Grouped Whites'),
+        'Rounds': rounds,
+        'Game Round': 14,
+        'Buy Queue': buy_queue,
+        'Log Level': 'Off'
+    }
+
+def test_event_stepping_buys_at_start():
+    game_state = b2.GameState(boatState())
+    start_time = game_state.current_time
+    game_state.fastForward(target_round = 20, stepping = 'Event')
+    assert game_state.buy_times[0] == start_time
+
+def test_event_stepping_matches_fine_interval():
+    event_state = b2.GameState(boatState())
+    event_state.fastForward(target_round = 20, stepping = 'Event')
+    interval_state = b2.GameState(boatState())
+    interval_state.fastForward(target_round = 20, interval = 0.001)
+
+    # 'Interval' stepping can only buy at a payout or at the end of an interval, so its purchases may come up to one interval late
+    assert len(event_state.buy_times) == len(interval_state.buy_times) == 3
+    for event_time, interval_time in zip(event_state.buy_times, interval_state.buy_times):
+        assert event_time <= interval_time <= event_time + 0.001 + 1e-9
+    assert event_state.eco == pytest.approx(interval_state.eco)
+    assert event_state.cash == pytest.approx(interval_state.cash, rel = 1e-3)